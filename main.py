@@ -2,13 +2,49 @@ import argparse
 import os
 from projects.pipeline.basic_rag_pipeline import BasicRAGPipeline
 from projects.pipeline.multi_modal_rag_pipeline import MultiModalRAGPipeline
+from projects.retriever.multi_modal_retriever import image_store_path, image_blob_path
 from projects.pipeline.langgraph_rag_pipeline import LangGraphRAGPipeline
 from projects.pipeline.agentic_rag_pipeline import AgenticRAGReActPipeline
-from shared.utils.chroma_utils import list_existing_collections, delete_collection
-from shared.configs.static import RAG_TYPES, DATA_DIR_MAP
+from shared.utils.chroma_utils import list_existing_collections, get_collection_name_for_rag_type, get_rag_type_for_collection
+from shared.utils.vectorstore_utils import get_vector_backend, list_local_collections, open_backend
+from shared.utils.benchmark_utils import (
+    quantization_benchmark,
+    print_quantization_report,
+    backend_benchmark,
+    print_backend_report,
+)
+from shared.utils.retrieval_utils import lexical_index_path, rebuild_lexical_index
+from shared.utils.indexing_pipeline import checkpoint_path
+from shared.utils.filter_utils import parse_scope
+from shared.utils.prefork_server import serve
+from shared.utils.snapshot_utils import export_collection, import_collection, read_snapshot
+from shared.configs.retriever_configs import get_retriever_config
+from shared.configs.static import RAG_TYPES, DATA_DIR_MAP, PERSIST_DIR, SNAPSHOT_VECTOR_ENCODINGS, SNAPSHOT_VECTOR_ENCODING, SERVE_PORT
 from projects.pipeline.rag_ubac_pipeline import RAGUBACPipeline
 from projects.pipeline.cache_rag_pipeline import CacheRAGPipeline
 
+def set_scope(rag, spec):
+    """Handle `/scope [clear | <files> tag:<name> since:<date> until:<date> pages:<a>-<b>]`."""
+    retriever = rag.retriever
+    if spec:
+        try:
+            scope = None if spec == "clear" else parse_scope(spec)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        retriever.set_scope(scope)
+        # Results cached under the previous scope can no longer be hit; free them
+        tool_runner = getattr(rag, "tool_runner", None)
+        if tool_runner is not None:
+            tool_runner.shared_cache.clear()
+    if retriever.scope is None:
+        print("Scope: whole collection")
+        return
+    try:
+        print(f"Scope: {retriever.scope} ({retriever.count_matching(retriever.scope)} of {retriever.count_matching()} chunks)")
+    except Exception as e:
+        print(f"Scope: {retriever.scope} (could not count matching chunks: {e})")
+
 def main():
     parser = argparse.ArgumentParser(description="RAG Pipeline CLI")
     parser.add_argument(
@@ -22,12 +58,23 @@ def main():
     parser.add_argument("--delete-collection", action="store_true", help="Delete the collection for the specified RAG type and exit")
     parser.add_argument("--clear-cache", action="store_true", help="Clear cache collection (only for cache-rag)")
     parser.add_argument("--info", action="store_true", help="Show pipeline and collection information")
+    parser.add_argument("--benchmark-quantization", action="store_true", help="Report recall vs memory of int8/binary embedding quantization for the collection and exit")
+    parser.add_argument("--benchmark-backends", action="store_true", help="Load the collection into every vector backend and compare write and search speed, then exit")
+    parser.add_argument("--export-collection", nargs=2, metavar=("NAME", "SNAPSHOT"), help="Write collection NAME (vectors, texts, metadata) to a snapshot file and exit")
+    parser.add_argument("--import-collection", metavar="SNAPSHOT", help="Replace the collection stored in a snapshot file with its contents and exit")
+    parser.add_argument("--snapshot-encoding", choices=SNAPSHOT_VECTOR_ENCODINGS, default=SNAPSHOT_VECTOR_ENCODING, help="Vector encoding for --export-collection")
+    parser.add_argument("--serve", action="store_true", help="Serve the pipeline over HTTP from pre-forked workers sharing one loaded index")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --serve (default: SERVE_WORKERS)")
+    parser.add_argument("--port", type=int, default=SERVE_PORT, help="Port for --serve")
+    parser.add_argument("--scope", help="Only search a document set, e.g. \"report.pdf tag:hr since:2024-01-01\" (same syntax as /scope)")
     args = parser.parse_args()
 
     if args.list_collections:
         print("Listing collections in chroma_db")
         try:
             cols = list_existing_collections()
+            for backend in ("numpy", "faiss"):
+                cols += [f"{c} ({backend})" for c in list_local_collections(PERSIST_DIR, backend)]
             if cols:
                 for c in cols: print(f"  - {c}")
             else:
@@ -40,7 +87,79 @@ def main():
         collection_name = f"{args.rag_type.replace('-', '_')}_collection"
         confirm = input(f"Are you sure you want to delete collection '{collection_name}'? (yes/no): ")
         if confirm.lower() == 'yes' or confirm.lower() == 'y':
-            delete_collection(collection_name)
+            backend = get_vector_backend(collection_name, args.rag_type)
+            open_backend(collection_name, None, PERSIST_DIR, backend).drop()
+            # The checkpoint and BM25 index describe the dropped rows; a later -v must start from scratch
+            stale_files = [checkpoint_path(PERSIST_DIR, collection_name), lexical_index_path(PERSIST_DIR, collection_name)]
+            if args.rag_type == "multi-modal":
+                stale_files += [image_store_path(PERSIST_DIR, collection_name), image_blob_path(PERSIST_DIR, collection_name)]
+            for path in stale_files:
+                if os.path.exists(path):
+                    os.remove(path)
+            print(f"Deleted collection: {collection_name} ({backend})")
+        return
+
+    if args.export_collection:
+        collection_name, snapshot_path = args.export_collection
+        try:
+            rag_type = get_rag_type_for_collection(collection_name)
+            backend = open_backend(collection_name, None, PERSIST_DIR, get_vector_backend(collection_name, rag_type))
+            extras = {}
+            if rag_type == "multi-modal":
+                image_files = {"images": image_store_path(PERSIST_DIR, collection_name), "image_blobs": image_blob_path(PERSIST_DIR, collection_name)}
+                for name, path in image_files.items():
+                    if os.path.exists(path):
+                        with open(path, "rb") as f:
+                            extras[name] = f.read()
+            header = export_collection(backend, snapshot_path, args.snapshot_encoding, extras)
+        except Exception as e:
+            print(f"Error exporting collection {collection_name}: {e}")
+            return
+        size_mb = os.path.getsize(snapshot_path) / 1e6
+        print(f"Exported {header['count']} rows of {collection_name} ({backend.name}, {header['vector_encoding']} vectors) to {snapshot_path} ({size_mb:.1f} MB)")
+        return
+
+    if args.import_collection:
+        try:
+            snapshot = read_snapshot(args.import_collection)
+            collection_name = snapshot["header"]["collection"]
+            rag_type = get_rag_type_for_collection(collection_name)
+        except Exception as e:
+            print(f"Error reading snapshot {args.import_collection}: {e}")
+            return
+        backend = open_backend(collection_name, None, PERSIST_DIR, get_vector_backend(collection_name, rag_type))
+        if backend.count():
+            confirm = input(f"Collection '{collection_name}' already has {backend.count()} rows. Replace it? (yes/no): ")
+            if confirm.lower() not in ('yes', 'y'):
+                return
+        count = import_collection(snapshot, backend)
+        if os.path.exists(checkpoint_path(PERSIST_DIR, collection_name)):
+            os.remove(checkpoint_path(PERSIST_DIR, collection_name))
+        image_files = {"image_blobs": image_blob_path(PERSIST_DIR, collection_name), "images": image_store_path(PERSIST_DIR, collection_name)}
+        for name, path in image_files.items():
+            if name in snapshot["extras"]:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(snapshot["extras"][name])
+        if rag_type != "multi-modal" and collection_name == get_collection_name_for_rag_type(rag_type):
+            rebuild_lexical_index(backend, lexical_index_path(PERSIST_DIR, collection_name))
+        print(f"Imported {count} rows into {collection_name} ({backend.name}) from {args.import_collection}")
+        return
+
+    if args.benchmark_quantization or args.benchmark_backends:
+        config = get_retriever_config(args.rag_type)
+        source = open_backend(config["collection_name"], None, config["persist_directory"], config["vector_backend"])
+        vectors = source.vectors()
+        if vectors.shape[0] == 0:
+            print(f"Collection {config['collection_name']} is empty; run with -v first.")
+            return
+        if args.benchmark_quantization:
+            report = quantization_benchmark(vectors)
+            print_quantization_report(config["collection_name"], vectors.shape[0], report)
+        else:
+            stored = source.get()
+            report = backend_benchmark(vectors, stored["documents"], stored["metadatas"])
+            print_backend_report(config["collection_name"], vectors.shape[0], report)
         return
 
     if args.clear_cache:
@@ -86,12 +205,27 @@ def main():
         print("Vectorizing data...")
         rag.retriever.index_pdfs()
 
-    print(f"{args.rag_type} RAG ready. Type your question or '/exit' or '/quit' to quit.")
-    while True:
-        q = input("Ask a question: ")
-        if q.lower() in ("/exit", "/quit"):
-            break
-        print(f"Answer: {rag.answer(q)}\n")
+    if args.scope:
+        set_scope(rag, args.scope)
+
+    try:
+        if args.serve:
+            serve(rag, args.rag_type, port=args.port, workers=args.workers)
+            return
+
+        print(f"{args.rag_type} RAG ready. Type your question, '/scope' to search only some documents, or '/exit' or '/quit' to quit.")
+        while True:
+            q = input("Ask a question: ")
+            if q.lower() in ("/exit", "/quit"):
+                break
+            if q.split(" ", 1)[0].lower() == "/scope":
+                set_scope(rag, q[len("/scope"):].strip())
+                continue
+            print(f"Answer: {rag.answer(q)}\n")
+    finally:
+        # Pipelines with worker threads (agentic tools) release them here
+        if hasattr(rag, "close"):
+            rag.close()
 
 if __name__ == "__main__":
     main()
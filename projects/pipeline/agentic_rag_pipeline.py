@@ -1,20 +1,36 @@
 import os
+import time
+from collections import deque
 from dotenv import load_dotenv
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from langchain_groq import ChatGroq
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode, tools_condition
 from langchain_core.messages import HumanMessage, AIMessage
 from shared.configs.static import (
     GROQ_MODEL as DEFAULT_GROQ_MODEL,
     AGENTIC_RAG_TYPE,
+    AGENTIC_GRADE_RELEVANT_THRESHOLD,
+    AGENTIC_GRADE_IRRELEVANT_THRESHOLD,
 )
 from shared.tools.web_search_tool import serp_search
 from shared.tools.currency_converter_tool import exchangerate_converter
 from shared.tools.agentic_retriever_tool import make_agentic_retriever_tool
 from projects.retriever.agentic_rag_retriever import AgenticRAGRetriever
-from shared.components.agentic_rag_nodes import agent, grade_documents, rewrite, generate
-from shared.components.agentic_rag_states import AgentState
+from shared.components.agentic_rag_nodes import (
+    route,
+    route_after_router,
+    agent,
+    route_after_agent,
+    retrieve,
+    grade_documents,
+    route_after_grade,
+    rewrite,
+    route_after_rewrite,
+    generate,
+)
+from shared.components.agentic_rag_states import AgentState, AgentBudget
+from shared.components.agentic_tool_runner import ToolRunner
+from shared.components.agentic_router import AgenticRouter
 
 
 load_dotenv()
@@ -29,6 +45,9 @@ class AgenticRAGReActPipeline:
         debug: bool = False,
         rag_type: str = AGENTIC_RAG_TYPE,
         extra_tools: Optional[List[Any]] = None,
+        grade_thresholds: Optional[Tuple[float, float]] = None,
+        budget: Optional[AgentBudget] = None,
+        use_router: bool = True,
     ):
         model_name = groq_model or DEFAULT_GROQ_MODEL
         self.llm = ChatGroq(
@@ -37,15 +56,30 @@ class AgenticRAGReActPipeline:
             api_key=os.getenv("GROQ_API_KEY"),
         )
         self.debug = debug
+        self.budget = budget or AgentBudget()
 
         # Initialize the resume retriever and corresponding tool
         self.retriever = AgenticRAGRetriever(data_dir=data_dir, rag_type=rag_type)
         resume_tool = make_agentic_retriever_tool(self.retriever)
 
+        # Local relevance grading reuses the retriever's embedding model;
+        # (irrelevant, relevant) similarity thresholds bound the LLM-graded band
+        self.embedding = self.retriever.embedding
+        self.grade_irrelevant_threshold, self.grade_relevant_threshold = grade_thresholds or (
+            AGENTIC_GRADE_IRRELEVANT_THRESHOLD,
+            AGENTIC_GRADE_RELEVANT_THRESHOLD,
+        )
+
         # Final tool list: resume retriever + built-ins + optional extras
         self.tools = [resume_tool, serp_search, exchangerate_converter]
         if extra_tools:
             self.tools.extend(list(extra_tools))
+        # Retriever results depend on the session scope, so it is part of their cache key
+        self.tool_runner = ToolRunner(self.tools, key_context={resume_tool.name: lambda: self.retriever.scope})
+
+        # Pre-agent router; recent decisions are kept for analysis
+        self.router = AgenticRouter(self.embedding, [t.name for t in self.tools]) if use_router else None
+        self.route_log = deque(maxlen=1000)
 
         self.graph = self._build_graph()
 
@@ -53,8 +87,10 @@ class AgenticRAGReActPipeline:
         workflow = StateGraph(AgentState)
 
         # Bind node functions to this instance via closures
+        workflow.add_node("route", lambda state: route(self, state))
         workflow.add_node("agent", lambda state: agent(self, state))
-        workflow.add_node("retrieve", ToolNode(self.tools))
+        workflow.add_node("retrieve", lambda state: retrieve(self, state))
+        workflow.add_node("grade", lambda state: grade_documents(self, state))
         workflow.add_node("rewrite", lambda state: rewrite(self, state))
         workflow.add_node("generate", lambda state: generate(self, state))
         # Node to handle conversations that try to bypass tools
@@ -68,37 +104,77 @@ class AgenticRAGReActPipeline:
 
         workflow.add_node("restricted", _restricted)
 
-        workflow.add_edge(START, "agent")
-        workflow.add_conditional_edges(
-            "agent",
-            tools_condition,
-            {
-                "tools": "retrieve",
-                END: "restricted",
-            },
-        )
+        workflow.add_edge(START, "route")
+        workflow.add_conditional_edges("route", route_after_router)
+        workflow.add_conditional_edges("agent", route_after_agent)
 
-        workflow.add_conditional_edges("retrieve", lambda state: grade_documents(self, state))
+        workflow.add_edge("retrieve", "grade")
+        workflow.add_conditional_edges("grade", route_after_grade)
         workflow.add_edge("generate", END)
         workflow.add_edge("restricted", END)
-        workflow.add_edge("rewrite", "agent")
+        workflow.add_conditional_edges("rewrite", route_after_rewrite)
 
         return workflow.compile()
 
-    def answer(self, question: str) -> str:
-        result = self.graph.invoke({"messages": [HumanMessage(content=question)]})
+    def run(self, question: str) -> Dict[str, Any]:
+        """Answer a question; also report the router decision, tool cache hits and budget consumption."""
+        started_at = time.monotonic()
+        result = self.graph.invoke({
+            "messages": [HumanMessage(content=question)],
+            "started_at": started_at,
+            "rewrites": 0,
+            "tool_calls": 0,
+            "llm_tokens": 0,
+            "tool_memo": {},
+            "tool_cache_hits": 0,
+            "tool_cache_lookups": 0,
+        })
+        decision = result.get("route")
+        hits, lookups = result.get("tool_cache_hits", 0), result.get("tool_cache_lookups", 0)
+        self.route_log.append({"question": question, **(decision or {})})
+        answer = ""
         # Extract last assistant message content
         msgs = result.get("messages", [])
-        if not msgs:
-            return ""
-        last = msgs[-1]
-        try:
-            return getattr(last, "content", str(last))
-        except Exception:
-            return str(last)
+        if msgs:
+            last = msgs[-1]
+            try:
+                answer = getattr(last, "content", str(last))
+            except Exception:
+                answer = str(last)
+        return {
+            "answer": answer,
+            "route": decision,
+            "tool_cache": {
+                "hits": hits,
+                "lookups": lookups,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "shared": self.tool_runner.shared_cache.stats(),
+            },
+            "budget": {
+                "rewrites": result.get("rewrites", 0),
+                "max_rewrites": self.budget.max_rewrites,
+                "tool_calls": result.get("tool_calls", 0),
+                "max_tool_calls": self.budget.max_tool_calls,
+                "llm_tokens": result.get("llm_tokens", 0),
+                "max_llm_tokens": self.budget.max_llm_tokens,
+                "elapsed_seconds": round(time.monotonic() - started_at, 3),
+                "deadline_seconds": self.budget.deadline_seconds,
+                "exhausted": result.get("budget_exhausted") or None,
+            },
+        }
+
+    def answer(self, question: str) -> str:
+        result = self.run(question)
+        if self.debug:
+            print("[budget]", result["budget"])
+        return result["answer"]
     
     def get_pipeline_info(self) -> Dict[str, Any]:
         return self.retriever.get_collection_info()
+
+    def close(self):
+        """Stop the tool worker threads."""
+        self.tool_runner.close()
         
 if __name__ == "__main__":
 
@@ -109,6 +185,7 @@ if __name__ == "__main__":
     # answer = graph.answer("generate a cover letter for my personal resume")
     answer = graph.answer("Summarize the candidate's AWS experience")
     print("\n\nAnswer: ", answer)
+    graph.close()
 
 
     
@@ -1,5 +1,5 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langgraph.graph import StateGraph, END
@@ -12,7 +12,7 @@ load_dotenv()
 class CacheRAGPipeline:
     def __init__(self, data_dir, persist_directory=PERSIST_DIR, groq_model=GROQ_MODEL):
         self.rag_type = CACHE_RAG_TYPE
-        self.retriever = CacheRAGRetriever(data_dir, persist_directory, self.rag_type)
+        self.retriever = CacheRAGRetriever(data_dir, self.rag_type)
         self.llm = ChatGroq(
             temperature=0,
             model=groq_model,
@@ -23,6 +23,10 @@ class CacheRAGPipeline:
     def _build_graph(self):
         def check_cache(state: Dict[str, Any]) -> Dict[str, Any]:
             q = state.get("question", "")
+            if self.retriever.scope:
+                # Cached answers were generated from the whole collection
+                print("Skipping cache lookup (session is scoped to a document set)")
+                return {"cache_hit": False, "question": q}
             similarity_threshold = state.get("similarity_threshold", CACHE_SIMILARITY_THRESHOLD)
             hits = self.retriever.cache_search(q, top_k=1, similarity_threshold=similarity_threshold)
             if hits:
@@ -34,7 +38,7 @@ class CacheRAGPipeline:
         def retrieve_node(state: Dict[str, Any]) -> Dict[str, Any]:
             q = state.get("question", "")
             top_k = state.get("top_k", TOP_K)
-            contexts = self.retriever.retrieve(q, top_k=top_k)
+            contexts = self.retriever.retrieve(q, top_k=top_k, rerank=state.get("rerank"))
             return {"context": "\n".join(contexts), "question": q, "top_k": top_k}
 
         def generate_node(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -49,7 +53,9 @@ class CacheRAGPipeline:
             q = state.get("question", "")
             a = state.get("answer", "")
             
-            if q and a and "no related contents" not in a.lower():
+            if self.retriever.scope:
+                print("Skipping cache (answer is scoped to a document set)")
+            elif q and a and "no related contents" not in a.lower():
                 print("DEBUG: Caching valid answer...")
                 self.retriever.cache_upsert(q, a)
             else:
@@ -79,11 +85,18 @@ class CacheRAGPipeline:
         g.add_edge("write_cache", END)
         return g.compile()
 
-    def answer(self, query: str, top_k: int = TOP_K, similarity_threshold: float = CACHE_SIMILARITY_THRESHOLD) -> str:
+    def answer(
+        self,
+        query: str,
+        top_k: int = TOP_K,
+        similarity_threshold: float = CACHE_SIMILARITY_THRESHOLD,
+        rerank: Optional[bool] = None,
+    ) -> str:
         result = self.graph.invoke({
             "question": query, 
             "top_k": top_k, 
-            "similarity_threshold": similarity_threshold
+            "similarity_threshold": similarity_threshold,
+            "rerank": rerank,
         })
         return result.get("answer", "")
 
@@ -1,5 +1,5 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from projects.retriever.langgraph_retriever import LangGraphRetriever
@@ -25,7 +25,7 @@ class LangGraphRAGPipeline:
         def retrieve_node(state: Dict[str, Any]) -> Dict[str, Any]:
             q = state.get("question", "")
             top_k = state.get("top_k", TOP_K)
-            contexts = self.retriever.retrieve(q, top_k=top_k)
+            contexts = self.retriever.retrieve(q, top_k=top_k, rerank=state.get("rerank"))
             # IMPORTANT (STATE): carry forward the question (and any other needed keys)
             return {"context": "\n".join(contexts), "question": q, "top_k": top_k}
 
@@ -45,8 +45,8 @@ class LangGraphRAGPipeline:
         g.add_edge("generate", END)
         return g.compile()
 
-    def answer(self, query: str, top_k: int = TOP_K) -> str:
-        result = self.graph.invoke({"question": query, "top_k": top_k})
+    def answer(self, query: str, top_k: int = TOP_K, rerank: Optional[bool] = None) -> str:
+        result = self.graph.invoke({"question": query, "top_k": top_k, "rerank": rerank})
         return result.get("answer", "")
 
     def get_pipeline_info(self):
@@ -1,239 +1,85 @@
-import fitz  # PyMuPDF
-from langchain_core.documents import Document
-from transformers import CLIPProcessor, CLIPModel
-from PIL import Image
-import torch
-import numpy as np
-from langchain.chat_models import init_chat_model
-from langchain.prompts import PromptTemplate
-from langchain.schema.messages import HumanMessage
-from sklearn.metrics.pairwise import cosine_similarity
-import os
-import base64
-import io
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from dotenv import load_dotenv
-load_dotenv()
-
-## set up the environment
-os.environ["OPENAI_API_KEY"]=os.getenv("OPENAI_API_KEY")
-
-### initialize the Clip Model for unified embeddings
-clip_model=CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-clip_processor=CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-clip_model.eval()
-
-### Embedding functions
-def embed_image(image_data):
-    """Embed image using CLIP"""
-    if isinstance(image_data, str):  # If path
-        image = Image.open(image_data).convert("RGB")
-    else:  # If PIL Image
-        image = image_data
-    
-    inputs=clip_processor(images=image,return_tensors="pt")
-    with torch.no_grad():
-        features = clip_model.get_image_features(**inputs)
-        # Normalize embeddings to unit vector
-        features = features / features.norm(dim=-1, keepdim=True)
-        return features.squeeze().numpy()
-    
-def embed_text(text):
-    """Embed text using CLIP."""
-    inputs = clip_processor(
-        text=text, 
-        return_tensors="pt", 
-        padding=True,
-        truncation=True,
-        max_length=77  # CLIP's max token length
-    )
-    with torch.no_grad():
-        features = clip_model.get_text_features(**inputs)
-        # Normalize embeddings
-        features = features / features.norm(dim=-1, keepdim=True)
-        return features.squeeze().numpy()
-
-## Process PDF
-pdf_path="data/source_data/multi-modal/multimodal_sample.pdf"
-doc=fitz.open(pdf_path)
-# Storage for all documents and embeddings
-all_docs = []
-all_embeddings = []
-image_data_store = {}  # Store actual image data for LLM
-
-# Text splitter
-splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-
-for i,page in enumerate(doc):
-    ## process text
-    text=page.get_text()
-    if text.strip():
-        ##create temporary document for splitting
-        temp_doc = Document(page_content=text, metadata={"page": i, "type": "text"})
-        text_chunks = splitter.split_documents([temp_doc])
-
-        #Embed each chunk using CLIP
-        for chunk in text_chunks:
-            embedding = embed_text(chunk.page_content)
-            all_embeddings.append(embedding)
-            all_docs.append(chunk)
-
-
-
-    ## process images
-    ##Three Important Actions:
-
-    ##Convert PDF image to PIL format
-    ##Store as base64 for GPT-4V (which needs base64 images)
-    ##Create CLIP embedding for retrieval
-
-    for img_index, img in enumerate(page.get_images(full=True)):
-        try:
-            xref = img[0]
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
-            
-            # Convert to PIL Image
-            pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-            
-            # Create unique identifier
-            image_id = f"page_{i}_img_{img_index}"
-            
-            # Store image as base64 for later use with GPT-4V
-            buffered = io.BytesIO()
-            pil_image.save(buffered, format="PNG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
-            image_data_store[image_id] = img_base64
-            
-            # Embed image using CLIP
-            embedding = embed_image(pil_image)
-            all_embeddings.append(embedding)
-            
-            # Create document for image
-            image_doc = Document(
-                page_content=f"[Image: {image_id}]",
-                metadata={"page": i, "type": "image", "image_id": image_id}
-            )
-            all_docs.append(image_doc)
-            
-        except Exception as e:
-            print(f"Error processing image {img_index} on page {i}: {e}")
-            continue
-
-doc.close()
-
-embeddings_array = np.array(all_embeddings)
-
-
-# Create custom FAISS index since we have precomputed embeddings
-vector_store = FAISS.from_embeddings(
-    text_embeddings=[(doc.page_content, emb) for doc, emb in zip(all_docs, embeddings_array)],
-    embedding=None,  # We're using precomputed embeddings
-    metadatas=[doc.metadata for doc in all_docs]
-)
-
-# Initialize GPT-4 Vision model
-llm = init_chat_model("openai:gpt-4.1")
-llm
-
-def retrieve_multimodal(query, k=5):
+"""Multi-modal PDF RAG (CLIP retrieval over text + images, GPT-4.1 answers) as a small API.
+
+Importing this module loads no models and touches no files; the retriever (CLIP,
+persisted FAISS index) and the chat model are created on first use.
+
+    python -m projects.pipeline.multi_modal_rag -v "What does the chart on page 1 show?"
+"""
+import argparse
+from functools import lru_cache
+from shared.configs.static import DATA_DIR_MAP, MM_RAG_TYPE
+
+DEFAULT_DATA_DIR = DATA_DIR_MAP[MM_RAG_TYPE]
+
+EXAMPLE_QUERIES = [
+    "What does the chart on page 1 show about revenue trends?",
+    "Summarize the main findings from the document",
+    "What visual elements are present in the document?"
+]
+
+
+@lru_cache(maxsize=None)
+def get_pipeline(data_dir=DEFAULT_DATA_DIR):
+    """The shared MultiModalRAGPipeline for a data directory, built on first call."""
+    from projects.pipeline.multi_modal_rag_pipeline import MultiModalRAGPipeline
+    return MultiModalRAGPipeline(data_dir, retriever=get_retriever(data_dir))
+
+
+@lru_cache(maxsize=None)
+def get_retriever(data_dir=DEFAULT_DATA_DIR):
+    """The shared MultiModalRetriever for a data directory; needs no chat model."""
+    from projects.retriever.multi_modal_retriever import MultiModalRetriever
+    return MultiModalRetriever(data_dir, MM_RAG_TYPE)
+
+
+def embed_image(image_data, data_dir=DEFAULT_DATA_DIR):
+    """Embed image (path or PIL Image) using CLIP."""
+    return get_retriever(data_dir).embed_image(image_data)
+
+
+def embed_text(text, data_dir=DEFAULT_DATA_DIR):
+    """Embed text using CLIP (normalized features)."""
+    return get_retriever(data_dir).embed_text(text)
+
+
+def index_documents(data_dir=DEFAULT_DATA_DIR):
+    """(Re-)index every PDF in the data directory and persist the index."""
+    get_retriever(data_dir).index_pdfs()
+
+
+def retrieve_multimodal(query, k=5, data_dir=DEFAULT_DATA_DIR):
     """Unified retrieval using CLIP embeddings for both text and images."""
-    # Embed query using CLIP
-    query_embedding = embed_text(query)
-    
-    # Search in unified vector store
-    results = vector_store.similarity_search_by_vector(
-        embedding=query_embedding,
-        k=k
-    )
-    
-    return results
-
-def create_multimodal_message(query, retrieved_docs):
+    return get_retriever(data_dir).retrieve(query, top_k=k)
+
+
+def create_multimodal_message(query, retrieved_docs, data_dir=DEFAULT_DATA_DIR):
     """Create a message with both text and images for GPT-4V."""
-    content = []
-    
-    # Add the query
-    content.append({
-        "type": "text",
-        "text": f"Question: {query}\n\nContext:\n"
-    })
-    
-    # Separate text and image documents
-    text_docs = [doc for doc in retrieved_docs if doc.metadata.get("type") == "text"]
-    image_docs = [doc for doc in retrieved_docs if doc.metadata.get("type") == "image"]
-    
-    # Add text context
-    if text_docs:
-        text_context = "\n\n".join([
-            f"[Page {doc.metadata['page']}]: {doc.page_content}"
-            for doc in text_docs
-        ])
-        content.append({
-            "type": "text",
-            "text": f"Text excerpts:\n{text_context}\n"
-        })
-    
-    # Add images
-    for doc in image_docs:
-        image_id = doc.metadata.get("image_id")
-        if image_id and image_id in image_data_store:
-            content.append({
-                "type": "text",
-                "text": f"\n[Image from page {doc.metadata['page']}]:\n"
-            })
-            content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{image_data_store[image_id]}"
-                }
-            })
-    
-    # Add instruction
-    content.append({
-        "type": "text",
-        "text": "\n\nPlease answer the question based on the provided text and images."
-    })
-    
-    return HumanMessage(content=content)
-
-def multimodal_pdf_rag_pipeline(query):
+    return get_pipeline(data_dir)._create_multimodal_message(query, retrieved_docs)
+
+
+def multimodal_pdf_rag_pipeline(query, k=5, data_dir=DEFAULT_DATA_DIR):
     """Main pipeline for multimodal RAG."""
-    # Retrieve relevant documents
-    context_docs = retrieve_multimodal(query, k=5)
-    
-    # Create multimodal message
-    message = create_multimodal_message(query, context_docs)
-    
-    # Get response from GPT-4V
-    response = llm.invoke([message])
-    
-    # Print retrieved context info
-    print(f"\nRetrieved {len(context_docs)} documents:")
-    for doc in context_docs:
-        doc_type = doc.metadata.get("type", "unknown")
-        page = doc.metadata.get("page", "?")
-        if doc_type == "text":
-            preview = doc.page_content[:100] + "..." if len(doc.page_content) > 100 else doc.page_content
-            print(f"  - Text from page {page}: {preview}")
-        else:
-            print(f"  - Image from page {page}")
-    print("\n")
-    
-    return response.content
+    return get_pipeline(data_dir).answer(query, top_k=k)
 
-if __name__ == "__main__":
-    # Example queries
-    queries = [
-        "What does the chart on page 1 show about revenue trends?",
-        "Summarize the main findings from the document",
-        "What visual elements are present in the document?"
-    ]
-    
-    for query in queries:
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-modal PDF RAG")
+    parser.add_argument("queries", nargs="*", help="Questions to answer (default: a few example questions)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Folder of PDFs to index")
+    parser.add_argument("-v", "--vectorize", action="store_true", help="(Re-)index the PDFs before answering")
+    parser.add_argument("-k", type=int, default=5, help="Number of documents to retrieve")
+    args = parser.parse_args(argv)
+
+    if args.vectorize or not get_retriever(args.data_dir).all_docs:
+        index_documents(args.data_dir)
+
+    for query in args.queries or EXAMPLE_QUERIES:
         print(f"\nQuery: {query}")
         print("-" * 50)
-        answer = multimodal_pdf_rag_pipeline(query)
+        answer = multimodal_pdf_rag_pipeline(query, k=args.k, data_dir=args.data_dir)
         print(f"Answer: {answer}")
-        print("=" * 70)
\ No newline at end of file
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
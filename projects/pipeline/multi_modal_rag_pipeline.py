@@ -1,7 +1,7 @@
 from projects.retriever.multi_modal_retriever import MultiModalRetriever
 from langchain.chat_models import init_chat_model
 from langchain.schema.messages import HumanMessage
-from shared.configs.static import MM_RAG_TYPE
+from shared.configs.static import MM_RAG_TYPE, MM_IMAGE_BYTE_BUDGET
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,15 +9,25 @@ load_dotenv()
 class MultiModalRAGPipeline:
     def __init__(
         self,
-        data_dir
+        data_dir,
+        image_byte_budget=MM_IMAGE_BYTE_BUDGET,
+        retriever=None
     ):
         self.rag_type = MM_RAG_TYPE
-        self.retriever = MultiModalRetriever(data_dir, self.rag_type)
-        self.llm = init_chat_model("openai:gpt-4.1")
+        self.image_byte_budget = image_byte_budget
+        self.retriever = retriever or MultiModalRetriever(data_dir, self.rag_type)
+        self._llm = None
+
+    @property
+    def llm(self):
+        """The chat model, created on the first answer so retrieval-only use needs no OpenAI client."""
+        if self._llm is None:
+            self._llm = init_chat_model("openai:gpt-4.1")
+        return self._llm
 
     def answer(self, query, top_k=5):
         """Main pipeline for multimodal RAG."""
-        context_docs = self.retriever.retrieve(query, k=top_k)
+        context_docs = self.retriever.retrieve(query, top_k=top_k)
         message = self._create_multimodal_message(query, context_docs)
         response = self.llm.invoke([message])
         self._print_retrieved_info(context_docs)
@@ -47,12 +57,21 @@ class MultiModalRAGPipeline:
                 "text": f"Text excerpts:\n{text_context}\n"
             })
         
-        # Add images
+        # Add images in rank order until the byte budget is spent; the rest are described by caption
+        budget_left = self.image_byte_budget
         for doc in image_docs:
             image_id = doc.metadata.get("image_id")
             if image_id:
-                image_data = self.retriever.get_image_data(image_id)
-                if image_data:
+                payload = self.retriever.get_image_payload(image_id)
+                if payload:
+                    if len(payload["data"]) > budget_left:
+                        caption = doc.metadata.get("caption") or "no caption available"
+                        content.append({
+                            "type": "text",
+                            "text": f"\n[Image from page {doc.metadata['page']} not attached; caption: {caption}]\n"
+                        })
+                        continue
+                    budget_left -= len(payload["data"])
                     content.append({
                         "type": "text",
                         "text": f"\n[Image from page {doc.metadata['page']}]:\n"
@@ -60,7 +79,7 @@ class MultiModalRAGPipeline:
                     content.append({
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{image_data}"
+                            "url": f"data:{payload['mime']};base64,{payload['data']}"
                         }
                     })
         
@@ -0,0 +1,126 @@
+import os
+from shared.configs.retriever_configs import get_retriever_config
+from shared.configs.static import TOP_K, RETRIEVAL_MODE, RERANK_ENABLED
+from shared.utils.filter_utils import combine_filters
+from shared.utils.indexing_pipeline import run_indexing
+from shared.utils.pdf_utils import stream_pdf_chunks
+from shared.utils.reranker import get_reranker
+from shared.utils.retrieval_utils import lexical_index_path, rebuild_lexical_index, load_lexical_index, search_texts, search_many_texts
+from shared.utils.vectorstore_utils import open_backend, get_collection_shards
+
+
+class BaseRetriever:
+    """Indexing and retrieval over one collection on the RAG type's configured vector backend.
+
+    Subclasses customise chunking (`_chunk_pdf`), add filters around `retrieve` /
+    `retrieve_many`, and extend `get_collection_info` through `_extra_info`.
+    A session `scope` (a `where` filter, see `set_scope`) is ANDed into every
+    search and applied by the backend as a pre-filter.
+    """
+
+    def __init__(self, data_dir, rag_type):
+        self.data_dir = data_dir
+        self.rag_type = rag_type
+        self.config = get_retriever_config(rag_type)
+
+        self.embedding = self.config["embedding"]
+        self.text_splitter = self.config["text_splitter"]
+        self.collection_name = self.config["collection_name"]
+        self.persist_directory = self.config["persist_directory"]
+        self.vector_backend = self.config["vector_backend"]
+        self.backend = None
+        self.lexical_index = None
+        self.scope = None
+
+    def set_scope(self, where=None):
+        """Restrict later retrievals to chunks matching a `where` filter; None searches everything."""
+        self.scope = where or None
+
+    def _ensure_store(self):
+        if self.backend is None:
+            self.backend = open_backend(self.collection_name, self.embedding, self.persist_directory, self.vector_backend)
+        return self.backend
+
+    def _ensure_lexical_index(self):
+        if self.lexical_index is None:
+            self.lexical_index = load_lexical_index(lexical_index_path(self.persist_directory, self.collection_name))
+        return self.lexical_index
+
+    def preload(self):
+        """Load the index, lexical index and reranker now, e.g. before forking serving workers.
+
+        The embedding model is already loaded by the config; it is not run here, so
+        no inference thread pool exists yet when the workers are forked.
+        """
+        self._ensure_store().preload()
+        if RETRIEVAL_MODE == "hybrid":
+            self._ensure_lexical_index()
+        if RERANK_ENABLED:
+            get_reranker().preload()
+
+    def _chunk_pdf(self, pdf_path):
+        return stream_pdf_chunks(pdf_path)
+
+    def index_pdfs(self):
+        print(f"Indexing PDFs for collection: {self.collection_name} ({self.vector_backend})")
+        if not os.path.exists(self.data_dir):
+            print(f"Error: data dir '{self.data_dir}' not found")
+            return
+        backend = self._ensure_store()
+        stats = run_indexing(
+            backend,
+            self.embedding,
+            self.data_dir,
+            self.persist_directory,
+            self.collection_name,
+            chunker=self._chunk_pdf,
+        )
+        if stats["interrupted"]:
+            return
+        if not backend.count():
+            print(f"No documents to index for {self.collection_name}.")
+            return
+        self.lexical_index = rebuild_lexical_index(
+            backend, lexical_index_path(self.persist_directory, self.collection_name)
+        )
+        print(f"Successfully indexed {stats['chunks']} chunks in collection: {self.collection_name}")
+
+    def retrieve(self, query, top_k=TOP_K, mode=None, rerank=None, mmr_lambda=None, filter=None):
+        backend = self._ensure_store()
+        mode = mode or RETRIEVAL_MODE
+        reranker = get_reranker() if (RERANK_ENABLED if rerank is None else rerank) else None
+        lexical_index = self._ensure_lexical_index() if mode == "hybrid" else None
+        return search_texts(
+            backend, query, top_k, mode=mode, lexical_index=lexical_index, filter=combine_filters(self.scope, filter),
+            reranker=reranker, mmr_lambda=mmr_lambda,
+        )
+
+    def retrieve_many(self, queries, top_k=TOP_K, filter=None):
+        """Batched dense retrieval; (text, distance) pairs per query."""
+        return search_many_texts(self._ensure_store(), queries, top_k, filter=combine_filters(self.scope, filter))
+
+    def count_matching(self, where=None):
+        """Number of chunks matching a `where` filter (all chunks when None)."""
+        backend = self._ensure_store()
+        return len(backend.get(where=where)["ids"]) if where else backend.count()
+
+    def _extra_info(self):
+        return {}
+
+    def get_collection_info(self):
+        """Get information about the current collection."""
+        info = {
+            "rag_type": self.rag_type,
+            "collection_name": self.collection_name,
+            "vector_backend": self.vector_backend,
+            "shards": get_collection_shards(self.collection_name),
+            "data_directory": self.data_dir,
+            "scope": self.scope,
+        }
+        try:
+            info["document_count"] = self._ensure_store().count()
+        except Exception as e:
+            info["document_count"] = 0
+            info["error"] = str(e)
+        info.update(self._extra_info())
+        return info
@@ -1,38 +1,65 @@
-import fitz, os , io, base64
+import json
+import os
+import time
 from langchain_core.documents import Document
-from transformers import CLIPProcessor, CLIPModel
 from PIL import Image
-import torch
-import numpy as np
-from langchain_community.vectorstores import FAISS
-from shared.configs.retriever_configs import get_retriever_config
 from dotenv import load_dotenv
-from shared.configs.static import MM_RAG_TYPE, CLIP_MODEL, CLIP_PROCESSOR
+from shared.configs.static import (
+    MM_RAG_TYPE,
+    CLIP_MODEL,
+    CLIP_PROCESSOR,
+    MM_IMAGE_DEDUP,
+    MM_PHASH_MAX_DISTANCE,
+)
+from shared.utils.similarity_utils import EmbeddingBuffer
+from shared.utils.embedding_utils import get_clip_encoder
+from shared.utils.image_utils import PerceptualHashIndex, ImageBlobStore
+from shared.utils.multimodal_indexing import run_multimodal_extraction
+from shared.utils.filter_utils import combine_filters
+from shared.utils.pdf_utils import list_pdf_files, document_metadata
+from shared.utils.vectorstore_utils import get_collection_shards
+from projects.retriever.base_retriever import BaseRetriever
 
 load_dotenv()
 
-class MultiModalRetriever:
+
+def image_store_path(persist_directory, collection_name):
+    """Image index and filtering stats saved next to a multi-modal collection."""
+    return os.path.join(persist_directory, "images", f"{collection_name}.json")
+
+
+def image_blob_path(persist_directory, collection_name):
+    """Raw image payload bytes (memory-mapped when loaded), located by the image index."""
+    return os.path.join(persist_directory, "images", f"{collection_name}.bin")
+
+
+class MultiModalRetriever(BaseRetriever):
     def __init__(self, data_dir, rag_type=MM_RAG_TYPE):
-        self.data_dir = data_dir
-        self.rag_type = rag_type
-        self.config = get_retriever_config(rag_type)
-        self.collection_name = self.config["collection_name"]
-        self.persist_directory = self.config["persist_directory"]
+        super().__init__(data_dir, rag_type)
+        # Vectors come from CLIP below, not from the text embedding model
+        self.embedding = None
+        self.images_path = image_store_path(self.persist_directory, self.collection_name)
+        self.image_blobs_path = image_blob_path(self.persist_directory, self.collection_name)
         
-        # Initialize CLIP model
-        self.clip_model = CLIPModel.from_pretrained(CLIP_MODEL)
-        self.clip_processor = CLIPProcessor.from_pretrained(CLIP_PROCESSOR)
-        self.clip_model.eval()
+        # Initialize CLIP encoder (torch or ONNX Runtime, see EMBEDDING_BACKEND)
+        self.clip = get_clip_encoder(CLIP_MODEL, CLIP_PROCESSOR)
         
         # Storage for documents and embeddings
         self.all_docs = []
-        self.all_embeddings = []
+        self.all_embeddings = EmbeddingBuffer()
+        # {image_id: {"mime", "data"}} while indexing, an ImageBlobStore once saved or loaded
         self.image_data_store = {}
-        self.vectorstore = self.config["vectorstore"]
         self.splitter = self.config["text_splitter"]
+
+        # Cross-document image de-duplication state and skip statistics
+        self._image_hashes = {}
+        self._image_phashes = PerceptualHashIndex(MM_PHASH_MAX_DISTANCE)
+        self._seen_xrefs = {}
+        self.image_stats = self._empty_image_stats()
         
         print(f"Initialized MultiModal Retriever for collection: {self.collection_name}")
         print(f"Data directory: {self.data_dir}")
+        self.load_index()
 
     def embed_image(self, image_data):
         """Embed image using CLIP"""
@@ -40,30 +67,67 @@ class MultiModalRetriever:
             image = Image.open(image_data).convert("RGB")
         else:  
             image = image_data
-        
-        inputs = self.clip_processor(images=image, return_tensors="pt")
-        with torch.no_grad():
-            features = self.clip_model.get_image_features(**inputs)
-            features = features / features.norm(dim=-1, keepdim=True)
-            return features.squeeze().numpy()
+        return self.clip.embed_images([image])[0]
     
     def embed_text(self, text):
         """Embed text using CLIP."""
-        inputs = self.clip_processor(
-            text=text, 
-            return_tensors="pt", 
-            padding=True,
-            truncation=True,
-            max_length=77  
-        )
-        with torch.no_grad():
-            features = self.clip_model.get_text_features(**inputs)
-            features = features / features.norm(dim=-1, keepdim=True)
-            return features.squeeze().numpy()
+        return self.clip.embed_texts([text])[0]
+
+    @staticmethod
+    def _empty_image_stats():
+        return {
+            "images_seen": 0,
+            "images_indexed": 0,
+            "skipped_repeated_xref": 0,
+            "skipped_too_small": 0,
+            "skipped_duplicate_content": 0,
+            "skipped_duplicate_phash": 0,
+            "errors": 0,
+        }
+
+    def _find_duplicate_image(self, digest, phash):
+        """Stat key for a previously indexed copy of this image, or None. Registers new images."""
+        if MM_IMAGE_DEDUP == "none":
+            return None
+        if digest in self._image_hashes:
+            return "skipped_duplicate_content"
+        self._image_hashes[digest] = True
+        if MM_IMAGE_DEDUP == "phash" and phash is not None:
+            if self._image_phashes.find(phash) is not None:
+                return "skipped_duplicate_phash"
+            self._image_phashes.add(phash)
+        return None
+
+    def _add_range_stats(self, range_stats):
+        for key, value in range_stats.items():
+            self.image_stats[key] += value
+
+    def _accept_item(self, pdf_path, item):
+        """Called in document/page order for every extracted item; keeps or drops it."""
+        if item["kind"] == "text":
+            return True
+        stats = self.image_stats
+        # Repeats inside one page range are dropped by the worker, repeats across ranges here
+        seen_xrefs = self._seen_xrefs.setdefault(pdf_path, set())
+        if item["xref"] in seen_xrefs:
+            stats["skipped_repeated_xref"] += 1
+            return False
+        seen_xrefs.add(item["xref"])
+        duplicate = self._find_duplicate_image(item["digest"], item["phash"])
+        if duplicate:
+            stats[duplicate] += 1
+            return False
+        stats["images_indexed"] += 1
+        return True
 
     def index_pdfs(self):
-        """Process PDFs and create embeddings for both text and images"""
-        print(f"Indexing multi-modal PDFs for collection: {self.collection_name}")
+        """Process PDFs and create embeddings for both text and images.
+
+        Page ranges are extracted by worker processes (MM_INDEX_WORKERS) and embedded
+        by a single CLIP batching stage; documents are added in PDF/page order, so the
+        index is the same whatever the worker timing.
+        """
+        print(f"Indexing multi-modal PDFs for collection: {self.collection_name} ({self.vector_backend})")
         
         
         if not os.path.exists(self.data_dir):
@@ -71,115 +135,144 @@ class MultiModalRetriever:
             return
         
         
-        pdf_files = [f for f in os.listdir(self.data_dir) if f.lower().endswith('.pdf')]
+        pdf_paths = list_pdf_files(self.data_dir)
         
-        if not pdf_files:
+        if not pdf_paths:
             print(f"No PDF files found in {self.data_dir}")
             return
         
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(self.data_dir, pdf_file)
-            print(f"Processing PDF: {pdf_file}")
-            self._process_single_pdf(pdf_path)
+        self.all_docs = []
+        self.all_embeddings = EmbeddingBuffer()
+        self.image_data_store = {}
+        self._image_hashes = {}
+        self._image_phashes = PerceptualHashIndex(MM_PHASH_MAX_DISTANCE)
+        self._seen_xrefs = {}
+        self.image_stats = self._empty_image_stats()
+        kept, embeddings = run_multimodal_extraction(pdf_paths, self.clip, self._accept_item, self._add_range_stats)
+        print("Image filtering: " + ", ".join(f"{k}={v}" for k, v in self.image_stats.items()))
+
+        ids = []
+        text_counts = {}
+        ingested_at = time.time()
+        for seq, (pdf_path, item) in enumerate(kept):
+            source = os.path.basename(pdf_path)
+            doc_stem = os.path.splitext(source)[0]
+            extra = document_metadata(pdf_path, ingested_at)
+            page = item["page"]
+            if item["kind"] == "text":
+                n = text_counts.get((pdf_path, page), 0)
+                text_counts[(pdf_path, page)] = n + 1
+                doc_id = f"{doc_stem}_page_{page}_text_{n}"
+                doc = Document(page_content=item["text"], metadata={"page": page, "type": "text", "source": source, **extra})
+            else:
+                doc_id = image_id = f"{doc_stem}_page_{page}_img_{item['img_index']}"
+                self.image_data_store[image_id] = {"mime": item["mime"], "data": item["data"]}
+                doc = Document(
+                    page_content=f"[Image: {image_id}]",
+                    metadata={"page": page, "type": "image", "image_id": image_id, "source": source, "caption": item["caption"], **extra}
+                )
+            ids.append(doc_id)
+            self.all_docs.append(doc)
+            self.all_embeddings.append(embeddings[seq])
         
         
-        if self.all_docs and self.all_embeddings:
-            embeddings_array = np.array(self.all_embeddings)
-            self.vector_store = FAISS.from_embeddings(
-                text_embeddings=[(doc.page_content, emb) for doc, emb in zip(self.all_docs, embeddings_array)],
-                embedding=None,  
-                metadatas=[doc.metadata for doc in self.all_docs]
+        if self.all_docs and len(self.all_embeddings):
+            backend = self._ensure_store()
+            backend.drop()
+            backend.add(
+                ids,
+                [doc.page_content for doc in self.all_docs],
+                self.all_embeddings.array(),
+                [doc.metadata for doc in self.all_docs],
             )
             print(f"Successfully indexed {len(self.all_docs)} documents (text + images) in collection: {self.collection_name}")
+            self.save_index()
         else:
             print("No documents to index")
 
-    def _process_single_pdf(self, pdf_path):
-        """Process a single PDF file for text and images"""
+    def save_index(self):
+        """Persist the vectors (on the configured backend), image payloads and filtering stats."""
+        self._ensure_store().persist()
+        os.makedirs(os.path.dirname(self.images_path), exist_ok=True)
+        index = ImageBlobStore.write(self.image_blobs_path, self.image_data_store)
+        tmp_path = self.images_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"images": index, "image_stats": self.image_stats}, f)
+        os.replace(tmp_path, self.images_path)
+        self.image_data_store = ImageBlobStore.open(self.image_blobs_path, index)
+        print(f"Saved multi-modal index for {self.collection_name} ({self.vector_backend})")
+
+    def load_index(self):
+        """Load a previously saved index, if any. Returns True when one was loaded."""
         try:
-            doc = fitz.open(pdf_path)
-            
-            for i, page in enumerate(doc):
-                # Process text
-                text = page.get_text()
-                if text.strip():
-                    temp_doc = Document(page_content=text, metadata={"page": i, "type": "text", "source": pdf_path})
-                    text_chunks = self.splitter.split_documents([temp_doc])
-                    
-                    for chunk in text_chunks:
-                        embedding = self.embed_text(chunk.page_content)
-                        self.all_embeddings.append(embedding)
-                        self.all_docs.append(chunk)
-                
-                # Process images
-                for img_index, img in enumerate(page.get_images(full=True)):
-                    try:
-                        xref = img[0]
-                        base_image = doc.extract_image(xref)
-                        image_bytes = base_image["image"]
-                        
-                        # Convert to PIL Image
-                        pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-                        
-                        # Create unique identifier
-                        image_id = f"page_{i}_img_{img_index}"
-                        
-                        # Store image as base64 for later use with GPT-4V
-                        buffered = io.BytesIO()
-                        pil_image.save(buffered, format="PNG")
-                        img_base64 = base64.b64encode(buffered.getvalue()).decode()
-                        self.image_data_store[image_id] = img_base64
-                        
-                        # Embed image using CLIP
-                        embedding = self.embed_image(pil_image)
-                        self.all_embeddings.append(embedding)
-                        
-                        # Create document for image
-                        image_doc = Document(
-                            page_content=f"[Image: {image_id}]",
-                            metadata={"page": i, "type": "image", "image_id": image_id, "source": pdf_path}
-                        )
-                        self.all_docs.append(image_doc)
-                        
-                    except Exception as e:
-                        print(f"Error processing image {img_index} on page {i}: {e}")
-                        continue
-            
-            doc.close()
+            backend = self._ensure_store()
+            if not backend.count() or not os.path.exists(self.images_path):
+                return False
+            with open(self.images_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            images = payload["images"]
+            if any(isinstance(entry, dict) for entry in images.values()):
+                # Saved before image payloads moved to the blob file
+                image_data_store = images
+            else:
+                image_data_store = ImageBlobStore.open(self.image_blobs_path, images)
+            stored = backend.get()
         except Exception as e:
-            print(f"Error processing PDF {pdf_path}: {e}")
+            print(f"Could not load multi-modal index for {self.collection_name}: {e}")
+            return False
+        self.image_data_store = image_data_store
+        self.image_stats = payload.get("image_stats", self._empty_image_stats())
+        self.all_docs = [
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(stored["documents"], stored["metadatas"])
+        ]
+        print(f"Loaded multi-modal index with {len(self.all_docs)} documents ({self.vector_backend})")
+        return True
 
-    def retrieve(self, query, top_k=5):
-        """Unified retrieval using CLIP embeddings for both text and images."""
-        if self.vector_store is None:
+    def _is_indexed(self):
+        if not self.all_docs:
             print("Vector store not initialized. Please run index_pdfs() first.")
+            return False
+        return True
+
+    def retrieve(self, query, top_k=5, filter=None):
+        """Unified retrieval using CLIP embeddings for both text and images."""
+        if not self._is_indexed():
             return []
-        
-        
-        query_embedding = self.embed_text(query)
-        
-        
-        results = self.vector_store.similarity_search_by_vector(
-            embedding=query_embedding,
-            k=top_k
-        )
-        
-        return results
+        hits = self._ensure_store().search(self.embed_text(query), top_k, combine_filters(self.scope, filter))
+        return [doc for doc, _ in hits]
+
+    def retrieve_many(self, queries, top_k=5, filter=None):
+        """Batched retrieval: one CLIP pass for all queries and one backend search; (Document, distance) pairs per query."""
+        if not self._is_indexed():
+            return [[] for _ in queries]
+        if not queries:
+            return []
+        return self._ensure_store().search_batch(self.clip.embed_texts(list(queries)), top_k, combine_filters(self.scope, filter))
 
     def get_collection_info(self):
         """Get information about the current collection."""
         return {
             "collection_name": self.collection_name,
+            "vector_backend": self.vector_backend,
+            "shards": get_collection_shards(self.collection_name),
             "document_count": len(self.all_docs),
             "text_documents": len([doc for doc in self.all_docs if doc.metadata.get("type") == "text"]),
             "image_documents": len([doc for doc in self.all_docs if doc.metadata.get("type") == "image"]),
             "rag_type": self.rag_type,
-            "vector_store_initialized": self.vector_store is not None,
-            "data_directory": self.data_dir
+            "vector_store_initialized": bool(self.all_docs),
+            "image_stats": self.image_stats,
+            "data_directory": self.data_dir,
+            "scope": self.scope,
         }
 
     def get_image_data(self, image_id):
         """Get base64 image data for a specific image ID."""
+        payload = self.image_data_store.get(image_id)
+        return payload["data"] if payload else None
+
+    def get_image_payload(self, image_id):
+        """Get {"mime", "data"} of the stored image derivative for a specific image ID."""
         return self.image_data_store.get(image_id)
 
 if __name__ == "__main__":
@@ -1,21 +1,16 @@
-import os, fitz
-from langchain_chroma import Chroma
+import os
+from langchain_core.documents import Document
 from dotenv import load_dotenv
-from shared.configs.retriever_configs import get_retriever_config
+from shared.utils.pdf_utils import stream_pdf_chunks
 from shared.configs.static import FILE_ACCESS_METADATA, VALID_ROLES, RAG_UBAC_TYPE
+from shared.utils.filter_utils import combine_filters
+from projects.retriever.base_retriever import BaseRetriever
 
 load_dotenv()
 
-class RAGUBACRetriever:
+class RAGUBACRetriever(BaseRetriever):
     def __init__(self, data_dir, rag_type=RAG_UBAC_TYPE):
-        self.data_dir = data_dir
-        self.rag_type = rag_type
-        self.config = get_retriever_config(rag_type)
-        self.embedding = self.config["embedding"]
-        self.text_splitter = self.config["text_splitter"]
-        self.persist_directory = self.config["persist_directory"]
-        self.vectorstore = None
-        self.collection_name = self.config["collection_name"]
+        super().__init__(data_dir, rag_type)
 
     def _get_access_levels_for_role(self, role: str):
         """Determine which documents a role can access based on hierarchy."""
@@ -44,74 +39,26 @@ class RAGUBACRetriever:
             return ["executive", "hr", "junior"]
         return ["executive"]
 
-    def index_pdfs(self):
-        """Index PDFs with metadata based on FILE_ACCESS_METADATA."""
-        print(f"Indexing PDFs for UBAC collection: {self.collection_name}")
-        docs = []
-        
-        for filename in os.listdir(self.data_dir):
-            if not filename.lower().endswith(".pdf"):
-                continue
-                
-            pdf_path = os.path.join(self.data_dir, filename)
-            
-            if filename not in FILE_ACCESS_METADATA:
-                print(f"Warning: {filename} not found in FILE_ACCESS_METADATA, defaulting to executive-only access")
-                base_access = "executive"
-            else:
-                base_access = FILE_ACCESS_METADATA[filename]
-            
-            try:
-                doc = fitz.open(pdf_path)
-                text = ""
-                for page in doc:
-                    text += page.get_text()
-                doc.close()
-            except Exception as e:
-                print(f"Failed to read {pdf_path}: {e}")
-                continue
-
-            # Create metadata for each chunk
-            allowed_roles = self._allowed_roles_for_file(filename)
-            print(allowed_roles)
-            
-            for role in allowed_roles:
-                metadatas = [{
-                    "source": filename, 
-                    "base_access_level": base_access,
-                    "access_role": role,
-                    "file_type": "pdf"
-                }]
-                
-                chunks = self.text_splitter.create_documents([text], metadatas=metadatas)
-                docs.extend(chunks)
-
-        if not docs:
-            print("No documents to index for UBAC.")
-            return
+    def _chunk_pdf(self, pdf_path):
+        """Chunks of one PDF, one copy per role allowed to read the file."""
+        filename = os.path.basename(pdf_path)
+        if filename not in FILE_ACCESS_METADATA:
+            print(f"Warning: {filename} not found in FILE_ACCESS_METADATA, defaulting to executive-only access")
+            base_access = "executive"
+        else:
+            base_access = FILE_ACCESS_METADATA[filename]
 
-        self.vectorstore = Chroma.from_documents(
-            docs,
-            self.embedding,
-            persist_directory=self.persist_directory,
-            collection_name=self.collection_name
-        )
-        print(f"Successfully indexed {len(docs)} chunks in UBAC collection: {self.collection_name}")
-        # print(f"Access levels: {FILE_ACCESS_METADATA}")
+        # Create metadata for each chunk
+        allowed_roles = self._allowed_roles_for_file(filename)
+        print(allowed_roles)
 
-    def _ensure_store(self):
-        """Ensure vectorstore is loaded."""
-        if self.vectorstore is None:
-            print(f"Loading existing vector store for UBAC collection: {self.collection_name}")
-            self.vectorstore = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embedding,
-                collection_name=self.collection_name
-            )
+        metadata = {"base_access_level": base_access, "file_type": "pdf"}
+        for chunk in stream_pdf_chunks(pdf_path, metadata=metadata):
+            for role in allowed_roles:
+                yield Document(page_content=chunk.page_content, metadata={**chunk.metadata, "access_role": role})
 
-    def retrieve(self, query, role: str, top_k=3):
+    def retrieve(self, query, role: str, top_k=3, mode=None, rerank=None, mmr_lambda=None, filter=None):
         """Retrieve documents based on role-based access control."""
-        self._ensure_store()
         role = (role or "").lower().strip()
         
         if role not in VALID_ROLES:
@@ -123,37 +70,34 @@ class RAGUBACRetriever:
             print(f"Role '{role}' has no access to any documents.")
             return []
         
-        chroma_filter = {"access_role": {"$eq": role}}
+        chroma_filter = combine_filters({"access_role": {"$eq": role}}, filter)
         
         try:
-            docs = self.vectorstore.similarity_search(query, k=top_k, filter=chroma_filter)
-            # retrieved_sources = set(doc.metadata.get("source", "") for doc in docs)
-            return [doc.page_content for doc in docs]
+            # The role filter applies to both the dense and the lexical side of hybrid search
+            return super().retrieve(query, top_k, mode=mode, rerank=rerank, mmr_lambda=mmr_lambda, filter=chroma_filter)
         except Exception as e:
             print(f"Error during retrieval: {e}")
             return []
 
-    def get_collection_info(self):
-        """Get information about the current collection."""
-        self._ensure_store()
+    def retrieve_many(self, queries, role: str, top_k=3, filter=None):
+        """Batched dense retrieval for several queries under one role; (text, distance) pairs per query."""
+        role = (role or "").lower().strip()
+        if role not in VALID_ROLES:
+            print(f"Unknown role '{role}'. Valid roles are: {VALID_ROLES}")
+            return [[] for _ in queries]
+
+        chroma_filter = combine_filters({"access_role": {"$eq": role}}, filter)
         try:
-            count = self.vectorstore._collection.count()
-            return {
-                "collection_name": self.collection_name,
-                "document_count": count,
-                "rag_type": self.rag_type,
-                "file_access_metadata": FILE_ACCESS_METADATA,
-                "valid_roles": list(VALID_ROLES)
-            }
+            return super().retrieve_many(queries, top_k, filter=chroma_filter)
         except Exception as e:
-            return {
-                "collection_name": self.collection_name,
-                "document_count": 0,
-                "rag_type": self.rag_type,
-                "error": str(e),
-                "file_access_metadata": FILE_ACCESS_METADATA,
-                "valid_roles": list(VALID_ROLES)
-            }
+            print(f"Error during retrieval: {e}")
+            return [[] for _ in queries]
+
+    def _extra_info(self):
+        return {
+            "file_access_metadata": FILE_ACCESS_METADATA,
+            "valid_roles": list(VALID_ROLES)
+        }
 
     def get_role_access_info(self, role: str):
         """Get information about what documents a specific role can access."""
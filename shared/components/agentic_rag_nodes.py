@@ -1,12 +1,97 @@
-from typing import Any, Dict, Literal
-from shared.components.agentic_rag_states import AgentState, RelevanceGrade
+import re
+import time
+from typing import Any, Dict, Literal, Optional
+from shared.components.agentic_rag_states import AgentState, RelevanceGrade, RouteDecision
+from shared.components.agentic_router import route_tool_call
+from shared.configs.static import AGENTIC_GRADE_RELEVANT_THRESHOLD, AGENTIC_GRADE_IRRELEVANT_THRESHOLD
+from shared.utils.similarity_utils import max_cosine_similarity
 from langchain.prompts import PromptTemplate
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 from langchain_core.output_parsers import StrOutputParser
 
+def usage_tokens(message: Any) -> int:
+    """Total LLM tokens reported on a chat response (0 when the provider reports none)."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    total = usage.get("total_tokens")
+    if total is None:
+        token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+        total = token_usage.get("total_tokens", 0)
+    return int(total or 0)
+
+
+ALL_BUDGETS = ("rewrites", "tool_calls", "llm_tokens", "deadline")
+# Budgets checked before an LLM call: running out of rewrites or tool calls
+# only matters once the loop would go round again
+LLM_CALL_BUDGETS = ("llm_tokens", "deadline")
+
+
+def deadline_remaining(self, state: AgentState) -> Optional[float]:
+    """Seconds left before the request deadline, or None when no deadline applies."""
+    budget = getattr(self, "budget", None)
+    started_at = state.get("started_at")
+    if budget is None or started_at is None:
+        return None
+    return budget.deadline_seconds - (time.monotonic() - started_at)
+
+
+def budget_exhausted(self, state: AgentState, budgets=ALL_BUDGETS) -> str:
+    """Name of the first of `budgets` with no room left, or "" while within budget."""
+    budget = getattr(self, "budget", None)
+    if budget is None:
+        return ""
+    if "rewrites" in budgets and state.get("rewrites", 0) >= budget.max_rewrites:
+        return "rewrites"
+    if "tool_calls" in budgets and state.get("tool_calls", 0) >= budget.max_tool_calls:
+        return "tool_calls"
+    if "llm_tokens" in budgets and state.get("llm_tokens", 0) >= budget.max_llm_tokens:
+        return "llm_tokens"
+    remaining = deadline_remaining(self, state)
+    if "deadline" in budgets and remaining is not None and remaining <= 0:
+        return "deadline"
+    return ""
+
+
+def latest_tool_output(messages) -> str:
+    """Merge the successful ToolMessages answering the most recent agent turn, in call order."""
+    outputs = []
+    for message in reversed(messages):
+        if not isinstance(message, ToolMessage):
+            break
+        if getattr(message, "status", "success") != "error":
+            outputs.append(str(message.content))
+    return "\n\n".join(reversed(outputs))
+
+
+def route(self, state: AgentState) -> Dict[str, Any]:
+    """Dispatch obvious intents straight to a tool, bypassing the agent LLM call."""
+    messages = state["messages"]
+    question = messages[0].content if messages else ""
+    router = getattr(self, "router", None)
+    decision = router.route(question) if router is not None else RouteDecision(target="agent", method="none")
+    print(f"--- _route --- {decision.target} via {decision.method} (tool: {decision.tool}, confidence: {decision.confidence})")
+
+    update: Dict[str, Any] = {"route": decision.model_dump()}
+    if decision.target == "tool":
+        update["messages"] = [AIMessage(content="", tool_calls=[route_tool_call(decision)])]
+    return update
+
+
+def route_after_router(state: AgentState) -> Literal["retrieve", "agent"]:
+    """Conditional edge following route."""
+    return "retrieve" if (state.get("route") or {}).get("target") == "tool" else "agent"
+
+
 def agent(self, state: AgentState) -> Dict[str, Any]:
-    """Decide next action using the model; binds tools for ReAct."""
+    """Decide next action using the model; binds tools for ReAct.
+
+    The model is not called once the deadline or token budget is spent; the
+    graph then generates from the best context gathered so far.
+    """
     messages = state["messages"]
+    exhausted = budget_exhausted(self, state, LLM_CALL_BUDGETS)
+    if exhausted:
+        print(f"--- agent --- budget exhausted ({exhausted}); generating from best context")
+        return {"budget_exhausted": exhausted}
 
     sys = SystemMessage(content=(
         "You are restricted to three capabilities only:\n"
@@ -26,48 +111,180 @@ def agent(self, state: AgentState) -> Dict[str, Any]:
         except Exception:
             pass
 
-    return {"messages": [response]}
+    return {"messages": [response], "llm_tokens": state.get("llm_tokens", 0) + usage_tokens(response)}
 
 
-def grade_documents(self, state: AgentState) -> Literal["generate", "rewrite"]:
-    """Check if retrieved docs are relevant to the question using Pydantic-validated output."""
-    print("--- _grade_documents ---")
+def route_after_agent(state: AgentState) -> Literal["retrieve", "generate", "restricted"]:
+    """Conditional edge following agent: run the tool calls, generate on an exhausted budget, else refuse."""
+    if state.get("budget_exhausted"):
+        return "generate"
+    last_message = state["messages"][-1] if state.get("messages") else None
+    return "retrieve" if getattr(last_message, "tool_calls", None) else "restricted"
 
-    grader = self.llm.with_structured_output(RelevanceGrade)
-    prompt = PromptTemplate(
-        template=(
-            "You are a grader assessing relevance of a retrieved document to a user question.\n"
-            "Here is the retrieved document: \n\n{context}\n\n"
-            "Here is the user question: {question}\n"
-            "If the document contains keyword(s) or semantic meaning related to the user question,"
-            " grade it as relevant. Give a binary score 'yes' or 'no'."
-        ),
-        input_variables=["context", "question"],
-    )
 
-    print(f"_grade documents prompt: {prompt}")
+def retrieve(self, state: AgentState) -> Dict[str, Any]:
+    """Execute the agent's tool calls concurrently, capped by the remaining tool-call budget.
+
+    No call waits past the request deadline. Repeated calls (e.g. the same
+    retriever query after a rewrite) are answered from the per-request memo
+    kept in graph state.
+    """
+    last_message = state["messages"][-1]
+    calls = list(getattr(last_message, "tool_calls", None) or [])
+    budget = getattr(self, "budget", None)
+    if budget is not None:
+        remaining = max(budget.max_tool_calls - state.get("tool_calls", 0), 0)
+    else:
+        remaining = len(calls)
+    time_left = deadline_remaining(self, state)
+    reason = "tool-call budget exhausted"
+    if time_left is not None and time_left <= 0:
+        remaining, reason = 0, "deadline reached"
+    allowed, skipped = calls[:remaining], calls[remaining:]
+
+    memo = dict(state.get("tool_memo") or {})
+    results = self.tool_runner.run(allowed, memo=memo, deadline=time_left) if allowed else []
+    cache_hits = sum(1 for m in results if m.response_metadata.get("cache"))
+    # Every tool call needs a matching ToolMessage, even when it is not executed
+    for call in skipped:
+        results.append(ToolMessage(
+            content=f"Tool call skipped: {reason}.",
+            tool_call_id=call["id"],
+            name=call["name"],
+            status="error",
+        ))
+    return {
+        "messages": results,
+        "tool_calls": state.get("tool_calls", 0) + len(allowed),
+        "tool_memo": memo,
+        "tool_cache_hits": state.get("tool_cache_hits", 0) + cache_hits,
+        "tool_cache_lookups": state.get("tool_cache_lookups", 0) + len(allowed),
+    }
+
+
+GRADE_DOCUMENTS_PROMPT = PromptTemplate(
+    template=(
+        "You are a grader assessing relevance of a retrieved document to a user question.\n"
+        "Here is the retrieved document: \n\n{context}\n\n"
+        "Here is the user question: {question}\n"
+        "If the document contains keyword(s) or semantic meaning related to the user question,"
+        " grade it as relevant. Give a binary score 'yes' or 'no'."
+    ),
+    input_variables=["context", "question"],
+)
+
+# Tool outputs are lists of "[1] ..." retriever hits or "- title" search results;
+# grading each item separately keeps long outputs within the embedding model's window.
+_TOOL_OUTPUT_ITEM_SPLIT = re.compile(r"\n(?=\[\d+\] |- )")
+_MAX_GRADED_ITEMS = 10
+
+
+def _get_grader_chain(self):
+    """Build the structured-output LLM grader once per pipeline instance.
+
+    The raw response is kept alongside the parsed grade so its tokens can be counted.
+    """
+    chain = getattr(self, "_grader_chain", None)
+    if chain is None:
+        chain = GRADE_DOCUMENTS_PROMPT | self.llm.with_structured_output(RelevanceGrade, include_raw=True)
+        self._grader_chain = chain
+    return chain
+
+
+def embedding_relevance(self, question: str, docs_content: str) -> Optional[float]:
+    """Score tool output against the question with the pipeline's embedding model.
+
+    Returns the best cosine similarity over the individual items of the tool output,
+    or None when no embedding model is available or there is nothing to compare.
+    """
+    embedding = getattr(self, "embedding", None)
+    if embedding is None or not question.strip() or not docs_content.strip():
+        return None
 
-    chain = prompt | grader
+    items = [c.strip() for c in _TOOL_OUTPUT_ITEM_SPLIT.split(docs_content) if c.strip()]
+    items = items[:_MAX_GRADED_ITEMS]
+    try:
+        query_vec = embedding.embed_query(question)
+        item_vecs = embedding.embed_documents(items)
+    except Exception as e:
+        print(f"_grade documents embedding error: {e}")
+        return None
+    return max_cosine_similarity(query_vec, item_vecs)
+
+
+def grade_documents(self, state: AgentState) -> Dict[str, Any]:
+    """Check if retrieved docs are relevant to the question and record the decision.
+
+    Clearly relevant or irrelevant tool output is decided locally from embedding
+    similarity; only scores inside the ambiguous band go to the Pydantic-validated
+    LLM grader. When a rewrite is called for but the request budget is spent, the
+    decision is switched to "generate" from the best context seen so far.
+    """
+    print("--- _grade_documents ---")
 
     messages = state["messages"]
     question = messages[0].content if messages else ""
-    # print(f"DEBUG: grade documents question: {question}")
-    last_message = messages[-1] if messages else None
-    # print(f"DEBUG: grade documents last message: {last_message}")
-    docs_content = getattr(last_message, "content", "") if last_message else ""
-    # print(f"DEBUG: grade documents content: {docs_content}")
+    docs_content = latest_tool_output(messages)
+    exhausted = budget_exhausted(self, state)
+
+    decision = None
+    tokens = 0
+    score = embedding_relevance(self, question, docs_content)
+    if score is not None:
+        upper = getattr(self, "grade_relevant_threshold", AGENTIC_GRADE_RELEVANT_THRESHOLD)
+        lower = getattr(self, "grade_irrelevant_threshold", AGENTIC_GRADE_IRRELEVANT_THRESHOLD)
+        print(f"_grade documents embedding similarity: {score:.3f} (thresholds: {lower}/{upper})")
+        if score >= upper:
+            decision = "generate"
+        elif score < lower:
+            decision = "rewrite"
+
+    if decision is None and exhausted:
+        # No budget left to act on the grade, so skip the LLM grader round-trip
+        decision = "rewrite"
+    elif decision is None:
+        chain = _get_grader_chain(self)
+        result = chain.invoke({"question": question, "context": docs_content})
+        tokens = usage_tokens(result.get("raw"))
+        scored = result.get("parsed")
+        binary_score = ((scored.binary_score if scored is not None else "") or "").strip().lower()
+        print(f"_grade documents score: {binary_score}")
+        decision = "generate" if binary_score == "yes" else "rewrite"
+        if score is None:
+            score = 1.0 if decision == "generate" else 0.0
+
+    update: Dict[str, Any] = {"grade": decision}
+    if tokens:
+        update["llm_tokens"] = state.get("llm_tokens", 0) + tokens
+    score = score if score is not None else 0.0
+    if docs_content and score >= state.get("best_score", float("-inf")):
+        update["best_context"] = docs_content
+        update["best_score"] = score
+
+    if decision == "rewrite" and exhausted:
+        print(f"_grade documents budget exhausted ({exhausted}); generating from best context")
+        update["grade"] = "generate"
+        update["budget_exhausted"] = exhausted
+    return update
+
+
+def route_after_grade(state: AgentState) -> Literal["generate", "rewrite"]:
+    """Conditional edge following grade_documents."""
+    return "generate" if state.get("grade") == "generate" else "rewrite"
+
 
-    scored = chain.invoke({"question": question, "context": docs_content})
-    score = (scored.binary_score or "").strip().lower()
-    print(f"_grade documents score: {score}")
-    return "generate" if score == "yes" else "rewrite"
+def route_after_rewrite(state: AgentState) -> Literal["agent", "generate"]:
+    """Conditional edge following rewrite."""
+    return "generate" if state.get("budget_exhausted") else "agent"
 
 
 def generate(self, state: AgentState) -> Dict[str, Any]:
     """RAG answer generation from docs and question."""
     messages = state["messages"]
     question = messages[0].content if messages else ""
-    docs_content = getattr(messages[-1], "content", "") if messages else ""
+    docs_content = latest_tool_output(messages)
+    if state.get("budget_exhausted"):
+        docs_content = state.get("best_context") or docs_content
 
     prompt = PromptTemplate(
         template=(
@@ -78,14 +295,21 @@ def generate(self, state: AgentState) -> Dict[str, Any]:
         input_variables=["context", "question"],
     )
     
-    chain = prompt | self.llm | StrOutputParser()
+    chain = prompt | self.llm
     response = chain.invoke({"context": docs_content, "question": question})
-    return {"messages": [AIMessage(content=response)]}
+    return {
+        "messages": [AIMessage(content=StrOutputParser().invoke(response))],
+        "llm_tokens": state.get("llm_tokens", 0) + usage_tokens(response),
+    }
 
 def rewrite(self, state: AgentState) -> Dict[str, Any]:
-    """Rewrite the question to improve retrieval."""
+    """Rewrite the question to improve retrieval, unless the deadline or token budget is spent."""
     messages = state["messages"]
     question = messages[0].content if messages else ""
+    exhausted = budget_exhausted(self, state, LLM_CALL_BUDGETS)
+    if exhausted:
+        print(f"--- rewrite --- budget exhausted ({exhausted}); generating from best context")
+        return {"budget_exhausted": exhausted}
 
     rewrite_prompt = (
         "Look at the input and reason about the underlying semantic intent/meaning.\n"
@@ -95,4 +319,8 @@ def rewrite(self, state: AgentState) -> Dict[str, Any]:
     )
 
     response = self.llm.invoke([HumanMessage(content=rewrite_prompt)])
-    return {"messages": [response]}
+    return {
+        "messages": [response],
+        "rewrites": state.get("rewrites", 0) + 1,
+        "llm_tokens": state.get("llm_tokens", 0) + usage_tokens(response),
+    }
@@ -1,11 +1,51 @@
 from typing_extensions import TypedDict
-from typing import Annotated, Sequence
+from typing import Annotated, Any, Dict, List, Optional, Sequence
 from pydantic import BaseModel, Field, confloat, conint, constr
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
+from shared.configs.static import (
+    AGENTIC_MAX_REWRITES,
+    AGENTIC_MAX_TOOL_CALLS,
+    AGENTIC_DEADLINE_SECONDS,
+    AGENTIC_MAX_LLM_TOKENS,
+)
 
-class AgentState(TypedDict):
+class AgentState(TypedDict, total=False):
     messages: Annotated[Sequence[BaseMessage], add_messages]
+    # Budget accounting (see AgentBudget)
+    started_at: float
+    rewrites: int
+    tool_calls: int
+    llm_tokens: int
+    budget_exhausted: str
+    # Per-request tool result memo (normalised tool call -> output) and its counters
+    tool_memo: dict
+    tool_cache_hits: int
+    tool_cache_lookups: int
+    # Pre-agent router decision (RouteDecision as a dict)
+    route: dict
+    # Grading outcome and the most relevant tool output seen so far
+    grade: str
+    best_context: str
+    best_score: float
+
+
+class AgentBudget(BaseModel):
+    """Per-request ceilings for the agent -> retrieve -> grade -> rewrite loop."""
+    max_rewrites: conint(ge=0) = AGENTIC_MAX_REWRITES  # type: ignore
+    max_tool_calls: conint(ge=1) = AGENTIC_MAX_TOOL_CALLS  # type: ignore
+    deadline_seconds: confloat(gt=0) = AGENTIC_DEADLINE_SECONDS  # type: ignore
+    max_llm_tokens: conint(ge=1) = AGENTIC_MAX_LLM_TOKENS  # type: ignore
+
+
+class RouteDecision(BaseModel):
+    """Outcome of the pre-agent router: dispatch a tool directly or defer to the LLM agent."""
+    target: str = Field(description="'tool' to dispatch directly, 'agent' to fall through")
+    method: str = Field(description="'pattern', 'embedding' or 'none'")
+    tool: Optional[str] = None
+    args: Dict[str, Any] = Field(default_factory=dict)
+    confidence: float = 0.0
+    scores: Dict[str, float] = Field(default_factory=dict)
 
 
 class RelevanceGrade(BaseModel):
@@ -28,3 +68,5 @@ class AgenticRetrieverInput(BaseModel):
     """Input schema for the resume retriever tool."""
     query: constr(min_length=1)  # type: ignore
     top_k: conint(ge=1, le=20) = 5  # type: ignore
+    sources: Optional[List[str]] = Field(default=None, description="Only search these files (file names, e.g. 'resume.pdf')")
+    tags: Optional[List[str]] = Field(default=None, description="Only search documents carrying all of these tags")
@@ -0,0 +1,113 @@
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+from shared.components.agentic_rag_states import RouteDecision
+from shared.configs.static import (
+    AGENTIC_ROUTER_EXEMPLARS,
+    AGENTIC_ROUTER_MIN_SIMILARITY,
+    AGENTIC_ROUTER_MIN_MARGIN,
+)
+from shared.utils.similarity_utils import cosine_similarity_matrix, normalize_rows
+
+# Common ISO 4217 codes; three-letter words outside this set are not treated as currencies
+CURRENCY_CODES = frozenset({
+    "AED", "ARS", "AUD", "BDT", "BRL", "CAD", "CHF", "CLP", "CNY", "COP", "CZK", "DKK",
+    "EGP", "EUR", "GBP", "HKD", "HUF", "IDR", "ILS", "INR", "JPY", "KES", "KRW", "KWD",
+    "LKR", "MXN", "MYR", "NGN", "NOK", "NPR", "NZD", "PHP", "PKR", "PLN", "QAR", "RON",
+    "RUB", "SAR", "SEK", "SGD", "THB", "TRY", "TWD", "UAH", "USD", "VND", "ZAR",
+})
+
+# "convert 100 EUR to INR", "what is 1.5 usd in nzd", "250 GBP -> JPY"
+_CURRENCY_PATTERN = re.compile(
+    r"(?P<amount>\d+(?:,\d{3})*(?:\.\d+)?)\s*(?P<from>[A-Za-z]{3})\s+(?:to|in|into|->)\s+(?P<to>[A-Za-z]{3})\b",
+    re.IGNORECASE,
+)
+
+
+def extract_currency_conversion(question: str) -> Optional[Dict[str, Any]]:
+    """Arguments for currency_convert when the question is an explicit conversion, else None."""
+    match = _CURRENCY_PATTERN.search(question)
+    if not match:
+        return None
+    from_currency, to_currency = match.group("from").upper(), match.group("to").upper()
+    if from_currency not in CURRENCY_CODES or to_currency not in CURRENCY_CODES:
+        return None
+    amount = float(match.group("amount").replace(",", ""))
+    if amount <= 0:
+        return None
+    return {"amount": amount, "from_currency": from_currency, "to_currency": to_currency}
+
+
+class AgenticRouter:
+    """Cheap pre-agent router that dispatches obvious intents without an LLM call.
+
+    Currency conversions are recognised by pattern; other questions are compared
+    against per-tool exemplar questions with the embedding model. Only a confident
+    decision (high similarity and a clear margin over the runner-up tool) bypasses
+    the agent.
+    """
+
+    def __init__(
+        self,
+        embedding: Any,
+        tool_names: Sequence[str],
+        exemplars: Optional[Dict[str, List[str]]] = None,
+        min_similarity: float = AGENTIC_ROUTER_MIN_SIMILARITY,
+        min_margin: float = AGENTIC_ROUTER_MIN_MARGIN,
+    ):
+        self.embedding = embedding
+        self.tool_names = set(tool_names)
+        exemplars = exemplars if exemplars is not None else AGENTIC_ROUTER_EXEMPLARS
+        self.exemplars = {name: qs for name, qs in exemplars.items() if name in self.tool_names and qs}
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self._exemplar_vectors = None
+
+    def _ensure_exemplar_vectors(self):
+        # Embedded once, on first use, so constructing the pipeline stays cheap
+        if self._exemplar_vectors is None:
+            self._exemplar_vectors = {
+                name: normalize_rows(self.embedding.embed_documents(qs))
+                for name, qs in self.exemplars.items()
+            }
+        return self._exemplar_vectors
+
+    def route(self, question: str) -> RouteDecision:
+        if "currency_convert" in self.tool_names:
+            args = extract_currency_conversion(question)
+            if args is not None:
+                return RouteDecision(target="tool", method="pattern", tool="currency_convert", args=args, confidence=1.0)
+
+        if self.embedding is None or not self.exemplars or not question.strip():
+            return RouteDecision(target="agent", method="none")
+
+        try:
+            exemplar_vectors = self._ensure_exemplar_vectors()
+            query_vec = self.embedding.embed_query(question)
+        except Exception as e:
+            print(f"Router embedding error: {e}")
+            return RouteDecision(target="agent", method="none")
+
+        scores = {
+            name: float(cosine_similarity_matrix([query_vec], vectors).max())
+            for name, vectors in exemplar_vectors.items()
+        }
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        best_tool, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        scores = {name: round(score, 4) for name, score in scores.items()}
+        if best_score >= self.min_similarity and best_score - runner_up >= self.min_margin:
+            return RouteDecision(
+                target="tool",
+                method="embedding",
+                tool=best_tool,
+                args={"query": question},
+                confidence=round(best_score, 4),
+                scores=scores,
+            )
+        return RouteDecision(target="agent", method="embedding", confidence=round(best_score, 4), scores=scores)
+
+
+def route_tool_call(decision: RouteDecision) -> Dict[str, Any]:
+    """Tool call in the shape an LLM agent would emit it."""
+    return {"name": decision.tool, "args": dict(decision.args), "id": f"router_{uuid.uuid4().hex[:12]}"}
@@ -0,0 +1,205 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from langchain_core.messages import ToolMessage
+from shared.configs.static import (
+    AGENTIC_TOOL_MAX_WORKERS,
+    AGENTIC_TOOL_TIMEOUTS,
+    AGENTIC_TOOL_DEFAULT_TIMEOUT,
+    AGENTIC_TOOL_SHARED_CACHE_TTLS,
+)
+from shared.utils.cache_utils import TTLCache
+
+# Tools report failures as strings such as "SerpAPI error: ..." or "Retriever error: ..."
+_ERROR_OUTPUT = re.compile(r"^\s*[\w ]*error:", re.IGNORECASE)
+
+
+# Free-text arguments where case and spacing do not change the answer; anything else
+# (file names, currencies, ids) is compared as given
+_FREE_TEXT_ARGS = frozenset({"query"})
+
+
+def _normalize_arg(name: str, value: Any) -> Any:
+    if isinstance(value, str) and name in _FREE_TEXT_ARGS:
+        return " ".join(value.lower().split())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class _Started:
+    """Set by a worker thread when it picks up a call."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.at: Optional[float] = None
+
+
+class ToolRunner:
+    """Executes the tool calls of a single agent turn concurrently.
+
+    Calls are dispatched to a bounded thread pool (the built-in tools are blocking
+    HTTP / vector-store calls), each call gets its own timeout, and the resulting
+    ToolMessages are returned in the order the agent issued the calls. A timeout
+    counts from when the call starts running; a call queued behind `max_workers`
+    busy workers waits at most its timeout for one. Call `close()` when done.
+
+    Results are memoised by normalised tool name + arguments: in the per-request
+    `memo` dict passed to `run`, and, for deterministic tools listed in
+    `shared_cache_ttls`, in a short-lived cache shared across requests. Messages
+    served from a cache carry `response_metadata["cache"]` ("request" or "shared").
+    `key_context` maps a tool name to a callable returning state its result also
+    depends on (e.g. the retriever's scope); that state is part of the cache key.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[Any],
+        max_workers: int = AGENTIC_TOOL_MAX_WORKERS,
+        timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = AGENTIC_TOOL_DEFAULT_TIMEOUT,
+        shared_cache_ttls: Optional[Dict[str, float]] = None,
+        key_context: Optional[Dict[str, Callable[[], Any]]] = None,
+    ):
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.timeouts = dict(AGENTIC_TOOL_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.default_timeout = default_timeout
+        self.shared_cache_ttls = dict(AGENTIC_TOOL_SHARED_CACHE_TTLS if shared_cache_ttls is None else shared_cache_ttls)
+        self.shared_cache = TTLCache(ttl_seconds=max(self.shared_cache_ttls.values(), default=0))
+        self.key_context = dict(key_context or {})
+        self.max_workers = max_workers
+        self._pool = None
+        self._pool_pid = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Pool threads do not survive fork, so a forked worker starts its own pool
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agentic-tool")
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def cache_key(self, call: Dict[str, Any]) -> str:
+        """Normalised tool name + arguments + key context, with schema defaults filled in when available."""
+        name = call["name"].strip().lower()
+        args = dict(call.get("args") or {})
+        tool = self.tools_by_name.get(call["name"])
+        schema = getattr(tool, "args_schema", None)
+        if schema is not None and hasattr(schema, "model_validate"):
+            try:
+                args = schema.model_validate(args).model_dump()
+            except Exception:
+                pass
+        normalized = {key: _normalize_arg(key, value) for key, value in args.items()}
+        context = self.key_context.get(call["name"])
+        if context is not None:
+            normalized = {"args": normalized, "context": context()}
+        return f"{name}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+    def _invoke(self, call: Dict[str, Any], started: _Started) -> str:
+        started.at = time.monotonic()
+        started.event.set()
+        tool = self.tools_by_name[call["name"]]
+        return str(tool.invoke(call.get("args", {})))
+
+    @staticmethod
+    def _result(future, started: _Started, submitted_at: float, timeout: float, deadline_at: Optional[float]) -> str:
+        """Wait for a call: at most `timeout` for a free worker, then `timeout` from its start, never past `deadline_at`."""
+
+        def until(limit: float) -> float:
+            if deadline_at is not None:
+                limit = min(limit, deadline_at)
+            return max(limit - time.monotonic(), 0.0)
+
+        if not started.event.wait(until(submitted_at + timeout)) and future.cancel():
+            raise FuturesTimeoutError
+        started.event.wait()
+        return future.result(timeout=until(started.at + timeout))
+
+    def run(
+        self,
+        tool_calls: Sequence[Dict[str, Any]],
+        memo: Optional[Dict[str, str]] = None,
+        deadline: Optional[float] = None,
+    ) -> List[ToolMessage]:
+        """Run all tool calls and return one ToolMessage per call, in call order.
+
+        `memo` is the per-request result memo; it is read and updated in place.
+        `deadline` (seconds left for the request) caps every call's timeout.
+        """
+        memo = memo if memo is not None else {}
+        deadline_at = time.monotonic() + max(deadline, 0.0) if deadline is not None else None
+        submitted = []
+        in_flight = {}
+        for call in tool_calls:
+            if call["name"] not in self.tools_by_name:
+                submitted.append((call, None, None, None))
+                continue
+            key = self.cache_key(call)
+            if key in memo:
+                submitted.append((call, key, None, "request"))
+                continue
+            if call["name"] in self.shared_cache_ttls:
+                cached = self.shared_cache.get(key)
+                if cached is not None:
+                    memo[key] = cached
+                    submitted.append((call, key, None, "shared"))
+                    continue
+            # Identical calls within one turn share a single execution
+            if key in in_flight:
+                submitted.append((call, key, in_flight[key], "request"))
+                continue
+            # (future, start signal, submission time)
+            started = _Started()
+            in_flight[key] = (self._executor().submit(self._invoke, call, started), started, time.monotonic())
+            submitted.append((call, key, in_flight[key], None))
+
+        messages: List[ToolMessage] = []
+        for call, key, pending, cache_hit in submitted:
+            name = call["name"]
+            status = "success"
+            if pending is None and cache_hit is not None:
+                messages.append(ToolMessage(
+                    content=memo[key],
+                    tool_call_id=call["id"],
+                    name=name,
+                    response_metadata={"cache": cache_hit},
+                ))
+                continue
+            if pending is None:
+                content = f"Tool error: '{name}' is not a valid tool, try one of {sorted(self.tools_by_name)}."
+                status = "error"
+            else:
+                timeout = self.timeouts.get(name, self.default_timeout)
+                try:
+                    content = self._result(*pending, timeout, deadline_at)
+                except FuturesTimeoutError:
+                    pending[0].cancel()
+                    content = f"Tool error: '{name}' timed out after {timeout}s."
+                    status = "error"
+                except Exception as e:
+                    content = f"Tool error: {e}"
+                    status = "error"
+            if status == "success" and not _ERROR_OUTPUT.match(content):
+                memo[key] = content
+                if name in self.shared_cache_ttls:
+                    self.shared_cache.set(key, content, ttl_seconds=self.shared_cache_ttls[name])
+            messages.append(ToolMessage(
+                content=content,
+                tool_call_id=call["id"],
+                name=name,
+                status=status,
+                response_metadata={"cache": cache_hit} if cache_hit else {},
+            ))
+        return messages
+
+    def close(self):
+        """Release the worker threads; in-flight calls are left to finish on their own."""
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
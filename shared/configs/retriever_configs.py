@@ -1,13 +1,16 @@
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from shared.utils.chroma_utils import get_collection_name_for_rag_type
-from shared.configs.static import PERSIST_DIR, EMBEDDING_MODEL
+from shared.configs.static import PERSIST_DIR, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_OVERLAP
+from shared.utils.embedding_utils import get_text_embeddings
+from shared.utils.vectorstore_utils import get_vector_backend
 
 def get_retriever_config(rag_type: str):
+    collection_name = get_collection_name_for_rag_type(rag_type)
     return {
-        "embedding": HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL),
-        "text_splitter": RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50),
-        "collection_name": get_collection_name_for_rag_type(rag_type),
+        "embedding": get_text_embeddings(EMBEDDING_MODEL),
+        "text_splitter": RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP),
+        "collection_name": collection_name,
+        "vector_backend": get_vector_backend(collection_name, rag_type),
         "persist_directory": PERSIST_DIR,
         "vectorstore": None
     }
\ No newline at end of file
@@ -23,7 +23,104 @@ DATA_DIR_MAP = {
 # Vector Database
 PERSIST_DIR = "chroma_db"
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+## vector backend: "chroma", "numpy" (in-process exact search over memory-mapped float32
+## embeddings, stored under PERSIST_DIR/numpy/<collection>) or "faiss" (exact FAISS index saved
+## under PERSIST_DIR/faiss/<collection>); chosen per RAG type, VECTOR_BACKENDS overrides a collection
+VECTOR_BACKENDS_AVAILABLE = ("chroma", "numpy", "faiss")
+DEFAULT_VECTOR_BACKEND = "chroma"
+RAG_VECTOR_BACKENDS = {
+    "multi-modal": "faiss",
+    # "agentic-rag": "numpy",
+}
+VECTOR_BACKENDS = {
+    # "cache_rag_cache_collection": "numpy",
+}
+## optional quantised copy of NumPy-backend embeddings used to shortlist top_k * oversample
+## candidates, which are rescored with the full-precision vectors read lazily from disk:
+## "none", "int8" (scalar, ~4x less RAM) or "binary" (sign bits + Hamming prefilter, 32x less RAM)
+QUANTIZATION_MODES = ("none", "int8", "binary")
+DEFAULT_VECTOR_QUANTIZATION = "none"
+VECTOR_QUANTIZATION = {
+    # "agentic_rag_collection": "int8",
+}
+QUANTIZATION_OVERSAMPLE = {"int8": 4, "binary": 40}
+## optional sharding: a collection listed here is split into N physical shards
+## (<collection>_shard_<i>) on its vector backend. Writes are routed by SHARD_ROUTING: "source"
+## (hash of the source file, so a document stays in one shard) or "time" (ingestion-time buckets
+## of SHARD_TIME_BUCKET_SECONDS). Shards are written and searched concurrently (SHARD_MAX_WORKERS
+## threads, 0 = one per shard) and results merged into one top-k. Re-index after changing a count.
+COLLECTION_SHARDS = {
+    # "basic_rag_collection": 4,
+}
+SHARD_ROUTINGS = ("source", "time")
+SHARD_ROUTING = "source"
+SHARD_TIME_BUCKET_SECONDS = 86400
+SHARD_MAX_WORKERS = 0
+## collection snapshots (--export-collection / --import-collection): one versioned file with ids,
+## vectors ("float32", or "int8" scalar-quantised at ~4x smaller), texts and metadata, checked
+## with SHA-256; imports write SNAPSHOT_IMPORT_BATCH rows per backend call and need no embedding model
+SNAPSHOT_VECTOR_ENCODINGS = ("float32", "int8")
+SNAPSHOT_VECTOR_ENCODING = "float32"
+SNAPSHOT_IMPORT_BATCH = 5000
+## pre-fork serving (main.py --serve): models and read-only indexes are loaded once, then
+## SERVE_WORKERS processes (0 = one per CPU core) are forked and share those pages copy-on-write;
+## NumPy-backend vectors and texts and multi-modal image payloads are memory-mapped, so they are
+## shared through the page cache. Each worker runs inference on SERVE_TORCH_THREADS threads.
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8000
+SERVE_WORKERS = 0
+SERVE_TORCH_THREADS = 1
+## embedding inference: "torch" (PyTorch eager) or "onnx" (ONNX Runtime; MiniLM and CLIP are
+## exported once to ONNX_CACHE_DIR, optionally dynamic-int8 quantised, and used only if their
+## embeddings match torch within ONNX_PARITY_MIN_COSINE; otherwise torch is used)
+EMBEDDING_BACKENDS = ("torch", "onnx")
+EMBEDDING_BACKEND = "torch"
+ONNX_CACHE_DIR = "models/onnx"
+ONNX_QUANTIZE = True
+ONNX_INTRA_OP_THREADS = 0  # 0 = ONNX Runtime default
+ONNX_BATCH_SIZE = 32
+ONNX_PARITY_MIN_COSINE = 0.98
 TOP_K = 5
+## PDF chunking (streamed page by page; chunks carry source / page / char-offset metadata)
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+## per-document chunk metadata stamped at index time: `ingested_at` (epoch seconds) and the tags
+## listed here by file name, stored as `tags` ("a,b") plus a `tag_<name>: True` flag per tag so they
+## can be used in `where` filters and REPL scopes (/scope tag:<name>); neither changes chunk ids
+DOCUMENT_TAGS = {
+    # "HR-Policies-and-Benefits.pdf": ["hr", "policy"],
+}
+## batch indexing: extract/chunk -> embed -> write stages joined by bounded queues; progress is
+## checkpointed under PERSIST_DIR/checkpoints so an interrupted run resumes from the last commit
+INDEX_BATCH_SIZE = 64
+INDEX_QUEUE_BATCHES = 4
+INDEX_COMMIT_EVERY = 4  # batches per store persist + checkpoint write
+INDEX_PROGRESS_SECONDS = 5.0
+INDEX_CHECKPOINT_DIR = "checkpoints"
+## retrieval modes: "dense" (vector similarity), "hybrid" (BM25 + dense fused with RRF)
+## or "mmr" (maximal marginal relevance over MMR_FETCH_K dense candidates; lambda 1.0 = pure relevance)
+RETRIEVAL_MODES = ("dense", "hybrid", "mmr")
+RETRIEVAL_MODE = "dense"
+HYBRID_FETCH_K = 20
+MMR_FETCH_K = 20
+MMR_LAMBDA = 0.5
+RRF_K = 60
+LEXICAL_INDEX_DIR = "lexical"
+## optional cross-encoder rerank stage: over-retrieve RERANK_FETCH_K candidates, keep top_k;
+## skipped when the estimated scoring time exceeds the budget or too many reranks are running
+RERANK_ENABLED = False
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_FETCH_K = 20
+RERANK_LATENCY_BUDGET_MS = 150.0
+RERANK_MAX_CONCURRENT = 2
+RERANK_CACHE_TTL_SECONDS = 3600
+
+# HTTP (agentic tools)
+## a tool's request timeout is sized so that all HTTP_RETRY_TOTAL retries and their backoff
+## fit inside the tool's AGENTIC_TOOL_TIMEOUTS entry
+HTTP_POOL_MAXSIZE = 10
+HTTP_RETRY_TOTAL = 2
+HTTP_RETRY_BACKOFF = 0.3
 
 # LLM
 GROQ_MODEL = "openai/gpt-oss-20b"
@@ -36,6 +133,27 @@ MM_RAG_TYPE = "multi-modal"
 ## retriever
 CLIP_MODEL = "openai/clip-vit-base-patch32"
 CLIP_PROCESSOR = "openai/clip-vit-base-patch32"
+## image filtering at index time: repeated xrefs within a PDF are always skipped; images below
+## the size limits are skipped; duplicates across PDFs are detected by "content" hash, by
+## "phash" (content hash + perceptual hash within MM_PHASH_MAX_DISTANCE bits) or not at all ("none")
+MM_MIN_IMAGE_WIDTH = 32
+MM_MIN_IMAGE_HEIGHT = 32
+MM_MIN_IMAGE_AREA = 64 * 64
+MM_IMAGE_DEDUP = "phash"
+MM_PHASH_MAX_DISTANCE = 4
+## image payloads sent to the vision model: derivatives are made once at index time (longest
+## edge <= MM_IMAGE_MAX_EDGE, "JPEG" or "WEBP" at MM_IMAGE_QUALITY); a message carries at most
+## MM_IMAGE_BYTE_BUDGET bytes of base64 image data, lower-ranked images fall back to captions
+MM_IMAGE_MAX_EDGE = 768
+MM_IMAGE_FORMAT = "JPEG"
+MM_IMAGE_QUALITY = 80
+MM_IMAGE_BYTE_BUDGET = 1_500_000
+## parallel multi-modal indexing: worker processes (0 = one per CPU core) extract page ranges of
+## MM_INDEX_PAGES_PER_TASK pages; one CLIP stage embeds MM_CLIP_BATCH_SIZE items per forward pass
+MM_INDEX_WORKERS = 0
+MM_INDEX_PAGES_PER_TASK = 8
+MM_CLIP_BATCH_SIZE = 32
+MM_INDEX_QUEUE_BATCHES = 4
 
 # Langgraph
 LG_RAG_TYPE = "langgraph"
@@ -55,3 +173,55 @@ CACHE_SIMILARITY_THRESHOLD = 0.5
 
 # Agentic-RAG
 AGENTIC_RAG_TYPE = "agentic-rag"
+## grading: embedding similarity at/above RELEVANT -> generate, below IRRELEVANT -> rewrite,
+## anything in between is sent to the LLM grader
+AGENTIC_GRADE_RELEVANT_THRESHOLD = 0.55
+AGENTIC_GRADE_IRRELEVANT_THRESHOLD = 0.2
+## per-request budgets for the rewrite loop; when one runs out the pipeline
+## generates from the best context gathered so far
+AGENTIC_MAX_REWRITES = 2
+AGENTIC_MAX_TOOL_CALLS = 6
+AGENTIC_DEADLINE_SECONDS = 60.0
+AGENTIC_MAX_LLM_TOKENS = 8000
+## tool calls from one agent turn run concurrently; timeouts are per tool name (seconds)
+AGENTIC_TOOL_MAX_WORKERS = 4
+AGENTIC_TOOL_DEFAULT_TIMEOUT = 20.0
+AGENTIC_TOOL_TIMEOUTS = {
+    "resume_retriever": 10.0,
+    "web_search": 20.0,
+    "currency_convert": 15.0,
+}
+## tool endpoints (overridable via env, e.g. to point at a local stub server) and result caches
+WEB_SEARCH_URL = "https://serpapi.com/search.json"
+WEB_SEARCH_CACHE_TTL_SECONDS = 300
+FX_RATE_URL = "https://api.exchangerate.host/convert"
+FX_RATE_CACHE_TTL_SECONDS = 600
+## pre-agent router: currency requests matched by pattern, corpus/web questions by
+## similarity to the exemplars below; below the thresholds the LLM agent decides
+AGENTIC_ROUTER_MIN_SIMILARITY = 0.6
+AGENTIC_ROUTER_MIN_MARGIN = 0.1
+AGENTIC_ROUTER_EXEMPLARS = {
+    "resume_retriever": [
+        "Summarize the candidate's AWS experience",
+        "What programming languages does the candidate use most?",
+        "What are the candidate's key skills?",
+        "Where did the candidate work previously?",
+        "What is the candidate's educational background?",
+        "List the certifications mentioned in the resume",
+        "How many years of experience does the candidate have?",
+        "Which projects has the candidate led?",
+    ],
+    "web_search": [
+        "Latest news about AWS Summit in NZ",
+        "What is the current weather in Auckland?",
+        "Who won the most recent cricket world cup?",
+        "What are today's top technology headlines?",
+        "Find the official website for the Python Software Foundation",
+        "When is the next Apple product launch event?",
+    ],
+}
+## tool results are memoised per request; deterministic tools listed here are also
+## cached across requests for the given number of seconds
+AGENTIC_TOOL_SHARED_CACHE_TTLS = {
+    "resume_retriever": 120.0,
+}
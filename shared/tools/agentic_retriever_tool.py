@@ -1,8 +1,9 @@
-from typing import List
+from typing import List, Optional
 from langchain.tools import StructuredTool
 from projects.retriever.agentic_rag_retriever import AgenticRAGRetriever
 from shared.components.agentic_rag_states import AgenticRetrieverInput
 from shared.configs.static import TOP_K
+from shared.utils.filter_utils import scope_filter
 
 
 def make_agentic_retriever_tool(retriever: AgenticRAGRetriever) -> StructuredTool:
@@ -12,18 +13,26 @@ def make_agentic_retriever_tool(retriever: AgenticRAGRetriever) -> StructuredToo
     the collection configured for the agentic RAG type (agentic_rag_collection).
     """
 
-    def _retrieve(query: str, top_k: int = TOP_K) -> str:
+    def _retrieve(
+        query: str,
+        top_k: int = TOP_K,
+        sources: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+    ) -> str:
         """Retrieve relevant chunks from the resume knowledge base.
 
         Args:
             query (str): The search query.
             top_k (int, optional): The number of results to retrieve. Defaults to TOP_K.
+            sources (List[str], optional): Only search these files. Defaults to all files.
+            tags (List[str], optional): Only search documents with all of these tags.
 
         Returns:
             str: The retrieved documents, formatted as a single string with each document on a new line.
     """
         try:
-            docs: List[str] = retriever.retrieve(query, top_k=top_k)
+            # Applied as a pre-filter inside the vector search, on top of any session scope
+            docs: List[str] = retriever.retrieve(query, top_k=top_k, filter=scope_filter(sources, tags))
             if not docs:
                 return "No relevant results found in resume collection."
 
@@ -40,7 +49,8 @@ def make_agentic_retriever_tool(retriever: AgenticRAGRetriever) -> StructuredToo
         name="resume_retriever",
         description=(
             "Retrieve relevant chunks from the resume vector store. "
-            "Use this for questions about the candidate's background, skills, or experience."
+            "Use this for questions about the candidate's background, skills, or experience. "
+            "Pass `sources` (file names) or `tags` to search only part of the collection."
         ),
         args_schema=AgenticRetrieverInput,
     )
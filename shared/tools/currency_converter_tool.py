@@ -1,27 +1,51 @@
 import os
-import requests
 from dotenv import load_dotenv
-from typing import List
 from langchain.tools import StructuredTool
 from shared.components.agentic_rag_states import CurrencyConvertInput
+from shared.configs.static import (
+    FX_RATE_URL,
+    FX_RATE_CACHE_TTL_SECONDS,
+    AGENTIC_TOOL_TIMEOUTS,
+    AGENTIC_TOOL_DEFAULT_TIMEOUT,
+)
+from shared.utils.cache_utils import TTLCache
+from shared.utils.http_utils import get_http_session, request_timeout
 
 load_dotenv()
 exchangerate_api_key = os.getenv("EXCHANGERATE_API_KEY")
 
+# Exchange rate per (from, to) pair; conversions are computed locally from it
+rate_cache = TTLCache(ttl_seconds=FX_RATE_CACHE_TTL_SECONDS)
+
+def _get_rate(from_currency: str, to_currency: str) -> float:
+    """Rate for one unit of `from_currency`, served from the cache when fresh."""
+    pair = (from_currency, to_currency)
+    rate = rate_cache.get(pair)
+    if rate is not None:
+        return rate
+    resp = get_http_session("exchangerate").get(
+        # Read per call so the endpoint can be pointed at a stub server without a reimport
+        os.getenv("EXCHANGERATE_URL", FX_RATE_URL),
+        params={"from": from_currency, "to": to_currency, "amount": 1},
+        timeout=request_timeout(AGENTIC_TOOL_TIMEOUTS.get("currency_convert", AGENTIC_TOOL_DEFAULT_TIMEOUT)),
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    rate = data.get("info", {}).get("rate")
+    if rate is None:
+        rate = data.get("result", None)
+    if rate is None:
+        raise ValueError(f"unexpected response: {data}")
+    rate = float(rate)
+    rate_cache.set(pair, rate)
+    return rate
+
 def _currency_convert(amount: float, from_currency: str, to_currency: str) -> str:
+    from_currency, to_currency = from_currency.upper(), to_currency.upper()
     try:
-        resp = requests.get(
-            "https://api.exchangerate.host/convert",
-            params={"from": from_currency.upper(), "to": to_currency.upper(), "amount": amount},
-            timeout=15,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        result = data.get("result", None)
-        if result is None:
-            return f"Conversion error: unexpected response: {data}"
-        rate = data.get("info", {}).get("rate")
-        return f"{amount} {from_currency.upper()} = {result} {to_currency.upper()} (rate: {rate})"
+        rate = _get_rate(from_currency, to_currency)
+        result = round(amount * rate, 6)
+        return f"{amount} {from_currency} = {result} {to_currency} (rate: {rate})"
     except Exception as e:
         return f"Conversion error: {e}"
 
@@ -32,4 +56,4 @@ exchangerate_converter = StructuredTool.from_function(
         "Convert currency amounts using live foreign exchange rates."
     ),
     args_schema=CurrencyConvertInput,
-)
\ No newline at end of file
+)
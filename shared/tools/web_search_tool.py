@@ -1,26 +1,44 @@
 import os
-import requests
 from dotenv import load_dotenv
 from typing import List
 from langchain.tools import StructuredTool
 from shared.components.agentic_rag_states import WebSearchInput
+from shared.configs.static import (
+    WEB_SEARCH_URL,
+    WEB_SEARCH_CACHE_TTL_SECONDS,
+    AGENTIC_TOOL_TIMEOUTS,
+    AGENTIC_TOOL_DEFAULT_TIMEOUT,
+)
+from shared.utils.cache_utils import TTLCache
+from shared.utils.http_utils import get_http_session, request_timeout
 
 load_dotenv()
-serp_key = os.getenv("SERPAPI_API_KEY")
+
+# Formatted results per (normalised query, num); only successful searches are cached
+search_cache = TTLCache(ttl_seconds=WEB_SEARCH_CACHE_TTL_SECONDS)
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
 
 def _web_search(query: str, num: int = 2) -> str:
+    # Read per call so the key and endpoint can be changed (e.g. to a stub server) without a reimport
+    serp_key = os.getenv("SERPAPI_API_KEY")
+    serp_url = os.getenv("SERPAPI_URL", WEB_SEARCH_URL)
     if not serp_key:
         return "SerpAPI error: SERPAPI_API_KEY not set."
+    cache_key = (_normalize_query(query), num)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
     try:
-        resp = requests.get(
-            "https://serpapi.com/search.json",
+        resp = get_http_session("serpapi").get(
+            serp_url,
             params={"engine": "google", "q": query, "api_key": serp_key, "num": num},
-            timeout=20,
+            timeout=request_timeout(AGENTIC_TOOL_TIMEOUTS.get("web_search", AGENTIC_TOOL_DEFAULT_TIMEOUT)),
         )
         resp.raise_for_status()
         data = resp.json()
         results = data.get("organic_results", [])
-        print(f"DEBUG: length of results: {len(results)}")
 
         if not results:
             return f"No search results for: {query}"
@@ -30,7 +48,9 @@ def _web_search(query: str, num: int = 2) -> str:
             snippet = r.get("snippet") or r.get("snippet_highlighted_words") or ""
             link = r.get("link") or r.get("displayed_link") or ""
             lines.append(f"- {title}\n  {snippet}\n  {link}")
-        return "Search results:\n" + "\n".join(lines)
+        output = "Search results:\n" + "\n".join(lines)
+        search_cache.set(cache_key, output)
+        return output
     except Exception as e:
         return f"SerpAPI error: {e}"
     
@@ -42,8 +62,3 @@ serp_search = StructuredTool.from_function(
     ),
     args_schema=WebSearchInput,
 )
-
-
-
-
-
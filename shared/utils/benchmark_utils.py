@@ -0,0 +1,140 @@
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from shared.configs.static import TOP_K, QUANTIZATION_MODES, QUANTIZATION_OVERSAMPLE, VECTOR_BACKENDS_AVAILABLE
+from shared.utils.quantization_utils import QuantizedCodes
+from shared.utils.similarity_utils import normalize_rows
+from shared.utils.vectorstore_utils import open_backend
+
+
+def _exact_top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ matrix.T
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def _sample_queries(matrix: np.ndarray, n_queries: int, seed: int) -> np.ndarray:
+    """Stored vectors plus a little noise, so a query is not an exact copy of its own row."""
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(matrix.shape[0], size=min(n_queries, matrix.shape[0]), replace=False)
+    noise = rng.normal(scale=0.05 / np.sqrt(matrix.shape[1]), size=(len(picked), matrix.shape[1]))
+    return normalize_rows(matrix[picked] + noise)
+
+
+def quantization_benchmark(
+    vectors: np.ndarray,
+    query_vectors: Optional[Sequence[Sequence[float]]] = None,
+    k: int = TOP_K,
+    n_queries: int = 200,
+    modes: Sequence[str] = QUANTIZATION_MODES,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """Recall@k against exact float32 search and resident memory for each quantisation mode.
+
+    Without `query_vectors`, a sample of stored vectors is used as queries.
+    """
+    matrix = normalize_rows(vectors)
+    if matrix.shape[0] == 0:
+        return []
+    k = min(k, matrix.shape[0])
+    if query_vectors is None:
+        queries = _sample_queries(matrix, n_queries, seed)
+    else:
+        queries = normalize_rows(query_vectors)
+    truth = _exact_top_k(matrix, queries, k)
+    float_bytes = matrix.nbytes
+
+    report = []
+    for mode in modes:
+        codes = QuantizedCodes.build(mode, matrix) if mode != "none" else None
+        started = time.perf_counter()
+        if codes is None:
+            found = _exact_top_k(matrix, queries, k)
+            nbytes = float_bytes
+        else:
+            shortlist = codes.shortlist(queries, k * QUANTIZATION_OVERSAMPLE[mode])
+            found = np.empty_like(truth)
+            for j, cand in enumerate(shortlist):
+                sims = matrix[cand] @ queries[j]
+                found[j] = cand[np.argsort(-sims, kind="stable")[:k]]
+            nbytes = codes.nbytes
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+        report.append({
+            "mode": mode,
+            "resident_bytes": int(nbytes),
+            "compression": round(float_bytes / nbytes, 1) if nbytes else 0.0,
+            f"recall@{k}": round(float(recall), 4),
+            "ms_per_query": round(elapsed_ms / len(queries), 3),
+        })
+    return report
+
+
+def print_quantization_report(collection_name: str, n_vectors: int, report: List[Dict[str, Any]]):
+    print(f"Quantization benchmark for {collection_name} ({n_vectors} vectors)")
+    for row in report:
+        print("  " + ", ".join(f"{key}: {value}" for key, value in row.items()))
+
+
+def backend_benchmark(
+    vectors: np.ndarray,
+    texts: Sequence[str],
+    metadatas: Sequence[Dict[str, Any]],
+    k: int = TOP_K,
+    n_queries: int = 200,
+    backends: Sequence[str] = VECTOR_BACKENDS_AVAILABLE,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """Write the same collection into each vector backend (in a scratch directory) and time it.
+
+    Reports the time to add and persist all rows, per-query latency for single and
+    batched searches, and recall@k against exact cosine search. Vectors are unit
+    normalised first, so every backend's distance ranks rows the same way.
+    """
+    matrix = normalize_rows(vectors)
+    if matrix.shape[0] == 0:
+        return []
+    k = min(k, matrix.shape[0])
+    queries = _sample_queries(matrix, n_queries, seed)
+    truth = _exact_top_k(matrix, queries, k)
+    ids = [f"row{i}" for i in range(matrix.shape[0])]
+    row_of = {row_id: i for i, row_id in enumerate(ids)}
+
+    report = []
+    for name in backends:
+        directory = tempfile.mkdtemp(prefix=f"bench_{name}_")
+        try:
+            backend = open_backend("benchmark_collection", None, directory, name)
+            started = time.perf_counter()
+            backend.add(ids, texts, matrix, metadatas)
+            backend.persist()
+            add_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            single = [backend.search(q, k) for q in queries]
+            single_ms = (time.perf_counter() - started) * 1000 / len(queries)
+            started = time.perf_counter()
+            backend.search_batch(queries, k)
+            batch_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+            found = [[row_of[doc.id] for doc, _ in hits] for hits in single]
+            recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+            report.append({
+                "backend": name,
+                "add_s": round(add_s, 3),
+                "ms_per_query": round(single_ms, 3),
+                "ms_per_query_batched": round(batch_ms, 3),
+                f"recall@{k}": round(float(recall), 4),
+            })
+        except Exception as e:
+            report.append({"backend": name, "error": str(e)})
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return report
+
+
+def print_backend_report(collection_name: str, n_vectors: int, report: List[Dict[str, Any]]):
+    print(f"Vector backend benchmark for {collection_name} ({n_vectors} vectors)")
+    for row in report:
+        print("  " + ", ".join(f"{key}: {value}" for key, value in row.items()))
@@ -1,5 +1,89 @@
+import atexit
+import os
+import threading
+from typing import Any, Dict, Tuple
 import chromadb
-from shared.configs.static import ALLOWED_COLLECTIONS
+from langchain_chroma import Chroma
+from shared.configs.static import ALLOWED_COLLECTIONS, RAG_TYPES
+
+# Process-wide registry: one client per persist directory and one LangChain wrapper per
+# (directory, collection, embedding), so pipelines sharing a process share SQLite handles
+# and loaded segments instead of re-opening the database
+_lock = threading.RLock()
+_clients: Dict[str, Any] = {}
+_stores: Dict[Tuple[str, str, int], Any] = {}
+
+
+def _path_key(persist_directory: str) -> str:
+    return os.path.realpath(persist_directory)
+
+
+def get_chroma_client(persist_directory: str = "chroma_db"):
+    """Shared `chromadb.PersistentClient` for a persist directory."""
+    key = _path_key(persist_directory)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = chromadb.PersistentClient(path=persist_directory)
+            _clients[key] = client
+        return client
+
+
+def get_chroma_store(collection_name: str, embedding: Any, persist_directory: str = "chroma_db"):
+    """Shared LangChain `Chroma` wrapper for a collection (created if missing) on the shared client."""
+    # The cached wrapper holds a reference to `embedding`, so its id stays unique while cached
+    key = (_path_key(persist_directory), collection_name, id(embedding))
+    with _lock:
+        store = _stores.get(key)
+        if store is None:
+            store = Chroma(
+                client=get_chroma_client(persist_directory),
+                collection_name=collection_name,
+                embedding_function=embedding,
+            )
+            _stores[key] = store
+        return store
+
+
+def forget_collection(collection_name: str, persist_directory: str = "chroma_db"):
+    """Drop cached handles of a collection (after it was deleted)."""
+    path = _path_key(persist_directory)
+    with _lock:
+        for key in [k for k in _stores if k[0] == path and k[1] == collection_name]:
+            del _stores[key]
+
+
+def close_chroma_clients():
+    """Drop every cached handle and stop the shared clients (registered with atexit)."""
+    with _lock:
+        _stores.clear()
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            close = getattr(client, "close", None)
+            if callable(close):
+                close()
+            else:
+                client._system.stop()
+        except Exception as e:
+            print(f"Error closing Chroma client: {e}")
+
+
+atexit.register(close_chroma_clients)
+
+
+def _forget_inherited_clients():
+    """In a forked child, drop the parent's handles without closing them (they still belong to the parent)."""
+    global _lock
+    _lock = threading.RLock()
+    _clients.clear()
+    _stores.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_clients)
+
 
 def get_collection_name_for_rag_type(rag_type: str) -> str:
     """Generate collection name based on RAG type."""
@@ -8,13 +92,27 @@ def get_collection_name_for_rag_type(rag_type: str) -> str:
         raise ValueError(f"Invalid RAG type: {rag_type}")
     return collection_name
 
+def get_shard_collection_names(collection_name: str, num_shards: int) -> list:
+    """Physical collections backing a sharded collection; the collection itself must be allowed."""
+    if collection_name not in ALLOWED_COLLECTIONS:
+        raise ValueError(f"Invalid collection: {collection_name}")
+    return [f"{collection_name}_shard_{i}" for i in range(num_shards)]
+
+def get_rag_type_for_collection(collection_name: str) -> str:
+    """RAG type a collection belongs to (e.g. cache_rag_cache_collection -> cache-rag)."""
+    if collection_name in ALLOWED_COLLECTIONS:
+        for rag_type in RAG_TYPES:
+            if collection_name.startswith(f"{rag_type.replace('-', '_')}_"):
+                return rag_type
+    raise ValueError(f"Invalid collection: {collection_name}")
+
 def list_existing_collections(persist_directory: str = "chroma_db") -> list:
     """List all existing collections in the persist directory."""
     try:
-        # New Chroma client configuration
-        client = chromadb.PersistentClient(path=persist_directory)
+        client = get_chroma_client(persist_directory)
         collections = client.list_collections()
-        return [col.name for col in collections]
+        # Depending on the chromadb version these are names or Collection objects
+        return [getattr(col, "name", col) for col in collections]
     except Exception as e:
         print(f"Error listing collections: {e}")
         return []
@@ -22,9 +120,9 @@ def list_existing_collections(persist_directory: str = "chroma_db") -> list:
 def delete_collection(collection_name: str, persist_directory: str = "chroma_db"):
     """Delete a specific collection."""
     try:
-        # New Chroma client configuration
-        client = chromadb.PersistentClient(path=persist_directory)
+        client = get_chroma_client(persist_directory)
         client.delete_collection(collection_name)
+        forget_collection(collection_name, persist_directory)
         print(f"Deleted collection: {collection_name}")
     except Exception as e:
         print(f"Error deleting collection {collection_name}: {e}")
@@ -32,8 +130,7 @@ def delete_collection(collection_name: str, persist_directory: str = "chroma_db"
 def get_collection_info(collection_name: str, persist_directory: str = "chroma_db"):
     """Get information about a specific collection."""
     try:
-        # New Chroma client configuration
-        client = chromadb.PersistentClient(path=persist_directory)
+        client = get_chroma_client(persist_directory)
         collection = client.get_collection(collection_name)
         count = collection.count()
         return {
@@ -0,0 +1,55 @@
+from typing import Any, Sequence
+import numpy as np
+from shared.configs.static import EMBEDDING_BACKEND, EMBEDDING_BACKENDS, EMBEDDING_MODEL, CLIP_MODEL, CLIP_PROCESSOR
+from shared.utils.onnx_utils import load_onnx_text_embeddings, load_onnx_clip_encoder
+
+
+def check_embedding_backend(backend: str) -> str:
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Invalid embedding backend: {backend}. Choose one of {EMBEDDING_BACKENDS}")
+    return backend
+
+
+class TorchClipEncoder:
+    """CLIP text and image towers (normalised features) in PyTorch eager mode."""
+
+    def __init__(self, model_name: str = CLIP_MODEL, processor_name: str = CLIP_PROCESSOR):
+        from transformers import CLIPModel, CLIPProcessor
+        self.model = CLIPModel.from_pretrained(model_name)
+        self.processor = CLIPProcessor.from_pretrained(processor_name)
+        self.model.eval()
+
+    def embed_texts(self, texts: Sequence[str]) -> np.ndarray:
+        import torch
+        inputs = self.processor(text=list(texts), return_tensors="pt", padding=True, truncation=True, max_length=77)
+        with torch.no_grad():
+            features = self.model.get_text_features(**inputs)
+            features = features / features.norm(dim=-1, keepdim=True)
+        return features.numpy()
+
+    def embed_images(self, images: Sequence[Any]) -> np.ndarray:
+        import torch
+        inputs = self.processor(images=list(images), return_tensors="pt")
+        with torch.no_grad():
+            features = self.model.get_image_features(**inputs)
+            features = features / features.norm(dim=-1, keepdim=True)
+        return features.numpy()
+
+
+def get_text_embeddings(model_name: str = EMBEDDING_MODEL):
+    """LangChain embeddings for the text collections on the configured backend."""
+    if check_embedding_backend(EMBEDDING_BACKEND) == "onnx":
+        embeddings = load_onnx_text_embeddings(model_name)
+        if embeddings is not None:
+            return embeddings
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name)
+
+
+def get_clip_encoder(model_name: str = CLIP_MODEL, processor_name: str = CLIP_PROCESSOR):
+    """CLIP encoder (`embed_texts` / `embed_images`) on the configured backend."""
+    if check_embedding_backend(EMBEDDING_BACKEND) == "onnx":
+        encoder = load_onnx_clip_encoder(model_name, processor_name, TorchClipEncoder)
+        if encoder is not None:
+            return encoder
+    return TorchClipEncoder(model_name, processor_name)
@@ -0,0 +1,137 @@
+import shlex
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_COMPARATORS = {
+    "$eq": lambda value, target: value == target,
+    # A missing key (None) matches no comparison, negated ones included
+    "$ne": lambda value, target: value is not None and value != target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value is not None and value not in target,
+}
+
+
+def matches_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma-style `where` filter against one metadata dict.
+
+    Supports `{"key": value}`, `{"key": {"$op": value}}` with the comparison operators
+    above, and `$and` / `$or` lists, so non-Chroma indexes accept the same filters.
+    """
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, target in condition.items():
+                if op not in _COMPARATORS:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                try:
+                    if not _COMPARATORS[op](value, target):
+                        return False
+                except TypeError:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+TAG_KEY_PREFIX = "tag_"
+
+
+def tag_metadata(tags: Sequence[str]) -> Dict[str, Any]:
+    """Metadata for a chunk's tags: a `tags` string for display and one filterable `tag_<name>` flag each."""
+    tags = [t.strip() for t in tags if t and t.strip()]
+    if not tags:
+        return {}
+    return {"tags": ",".join(tags), **{f"{TAG_KEY_PREFIX}{t}": True for t in tags}}
+
+
+def combine_filters(*filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """AND `where` filters together (empty ones are skipped) in a form Chroma accepts.
+
+    Chroma wants a single top-level key per filter, so multi-key filters are split
+    into `$and` clauses and nested `$and` lists are flattened.
+    """
+    clauses: List[Dict[str, Any]] = []
+    for where in filters:
+        for key, condition in (where or {}).items():
+            if key == "$and":
+                clauses.extend(condition)
+            else:
+                clauses.append({key: condition})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def scope_filter(
+    sources: Optional[Sequence[str]] = None,
+    tags: Optional[Sequence[str]] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    pages: Optional[Tuple[int, int]] = None,
+) -> Optional[Dict[str, Any]]:
+    """`where` filter for a document scope: any of `sources` (file names), all of `tags`,
+    ingestion time in [since, until] (epoch seconds) and chunks starting on pages
+    [first, last] (0-based). None when nothing is restricted.
+    """
+    clauses: List[Dict[str, Any]] = []
+    if sources:
+        sources = list(sources)
+        clauses.append({"source": {"$eq": sources[0]}} if len(sources) == 1 else {"source": {"$in": sources}})
+    clauses.extend({f"{TAG_KEY_PREFIX}{t}": {"$eq": True}} for t in tags or ())
+    if since is not None:
+        clauses.append({"ingested_at": {"$gte": int(since)}})
+    if until is not None:
+        clauses.append({"ingested_at": {"$lte": int(until)}})
+    if pages is not None:
+        clauses.extend([{"page": {"$gte": int(pages[0])}}, {"page": {"$lte": int(pages[1])}}])
+    return combine_filters(*clauses)
+
+
+def _parse_time(value: str, end_of_day: bool = False) -> float:
+    if value.isdigit():
+        return float(value)
+    try:
+        day = time.mktime(time.strptime(value, "%Y-%m-%d"))
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}'. Use YYYY-MM-DD or epoch seconds") from None
+    return day + 86399 if end_of_day else day
+
+
+def parse_scope(spec: str) -> Optional[Dict[str, Any]]:
+    """Parse a scope spec into a `where` filter (see `scope_filter`).
+
+    Tokens are file names plus `tag:<name>`, `since:<date>`, `until:<date>`
+    (YYYY-MM-DD, local time, or epoch seconds) and `pages:<first>-<last>`;
+    quote file names containing spaces.
+    """
+    sources, tags = [], []
+    since = until = pages = None
+    for token in shlex.split(spec):
+        key, sep, value = token.partition(":")
+        if not sep or key not in ("tag", "since", "until", "pages"):
+            sources.append(token)
+        elif key == "tag":
+            tags.append(value)
+        elif key == "since":
+            since = _parse_time(value)
+        elif key == "until":
+            until = _parse_time(value, end_of_day=True)
+        else:
+            first, _, last = value.partition("-")
+            if not first.isdigit() or not (last or first).isdigit():
+                raise ValueError(f"Invalid page range '{value}'. Use pages:<first>-<last> (0-based)")
+            pages = (int(first), int(last or first))
+    return scope_filter(sources, tags, since, until, pages)
@@ -0,0 +1,50 @@
+import threading
+from typing import Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from shared.configs.static import HTTP_POOL_MAXSIZE, HTTP_RETRY_TOTAL, HTTP_RETRY_BACKOFF
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=HTTP_RETRY_TOTAL,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        # An unbounded Retry-After sleep would break the caller's time budget (see request_timeout)
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=HTTP_POOL_MAXSIZE, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def request_timeout(budget_seconds: float) -> Tuple[float, float]:
+    """(connect, read) timeout per attempt so that every retry plus its backoff fits in `budget_seconds`."""
+    backoff = sum(HTTP_RETRY_BACKOFF * 2 ** i for i in range(1, HTTP_RETRY_TOTAL + 1))
+    per_attempt = max((budget_seconds - backoff) / (HTTP_RETRY_TOTAL + 1), 0.2)
+    return per_attempt / 2, per_attempt / 2
+
+
+def get_http_session(name: str = "default") -> requests.Session:
+    """Process-wide keep-alive session (one per name) with retry/backoff on transient errors."""
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _build_session()
+            _sessions[name] = session
+        return session
+
+
+def close_http_sessions():
+    """Close all pooled sessions (e.g. on shutdown)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,113 @@
+import base64
+import hashlib
+import io
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from shared.utils.quantization_utils import popcount
+
+
+def content_hash(data: bytes) -> str:
+    """Exact-duplicate key for encoded image bytes."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def dhash(image: Image.Image) -> int:
+    """64-bit difference hash: robust to rescaling and re-encoding of the same picture."""
+    small = image.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class PerceptualHashIndex:
+    """Set of perceptual hashes answering "is there one within `max_distance` bits?"."""
+
+    def __init__(self, max_distance: int = 4):
+        self.max_distance = max_distance
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def find(self, value: int) -> Optional[int]:
+        """Position of the closest stored hash within the distance threshold, if any."""
+        if self._count == 0:
+            return None
+        diff = np.bitwise_xor(self._hashes[:self._count], np.uint64(value)).reshape(-1, 1)
+        distances = popcount(diff).sum(axis=1)
+        best = int(np.argmin(distances))
+        return best if int(distances[best]) <= self.max_distance else None
+
+    def add(self, value: int) -> int:
+        if self._count == len(self._hashes):
+            grown = np.zeros(max(64, 2 * len(self._hashes)), dtype=np.uint64)
+            grown[:self._count] = self._hashes[:self._count]
+            self._hashes = grown
+        self._hashes[self._count] = np.uint64(value)
+        self._count += 1
+        return self._count - 1
+
+
+def encode_image_payload(image: Image.Image, max_edge: int, fmt: str = "JPEG", quality: int = 80) -> Tuple[str, str]:
+    """(mime type, base64 data) of a downscaled, lossy re-encoded copy of an image."""
+    fmt = fmt.upper()
+    if fmt not in ("JPEG", "WEBP"):
+        raise ValueError(f"Unsupported image payload format: {fmt}")
+    derivative = image.convert("RGB")
+    if max(derivative.size) > max_edge:
+        derivative.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    buffered = io.BytesIO()
+    if fmt == "JPEG":
+        derivative.save(buffered, format="JPEG", quality=quality, optimize=True)
+    else:
+        derivative.save(buffered, format="WEBP", quality=quality, method=4)
+    return f"image/{fmt.lower()}", base64.b64encode(buffered.getvalue()).decode()
+
+
+class ImageBlobStore:
+    """Read-only image payloads: one memory-mapped file of raw image bytes and an
+    index {image_id: [mime, offset, length]}.
+
+    `get` base64-encodes on access, so the image bytes stay in the OS page cache and
+    are shared by every process that opens the same file.
+    """
+
+    def __init__(self, index: Dict[str, List[Any]], blob: np.ndarray):
+        self.index = index
+        self.blob = blob
+
+    @staticmethod
+    def write(path: str, payloads: Dict[str, Dict[str, str]]) -> Dict[str, List[Any]]:
+        """Write {image_id: {"mime", "data" (base64)}} to `path`; returns the index to store with it."""
+        index, offset = {}, 0
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for image_id, payload in payloads.items():
+                data = base64.b64decode(payload["data"])
+                f.write(data)
+                index[image_id] = [payload["mime"], offset, len(data)]
+                offset += len(data)
+        os.replace(tmp_path, path)
+        return index
+
+    @classmethod
+    def open(cls, path: str, index: Dict[str, List[Any]]) -> "ImageBlobStore":
+        # np.memmap cannot map an empty file
+        blob = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else np.zeros(0, dtype=np.uint8)
+        return cls(index, blob)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, image_id: str) -> bool:
+        return image_id in self.index
+
+    def get(self, image_id: str) -> Optional[Dict[str, str]]:
+        entry = self.index.get(image_id)
+        if entry is None:
+            return None
+        mime, offset, length = entry
+        return {"mime": mime, "data": base64.b64encode(self.blob[offset:offset + length].tobytes()).decode()}
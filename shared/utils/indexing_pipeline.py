@@ -0,0 +1,312 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from langchain_core.documents import Document
+from shared.configs.static import (
+    INDEX_BATCH_SIZE,
+    INDEX_QUEUE_BATCHES,
+    INDEX_COMMIT_EVERY,
+    INDEX_PROGRESS_SECONDS,
+    INDEX_CHECKPOINT_DIR,
+)
+from shared.utils.filter_utils import TAG_KEY_PREFIX
+from shared.utils.pdf_utils import list_pdf_files, stream_pdf_chunks, document_metadata
+
+CHECKPOINT_VERSION = 1
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def checkpoint_path(persist_directory: str, collection_name: str) -> str:
+    return os.path.join(persist_directory, INDEX_CHECKPOINT_DIR, f"{collection_name}.json")
+
+
+def _is_document_metadata(key: str) -> bool:
+    return key in ("ingested_at", "tags") or key.startswith(TAG_KEY_PREFIX)
+
+
+def chunk_id(doc: Document) -> str:
+    """Deterministic id from a chunk's metadata and text, so re-indexing upserts instead of duplicating.
+
+    Ingestion time and tags are left out: re-indexing a document (or re-tagging it)
+    updates its chunks in place.
+    """
+    metadata = {k: v for k, v in doc.metadata.items() if not _is_document_metadata(k)}
+    key = json.dumps(metadata, sort_keys=True, default=str) + "\x00" + doc.page_content
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+class IndexingPipeline:
+    """Extract/chunk -> embed -> write, with bounded queues between the stages.
+
+    Chunking and embedding run in their own threads and hand over batches of
+    `batch_size` chunks through queues holding at most `queue_batches` batches,
+    so memory is bounded by a few batches regardless of corpus size. Every chunk
+    gets its document's `ingested_at` and tags (`document_metadata`). The writer
+    (calling thread) upserts each batch with deterministic ids and, every
+    `commit_every` batches, persists the store and records per-file progress
+    in a checkpoint. An interrupted run resumes from the last commit: finished
+    files are skipped and partially indexed ones continue after their last
+    committed chunk. A file indexed from its first chunk (new, changed, or not in
+    the checkpoint) first has its previous chunks, matched by `source`, deleted,
+    so edited documents leave no stale chunks behind. The checkpoint is removed
+    once every file is indexed.
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        embedding: Any,
+        checkpoint_file: str,
+        chunker: Callable[[str], Iterator[Document]] = stream_pdf_chunks,
+        batch_size: int = INDEX_BATCH_SIZE,
+        queue_batches: int = INDEX_QUEUE_BATCHES,
+        commit_every: int = INDEX_COMMIT_EVERY,
+        progress_seconds: float = INDEX_PROGRESS_SECONDS,
+    ):
+        self.backend = backend
+        self.embedding = embedding
+        self.checkpoint_file = checkpoint_file
+        self.chunker = chunker
+        self.batch_size = batch_size
+        self.queue_batches = queue_batches
+        self.commit_every = commit_every
+        self.progress_seconds = progress_seconds
+        self._stop = threading.Event()
+
+    # ---------- Checkpoint ----------
+    def _load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint_file):
+            return {}
+        try:
+            with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != CHECKPOINT_VERSION:
+                return {}
+            return payload.get("files", {})
+        except Exception as e:
+            print(f"Ignoring unreadable checkpoint {self.checkpoint_file}: {e}")
+            return {}
+
+    def _save_checkpoint(self, files: Dict[str, Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.checkpoint_file) or ".", exist_ok=True)
+        tmp_path = self.checkpoint_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CHECKPOINT_VERSION, "files": files}, f, indent=1)
+        os.replace(tmp_path, self.checkpoint_file)
+
+    # ---------- Stages ----------
+    def _put(self, q: "queue.Queue", item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, pdf_paths: Sequence[str], files: Dict[str, Dict[str, Any]], out: "queue.Queue"):
+        try:
+            items: List[tuple] = []
+            finished: List[tuple] = []
+            # Files starting over; the writer deletes their old chunks before adding the batch
+            resets: List[tuple] = []
+            for path in pdf_paths:
+                fingerprint = _fingerprint(path)
+                state = files.get(path)
+                if state is not None and state.get("fingerprint") != fingerprint:
+                    state = None
+                if state is not None and state.get("complete"):
+                    continue
+                skip = state["chunks_done"] if state is not None else 0
+                if skip == 0:
+                    resets.append((path, fingerprint))
+                count = 0
+                extra = document_metadata(path)
+                try:
+                    for doc in self.chunker(path):
+                        if count >= skip:
+                            doc.metadata.update(extra)
+                            items.append((path, fingerprint, count, doc))
+                            if len(items) == self.batch_size:
+                                if not self._put(out, {"items": items, "finished": finished, "resets": resets}):
+                                    return
+                                items, finished, resets = [], [], []
+                        count += 1
+                except Exception as e:
+                    print(f"Failed to read {path}: {e}")
+                    continue
+                finished.append((path, fingerprint, count))
+            if items or finished or resets:
+                if not self._put(out, {"items": items, "finished": finished, "resets": resets}):
+                    return
+            self._put(out, _DONE)
+        except BaseException as e:
+            self._put(out, _Failure(e))
+
+    def _embed(self, inp: "queue.Queue", out: "queue.Queue"):
+        try:
+            while not self._stop.is_set():
+                try:
+                    batch = inp.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if batch is _DONE or isinstance(batch, _Failure):
+                    self._put(out, batch)
+                    return
+                texts = [doc.page_content for _, _, _, doc in batch["items"]]
+                # Identical texts (e.g. per-role copies of a chunk) are embedded once
+                unique = list(dict.fromkeys(texts))
+                vectors = dict(zip(unique, self.embedding.embed_documents(unique))) if unique else {}
+                batch["embeddings"] = [vectors[t] for t in texts]
+                if not self._put(out, batch):
+                    return
+        except BaseException as e:
+            self._put(out, _Failure(e))
+
+    def _delete_source(self, path: str):
+        """Delete every chunk a previous run stored for this file (chunks carry its file name as `source`)."""
+        stale = self.backend.get(where={"source": os.path.basename(path)})["ids"]
+        if stale:
+            self.backend.delete(stale)
+
+    # ---------- Run ----------
+    def run(self, pdf_paths: Sequence[str]) -> Dict[str, Any]:
+        pdf_paths = list(pdf_paths)
+        files = self._load_checkpoint()
+        done = {
+            p for p in pdf_paths
+            if files.get(p, {}).get("complete") and files[p].get("fingerprint") == _fingerprint(p)
+        }
+        resumed = len(done)
+        if files:
+            print(f"Resuming from checkpoint {self.checkpoint_file} ({resumed} of {len(pdf_paths)} files already indexed)")
+
+        sizes = {p: os.path.getsize(p) for p in pdf_paths}
+        bytes_total = sum(sizes[p] for p in pdf_paths if p not in done)
+        stats = {"files": len(pdf_paths), "files_indexed": 0, "chunks": 0, "interrupted": False}
+
+        chunk_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_batches)
+        embed_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_batches)
+        self._stop.clear()
+        workers = [
+            threading.Thread(
+                target=self._produce,
+                args=(pdf_paths, {p: dict(state) for p, state in files.items()}, chunk_queue),
+                daemon=True,
+            ),
+            threading.Thread(target=self._embed, args=(chunk_queue, embed_queue), daemon=True),
+        ]
+        for worker in workers:
+            worker.start()
+
+        started = last_report = time.perf_counter()
+        bytes_done = 0
+        uncommitted = 0
+        failure: Optional[BaseException] = None
+
+        def report(final: bool = False):
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            docs_per_s = stats["files_indexed"] / elapsed
+            chunks_per_s = stats["chunks"] / elapsed
+            if bytes_done and bytes_total > bytes_done:
+                eta = f"{(bytes_total - bytes_done) * elapsed / bytes_done:.0f}s"
+            else:
+                eta = "0s" if final else "n/a"
+            print(
+                f"Indexed {stats['files_indexed'] + resumed}/{len(pdf_paths)} files, {stats['chunks']} chunks "
+                f"| {docs_per_s:.2f} docs/s, {chunks_per_s:.1f} chunks/s | ETA {eta}"
+            )
+
+        def commit():
+            self.backend.persist()
+            self._save_checkpoint(files)
+
+        try:
+            while True:
+                try:
+                    batch = embed_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if batch is _DONE:
+                    break
+                if isinstance(batch, _Failure):
+                    failure = batch.error
+                    break
+
+                for path, fingerprint in batch["resets"]:
+                    self._delete_source(path)
+                    files[path] = {"fingerprint": fingerprint, "chunks_done": 0, "complete": False}
+                items = batch["items"]
+                if items:
+                    docs = [doc for _, _, _, doc in items]
+                    self.backend.add(
+                        [chunk_id(doc) for doc in docs],
+                        [doc.page_content for doc in docs],
+                        batch["embeddings"],
+                        [doc.metadata for doc in docs],
+                    )
+                    stats["chunks"] += len(items)
+                for path, fingerprint, index, _ in items:
+                    state = files.setdefault(path, {"fingerprint": fingerprint, "chunks_done": 0, "complete": False})
+                    state["chunks_done"] = max(state["chunks_done"], index + 1)
+                for path, fingerprint, count in batch["finished"]:
+                    files[path] = {"fingerprint": fingerprint, "chunks_done": count, "complete": True}
+                    stats["files_indexed"] += 1
+                    bytes_done += sizes[path]
+
+                uncommitted += 1
+                if uncommitted >= self.commit_every:
+                    commit()
+                    uncommitted = 0
+                if time.perf_counter() - last_report >= self.progress_seconds:
+                    report()
+                    last_report = time.perf_counter()
+        except KeyboardInterrupt:
+            stats["interrupted"] = True
+        finally:
+            self._stop.set()
+            for worker in workers:
+                worker.join(timeout=5)
+
+        commit()
+        report(final=True)
+        if stats["interrupted"]:
+            print(f"Indexing interrupted; progress saved to {self.checkpoint_file}. Re-run to resume.")
+        elif failure is not None:
+            print(f"Indexing failed; progress saved to {self.checkpoint_file}. Re-run to resume.")
+            raise failure
+        elif all(files.get(p, {}).get("complete") for p in pdf_paths):
+            os.remove(self.checkpoint_file)
+        return stats
+
+
+def run_indexing(
+    backend: Any,
+    embedding: Any,
+    data_dir: str,
+    persist_directory: str,
+    collection_name: str,
+    chunker: Callable[[str], Iterator[Document]] = stream_pdf_chunks,
+) -> Dict[str, Any]:
+    """Index every PDF in `data_dir` into a collection through the batch pipeline."""
+    pipeline = IndexingPipeline(
+        backend,
+        embedding,
+        checkpoint_path(persist_directory, collection_name),
+        chunker=chunker,
+    )
+    return pipeline.run(list_pdf_files(data_dir))
@@ -0,0 +1,178 @@
+import json
+import math
+import os
+import re
+from typing import Callable, Collection, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Identifiers such as "HR-2023-07", "node.js" or "c++" stay whole and are also indexed by their parts
+_TOKEN = re.compile(r"[a-z0-9]+(?:[._\-/+#]+[a-z0-9]*)*")
+_TOKEN_PART = re.compile(r"[a-z0-9]+")
+
+# 2: only postings, document lengths and chunk ids are stored; texts live in the vector store
+FORMAT_VERSION = 2
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        parts = _TOKEN_PART.findall(token)
+        if len(parts) > 1 or (parts and parts[0] != token):
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """Compact inverted index with Okapi BM25 scoring.
+
+    Postings are kept in CSR form (per-term offsets into flat doc-id / term-frequency
+    arrays), so a query touches only the postings of its own terms and scores are
+    accumulated in one vectorised pass. Documents are identified by their chunk id
+    only; texts and metadata are resolved (and filtered) through the vector store.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.doc_lens = np.zeros(0, dtype=np.int32)
+        # Frozen (searchable) postings
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._doc_ids = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.uint16)
+        # Postings added since the last freeze: term_id -> ([doc ids], [tfs])
+        self._pending: Optional[Dict[int, Tuple[List[int], List[int]]]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _thaw(self) -> Dict[int, Tuple[List[int], List[int]]]:
+        if self._pending is None:
+            self._pending = {}
+            for term_id in range(len(self._offsets) - 1):
+                start, end = self._offsets[term_id], self._offsets[term_id + 1]
+                self._pending[term_id] = (self._doc_ids[start:end].tolist(), self._tfs[start:end].tolist())
+        return self._pending
+
+    def _freeze(self):
+        if self._pending is None:
+            return
+        n_terms = len(self.vocab)
+        lengths = np.zeros(n_terms, dtype=np.int64)
+        for term_id, (doc_ids, _) in self._pending.items():
+            lengths[term_id] = len(doc_ids)
+        offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        doc_ids_flat = np.empty(offsets[-1], dtype=np.int32)
+        tfs_flat = np.empty(offsets[-1], dtype=np.uint16)
+        for term_id, (doc_ids, tfs) in self._pending.items():
+            start, end = offsets[term_id], offsets[term_id + 1]
+            doc_ids_flat[start:end] = doc_ids
+            tfs_flat[start:end] = np.minimum(tfs, np.iinfo(np.uint16).max)
+        self._offsets, self._doc_ids, self._tfs = offsets, doc_ids_flat, tfs_flat
+        self._pending = None
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]):
+        """Add chunks to the index; internal document numbers follow insertion order."""
+        postings = self._thaw()
+        lens = []
+        for chunk_id, text in zip(ids, texts):
+            doc_id = len(self.ids)
+            counts: Dict[int, int] = {}
+            tokens = tokenize(text)
+            for token in tokens:
+                term_id = self.vocab.setdefault(token, len(self.vocab))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            for term_id, tf in counts.items():
+                doc_ids, tfs = postings.setdefault(term_id, ([], []))
+                doc_ids.append(doc_id)
+                tfs.append(tf)
+            self.ids.append(chunk_id)
+            lens.append(len(tokens))
+        self.doc_lens = np.concatenate([self.doc_lens, np.asarray(lens, dtype=np.int32)])
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        keep: Optional[Callable[[List[str]], Collection[str]]] = None,
+    ) -> List[Tuple[str, float]]:
+        """Top-k (chunk id, bm25 score) pairs for the query, best first.
+
+        `keep` pre-filters: given a page of candidate chunk ids (best first) it returns
+        those that may be returned. Pages grow geometrically until k hits are kept.
+        """
+        self._freeze()
+        n_docs = len(self.ids)
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if n_docs == 0 or not term_ids:
+            return []
+
+        avgdl = float(self.doc_lens.mean()) or 1.0
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lens / avgdl)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            doc_ids = self._doc_ids[start:end]
+            tfs = self._tfs[start:end].astype(np.float32)
+            df = end - start
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + norm[doc_ids])
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0 or k <= 0:
+            return []
+        if keep is None:
+            if candidates.size > k:
+                top = np.argpartition(-scores[candidates], k - 1)[:k]
+                candidates = candidates[top]
+            order = np.argsort(-scores[candidates], kind="stable")
+            return [(self.ids[i], float(scores[i])) for i in candidates[order]]
+
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        hits: List[Tuple[str, float]] = []
+        start, page = 0, 4 * k
+        while start < ranked.size and len(hits) < k:
+            page_rows = ranked[start:start + page]
+            kept = set(keep([self.ids[i] for i in page_rows]))
+            hits.extend((self.ids[i], float(scores[i])) for i in page_rows if self.ids[i] in kept)
+            start += page
+            page *= 4
+        return hits[:k]
+
+    def save(self, path: str):
+        self._freeze()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        header = {"version": FORMAT_VERSION, "k1": self.k1, "b": self.b}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                header=np.frombuffer(json.dumps(header).encode(), dtype=np.uint8),
+                terms=np.frombuffer(json.dumps(terms).encode(), dtype=np.uint8),
+                ids=np.frombuffer(json.dumps(self.ids).encode(), dtype=np.uint8),
+                doc_lens=self.doc_lens,
+                offsets=self._offsets,
+                doc_ids=self._doc_ids,
+                tfs=self._tfs,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes())
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported lexical index version: {header.get('version')} (re-run vectorization to rebuild it)")
+            index = cls(k1=header["k1"], b=header["b"])
+            terms = json.loads(data["terms"].tobytes())
+            index.vocab = {term: i for i, term in enumerate(terms)}
+            index.ids = json.loads(data["ids"].tobytes())
+            index.doc_lens = data["doc_lens"]
+            index._offsets = data["offsets"]
+            index._doc_ids = data["doc_ids"]
+            index._tfs = data["tfs"]
+        return index
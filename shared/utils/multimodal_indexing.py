@@ -0,0 +1,283 @@
+import io
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+import fitz
+from PIL import Image
+from shared.configs.static import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    MM_MIN_IMAGE_WIDTH,
+    MM_MIN_IMAGE_HEIGHT,
+    MM_MIN_IMAGE_AREA,
+    MM_IMAGE_DEDUP,
+    MM_IMAGE_MAX_EDGE,
+    MM_IMAGE_FORMAT,
+    MM_IMAGE_QUALITY,
+    MM_INDEX_WORKERS,
+    MM_INDEX_PAGES_PER_TASK,
+    MM_CLIP_BATCH_SIZE,
+    MM_INDEX_QUEUE_BATCHES,
+)
+from shared.utils.image_utils import content_hash, dhash, encode_image_payload
+
+# CLIP resizes the shortest edge to 224 px anyway; shrinking in the worker keeps the
+# images handed back to the parent process small
+CLIP_INPUT_EDGE = 224
+
+_DONE = object()
+_splitter = None
+
+
+def _image_too_small(width: int, height: int) -> bool:
+    return width < MM_MIN_IMAGE_WIDTH or height < MM_MIN_IMAGE_HEIGHT or width * height < MM_MIN_IMAGE_AREA
+
+
+def _clip_input(image: Image.Image) -> Image.Image:
+    width, height = image.size
+    short = min(width, height)
+    if short <= CLIP_INPUT_EDGE:
+        return image
+    size = (round(width * CLIP_INPUT_EDGE / short), round(height * CLIP_INPUT_EDGE / short))
+    return image.resize(size, Image.Resampling.BICUBIC)
+
+
+def image_caption(page: Any, xref: int, max_chars: int = 200) -> str:
+    """Text printed just below (or else above) an image on its page, used when the image itself is not sent."""
+    try:
+        rects = page.get_image_rects(xref)
+    except Exception:
+        rects = []
+    if not rects:
+        return ""
+    rect = rects[0]
+    for band in (fitz.Rect(rect.x0, rect.y1, rect.x1, rect.y1 + 40), fitz.Rect(rect.x0, rect.y0 - 40, rect.x1, rect.y0)):
+        text = " ".join(page.get_textbox(band).split())
+        if text:
+            return text[:max_chars]
+    return ""
+
+
+def plan_page_ranges(pdf_paths: Sequence[str], pages_per_task: int = MM_INDEX_PAGES_PER_TASK) -> List[Tuple[str, int, int]]:
+    """Split every PDF into (path, first page, end page) tasks of at most `pages_per_task` pages."""
+    tasks = []
+    for path in pdf_paths:
+        try:
+            with fitz.open(path) as doc:
+                n_pages = doc.page_count
+        except Exception as e:
+            print(f"Error processing PDF {path}: {e}")
+            continue
+        for start in range(0, n_pages, pages_per_task):
+            tasks.append((path, start, min(start + pages_per_task, n_pages)))
+    return tasks
+
+
+def extract_page_range(task: Tuple[str, int, int]) -> Dict[str, Any]:
+    """Worker: text chunks and decoded, pre-encoded images of one page range, in page order.
+
+    Runs in a child process with its own `fitz` handle. Everything that does not need
+    the CLIP model (text splitting, image decoding, size filtering, hashing, payload
+    encoding, captions) happens here; de-duplication across ranges is left to the parent,
+    which sees the ranges in order.
+    """
+    global _splitter
+    if _splitter is None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        _splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    path, start, end = task
+    items: List[Dict[str, Any]] = []
+    stats = {"images_seen": 0, "skipped_repeated_xref": 0, "skipped_too_small": 0, "errors": 0}
+    seen_xrefs = set()
+    try:
+        doc = fitz.open(path)
+    except Exception as e:
+        return {"task": task, "items": items, "stats": stats, "error": str(e)}
+
+    try:
+        for i in range(start, end):
+            page = doc[i]
+            text = page.get_text()
+            if text.strip():
+                for chunk in _splitter.split_text(text):
+                    items.append({"kind": "text", "page": i, "text": chunk})
+
+            for img_index, img in enumerate(page.get_images(full=True)):
+                stats["images_seen"] += 1
+                xref, width, height = img[0], img[2], img[3]
+                # Logos, headers and watermarks reuse one xref on every page
+                if xref in seen_xrefs:
+                    stats["skipped_repeated_xref"] += 1
+                    continue
+                seen_xrefs.add(xref)
+                if _image_too_small(width, height):
+                    stats["skipped_too_small"] += 1
+                    continue
+                try:
+                    image_bytes = doc.extract_image(xref)["image"]
+                    pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+                    if _image_too_small(*pil_image.size):
+                        stats["skipped_too_small"] += 1
+                        continue
+                    mime, data = encode_image_payload(pil_image, MM_IMAGE_MAX_EDGE, MM_IMAGE_FORMAT, MM_IMAGE_QUALITY)
+                    items.append({
+                        "kind": "image",
+                        "page": i,
+                        "img_index": img_index,
+                        "xref": xref,
+                        "digest": content_hash(image_bytes),
+                        "phash": dhash(pil_image) if MM_IMAGE_DEDUP == "phash" else None,
+                        "mime": mime,
+                        "data": data,
+                        "caption": image_caption(page, xref),
+                        "image": _clip_input(pil_image),
+                    })
+                except Exception as e:
+                    stats["errors"] += 1
+                    print(f"Error processing image {img_index} on page {i}: {e}")
+        return {"task": task, "items": items, "stats": stats, "error": None}
+    finally:
+        doc.close()
+
+
+def _worker_count(workers: int) -> int:
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def iter_extracted_ranges(tasks: Sequence[Tuple[str, int, int]], workers: int = MM_INDEX_WORKERS) -> Iterator[Dict[str, Any]]:
+    """Run `extract_page_range` over `tasks` and yield the results in task order.
+
+    At most two tasks per worker are in flight, so finished-but-unconsumed results
+    stay bounded. With a single worker (or task) everything runs in-process.
+    """
+    workers = min(_worker_count(workers), max(len(tasks), 1))
+    if workers == 1:
+        for task in tasks:
+            yield extract_page_range(task)
+        return
+    # spawn, not fork: the parent already holds the CLIP model and its threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        remaining = iter(tasks)
+        for task in remaining:
+            pending.append(pool.submit(extract_page_range, task))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            result = pending.popleft().result()
+            for task in remaining:
+                pending.append(pool.submit(extract_page_range, task))
+                break
+            yield result
+
+
+class ClipBatchStage:
+    """Thread owning the CLIP encoder; embeds items sent through a bounded queue in batches.
+
+    `submit(seq, kind, value)` takes a text or a PIL image. Texts and images are
+    batched separately, up to `batch_size` each; `close()` flushes what is left and
+    returns the embeddings keyed by `seq`, while `stop()` discards it.
+    """
+
+    def __init__(self, clip: Any, batch_size: int = MM_CLIP_BATCH_SIZE, queue_batches: int = MM_INDEX_QUEUE_BATCHES):
+        self.clip = clip
+        self.batch_size = batch_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=batch_size * queue_batches)
+        self._embeddings: Dict[int, Any] = {}
+        self._error = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _flush(self, kind: str, pending: List[Tuple[int, Any]]):
+        if not pending:
+            return
+        values = [value for _, value in pending]
+        vectors = self.clip.embed_texts(values) if kind == "text" else self.clip.embed_images(values)
+        for (seq, _), vector in zip(pending, vectors):
+            self._embeddings[seq] = vector
+        pending.clear()
+
+    def _run(self):
+        pending = {"text": [], "image": []}
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    break
+                if self._stopped.is_set():
+                    continue
+                seq, kind, value = item
+                pending[kind].append((seq, value))
+                if len(pending[kind]) >= self.batch_size:
+                    self._flush(kind, pending[kind])
+            if not self._stopped.is_set():
+                for kind, batch in pending.items():
+                    self._flush(kind, batch)
+        except BaseException as e:
+            self._error = e
+            # Keep draining so producers blocked on a full queue can finish
+            while self._queue.get() is not _DONE:
+                pass
+
+    def submit(self, seq: int, kind: str, value: Any):
+        self._queue.put((seq, kind, value))
+
+    def close(self) -> Dict[int, Any]:
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._embeddings
+
+    def stop(self):
+        """Shut the thread down without embedding what is still queued or raising its error."""
+        self._stopped.set()
+        self._queue.put(_DONE)
+        self._thread.join()
+
+
+def run_multimodal_extraction(
+    pdf_paths: Sequence[str],
+    clip: Any,
+    on_item: Callable[[str, Dict[str, Any]], bool],
+    on_stats: Callable[[Dict[str, int]], None],
+    workers: int = MM_INDEX_WORKERS,
+    pages_per_task: int = MM_INDEX_PAGES_PER_TASK,
+) -> Tuple[List[Tuple[str, Dict[str, Any]]], Dict[int, Any]]:
+    """Extract PDFs in parallel page ranges and embed the accepted items with one CLIP stage.
+
+    `on_item(path, item)` is called in document/page order and decides whether an
+    item is kept (this is where cross-range de-duplication happens). Returns the kept
+    (path, item) pairs in that order and their embeddings keyed by position, so the
+    caller can build its index deterministically regardless of worker timing.
+    """
+    tasks = plan_page_ranges(pdf_paths, pages_per_task)
+    stage = ClipBatchStage(clip)
+    kept: List[Tuple[str, Dict[str, Any]]] = []
+    current_path = None
+    try:
+        for result in iter_extracted_ranges(tasks, workers):
+            path = result["task"][0]
+            if path != current_path:
+                print(f"Processing PDF: {os.path.basename(path)}")
+                current_path = path
+            if result["error"]:
+                print(f"Error processing PDF {path}: {result['error']}")
+                continue
+            on_stats(result["stats"])
+            for item in result["items"]:
+                if not on_item(path, item):
+                    continue
+                stage.submit(len(kept), item["kind"], item.pop("image", None) if item["kind"] == "image" else item["text"])
+                kept.append((path, item))
+    except BaseException:
+        # Don't wait on CLIP for items nobody will index, or let a stage error mask this one
+        stage.stop()
+        raise
+    return kept, stage.close()
@@ -0,0 +1,366 @@
+import json
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from shared.configs.static import (
+    ONNX_CACHE_DIR,
+    ONNX_QUANTIZE,
+    ONNX_INTRA_OP_THREADS,
+    ONNX_BATCH_SIZE,
+    ONNX_PARITY_MIN_COSINE,
+)
+from shared.utils.similarity_utils import normalize_rows
+
+OPSET_VERSION = 17
+META_FILE = "meta.json"
+
+# Inputs the exported graphs are compared against torch on before first use
+PARITY_TEXTS = [
+    "What benefits are available to new employees?",
+    "Quarterly revenue grew 12% year over year, driven by cloud services.",
+    "Python, SQL and distributed systems experience",
+    "a chart showing revenue trends",
+]
+
+
+def artefact_dir(model_name: str) -> str:
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "--"))
+
+
+def _read_meta(directory: str) -> Dict[str, Any]:
+    path = os.path.join(directory, META_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_meta(directory: str, meta: Dict[str, Any]):
+    path = os.path.join(directory, META_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def min_cosine(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Lowest row-wise cosine similarity between two embedding matrices."""
+    return float(np.min(np.sum(normalize_rows(reference) * normalize_rows(candidate), axis=1)))
+
+
+def create_session(path: str):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_INTRA_OP_THREADS:
+        options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def _export(module: Any, args: tuple, path: str, input_names: List[str]):
+    import torch
+    dynamic_axes = {name: {0: "batch"} for name in input_names + ["embeddings"]}
+    for name in input_names:
+        if name in ("input_ids", "attention_mask"):
+            dynamic_axes[name][1] = "sequence"
+    tmp_path = path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            args,
+            tmp_path,
+            input_names=input_names,
+            output_names=["embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=OPSET_VERSION,
+            do_constant_folding=True,
+        )
+    os.replace(tmp_path, path)
+
+
+def _quantize(fp32_path: str, int8_path: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    tmp_path = int8_path + ".tmp"
+    quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, int8_path)
+
+
+def prepare_graph(
+    directory: str,
+    graph: str,
+    export: Callable[[str], None],
+    reference: Callable[[], np.ndarray],
+    run: Callable[[Any], np.ndarray],
+) -> Optional[str]:
+    """Path of a cached ONNX graph whose embeddings match torch, exporting it on first use.
+
+    With ONNX_QUANTIZE the dynamic-int8 variant is tried first and the fp32 graph is
+    the fallback. The parity outcome is recorded in meta.json, so later runs load
+    the chosen graph without touching torch; None means no variant passed.
+    """
+    key = f"{graph}:{'int8' if ONNX_QUANTIZE else 'fp32'}"
+    meta = _read_meta(directory)
+    record = meta.get(key)
+    if record is not None and (record["file"] is None or os.path.exists(os.path.join(directory, record["file"]))):
+        return os.path.join(directory, record["file"]) if record["file"] else None
+
+    os.makedirs(directory, exist_ok=True)
+    fp32_path = os.path.join(directory, f"{graph}.onnx")
+    if not os.path.exists(fp32_path):
+        print(f"Exporting {graph} encoder to {fp32_path}")
+        export(fp32_path)
+    variants = [fp32_path]
+    if ONNX_QUANTIZE:
+        int8_path = os.path.join(directory, f"{graph}.int8.onnx")
+        if not os.path.exists(int8_path):
+            _quantize(fp32_path, int8_path)
+        variants.insert(0, int8_path)
+
+    expected = reference()
+    chosen, score = None, 0.0
+    for path in variants:
+        score = min_cosine(expected, run(create_session(path)))
+        print(f"ONNX parity for {os.path.basename(path)}: min cosine {score:.4f}")
+        if score >= ONNX_PARITY_MIN_COSINE:
+            chosen = path
+            break
+    meta = _read_meta(directory)
+    meta[key] = {"file": os.path.basename(chosen) if chosen else None, "min_cosine": round(score, 6)}
+    _write_meta(directory, meta)
+    if chosen is None:
+        print(f"ONNX {graph} encoder failed the parity check (min cosine {score:.4f} < {ONNX_PARITY_MIN_COSINE})")
+    return chosen
+
+
+def _in_batches(items: Sequence[Any], size: int = ONNX_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class OnnxTextEmbeddings(Embeddings):
+    """Sentence-transformers style (mean pooled, normalised) embeddings from an ONNX graph."""
+
+    def __init__(self, session: Any, tokenizer: Any, max_length: int, batch_size: int = ONNX_BATCH_SIZE):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.input_names = [i.name for i in session.get_inputs()]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # Texts of similar length share a batch, so less compute is spent on padding
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        out = None
+        for idx in _in_batches(order, self.batch_size):
+            enc = self.tokenizer(
+                [texts[i] for i in idx],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            vectors = self.session.run(None, {name: enc[name].astype(np.int64) for name in self.input_names})[0]
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[idx] = vectors
+        return out
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text])[0].tolist()
+
+
+def _mean_pooled_encoder(transformer: Any, normalize: bool):
+    import torch
+
+    class MeanPooledEncoder(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask):
+            hidden = self.transformer(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+            mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            return torch.nn.functional.normalize(pooled, dim=-1) if normalize else pooled
+
+    return MeanPooledEncoder().eval()
+
+
+@lru_cache(maxsize=None)
+def load_onnx_text_embeddings(model_name: str) -> Optional[OnnxTextEmbeddings]:
+    """ONNX Runtime version of a sentence-transformers model, or None to fall back to torch."""
+    try:
+        import onnxruntime  # noqa: F401
+        from transformers import AutoTokenizer
+    except ImportError:
+        print("onnxruntime is not installed; using torch embeddings.")
+        return None
+
+    directory = artefact_dir(model_name)
+    torch_model = {}
+
+    def reference_model():
+        if "model" not in torch_model:
+            from sentence_transformers import SentenceTransformer
+            torch_model["model"] = SentenceTransformer(model_name, device="cpu")
+        return torch_model["model"]
+
+    def export(path: str):
+        from sentence_transformers.models import Normalize
+        model = reference_model()
+        if not getattr(model[1], "pooling_mode_mean_tokens", False):
+            raise ValueError(f"{model_name} does not use mean pooling")
+        model.tokenizer.save_pretrained(directory)
+        meta = _read_meta(directory)
+        meta["max_length"] = int(model.max_seq_length)
+        _write_meta(directory, meta)
+        encoder = _mean_pooled_encoder(model[0].auto_model, any(isinstance(m, Normalize) for m in model))
+        sample = model.tokenizer(PARITY_TEXTS[:2], padding=True, return_tensors="pt")
+        _export(encoder, (sample["input_ids"], sample["attention_mask"]), path, ["input_ids", "attention_mask"])
+
+    try:
+        path = prepare_graph(
+            directory,
+            "text",
+            export,
+            reference=lambda: reference_model().encode(PARITY_TEXTS, convert_to_numpy=True),
+            run=lambda session: OnnxTextEmbeddings(
+                session, AutoTokenizer.from_pretrained(directory), _read_meta(directory)["max_length"]
+            ).embed(PARITY_TEXTS),
+        )
+        if path is None:
+            return None
+        tokenizer = AutoTokenizer.from_pretrained(directory)
+        embeddings = OnnxTextEmbeddings(create_session(path), tokenizer, _read_meta(directory)["max_length"])
+    except Exception as e:
+        print(f"Error preparing ONNX embeddings for {model_name}: {e}; using torch embeddings.")
+        return None
+    print(f"Using ONNX Runtime embeddings: {path}")
+    return embeddings
+
+
+class OnnxClipEncoder:
+    """CLIP text and image towers (normalised features) running in ONNX Runtime."""
+
+    def __init__(self, text_session: Any, image_session: Any, processor: Any, batch_size: int = ONNX_BATCH_SIZE):
+        self.text_session = text_session
+        self.image_session = image_session
+        self.processor = processor
+        self.batch_size = batch_size
+
+    def embed_texts(self, texts: Sequence[str]) -> np.ndarray:
+        outputs = []
+        for batch in _in_batches(list(texts), self.batch_size):
+            enc = self.processor(text=batch, return_tensors="np", padding=True, truncation=True, max_length=77)
+            feeds = {"input_ids": enc["input_ids"].astype(np.int64), "attention_mask": enc["attention_mask"].astype(np.int64)}
+            outputs.append(self.text_session.run(None, feeds)[0])
+        return np.concatenate(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_images(self, images: Sequence[Any]) -> np.ndarray:
+        outputs = []
+        for batch in _in_batches(list(images), self.batch_size):
+            enc = self.processor(images=batch, return_tensors="np")
+            outputs.append(self.image_session.run(None, {"pixel_values": enc["pixel_values"].astype(np.float32)})[0])
+        return np.concatenate(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+
+
+def _clip_towers(model: Any):
+    import torch
+
+    class TextTower(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            features = self.model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+            return features / features.norm(dim=-1, keepdim=True)
+
+    class ImageTower(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            features = self.model.get_image_features(pixel_values=pixel_values)
+            return features / features.norm(dim=-1, keepdim=True)
+
+    return TextTower().eval(), ImageTower().eval()
+
+
+def _parity_images() -> List[Any]:
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    noise = (rng.random((224, 224, 3)) * 255).astype(np.uint8)
+    gradient = np.tile(np.linspace(0, 255, 224, dtype=np.uint8)[None, :, None], (224, 1, 3))
+    return [Image.fromarray(noise), Image.fromarray(gradient)]
+
+
+@lru_cache(maxsize=None)
+def load_onnx_clip_encoder(
+    model_name: str,
+    processor_name: str,
+    reference_factory: Callable[[str, str], Any],
+) -> Optional[OnnxClipEncoder]:
+    """ONNX Runtime CLIP encoder, or None to fall back to torch.
+
+    `reference_factory(model_name, processor_name)` builds the torch encoder used
+    for export and the parity check; it is only called when artefacts are missing.
+    """
+    try:
+        import onnxruntime  # noqa: F401
+        from transformers import CLIPProcessor
+    except ImportError:
+        print("onnxruntime is not installed; using torch CLIP.")
+        return None
+
+    directory = artefact_dir(model_name)
+    processor = CLIPProcessor.from_pretrained(processor_name)
+    reference = {}
+
+    def reference_encoder():
+        if "encoder" not in reference:
+            reference["encoder"] = reference_factory(model_name, processor_name)
+        return reference["encoder"]
+
+    def export_text(path: str):
+        text_tower, _ = _clip_towers(reference_encoder().model)
+        sample = processor(text=PARITY_TEXTS[:2], return_tensors="pt", padding=True)
+        _export(text_tower, (sample["input_ids"], sample["attention_mask"]), path, ["input_ids", "attention_mask"])
+
+    def export_image(path: str):
+        _, image_tower = _clip_towers(reference_encoder().model)
+        sample = processor(images=_parity_images(), return_tensors="pt")
+        _export(image_tower, (sample["pixel_values"],), path, ["pixel_values"])
+
+    images = _parity_images()
+    try:
+        text_path = prepare_graph(
+            directory,
+            "clip_text",
+            export_text,
+            reference=lambda: reference_encoder().embed_texts(PARITY_TEXTS),
+            run=lambda session: OnnxClipEncoder(session, None, processor).embed_texts(PARITY_TEXTS),
+        )
+        image_path = prepare_graph(
+            directory,
+            "clip_image",
+            export_image,
+            reference=lambda: reference_encoder().embed_images(images),
+            run=lambda session: OnnxClipEncoder(None, session, processor).embed_images(images),
+        )
+        if text_path is None or image_path is None:
+            return None
+        encoder = OnnxClipEncoder(create_session(text_path), create_session(image_path), processor)
+    except Exception as e:
+        print(f"Error preparing ONNX CLIP for {model_name}: {e}; using torch CLIP.")
+        return None
+    print(f"Using ONNX Runtime CLIP: {text_path}, {image_path}")
+    return encoder
@@ -1,5 +1,14 @@
 import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import fitz  # PyMuPDF
+from langchain_core.documents import Document
+from shared.configs.static import CHUNK_SIZE, CHUNK_OVERLAP, DOCUMENT_TAGS
+from shared.utils.filter_utils import tag_metadata
+
+# Preferred chunk boundaries, best first; a cut is only taken in the second half of a window
+_SEPARATORS = ("\n\n", "\n", ". ", " ")
+
 
 def load_pdfs_from_folder(folder_path: str):
     """Load and concatenate text from all PDFs in a folder using PyMuPDF."""
@@ -22,3 +31,114 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50):
         chunks.append(text[start:end])
         start += chunk_size - overlap
     return chunks
+
+def list_pdf_files(folder_path: str) -> List[str]:
+    """PDF paths in a folder, in a stable (sorted) order."""
+    return sorted(
+        os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.lower().endswith(".pdf")
+    )
+
+def document_metadata(pdf_path: str, ingested_at: Optional[float] = None) -> Dict[str, Any]:
+    """Metadata shared by every chunk of a document: `ingested_at` (epoch seconds) and its DOCUMENT_TAGS."""
+    ingested_at = time.time() if ingested_at is None else ingested_at
+    return {"ingested_at": int(ingested_at), **tag_metadata(DOCUMENT_TAGS.get(os.path.basename(pdf_path), ()))}
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (page index, text) one page at a time; only the current page is held in memory."""
+    doc = fitz.open(pdf_path)
+    try:
+        for i, page in enumerate(doc):
+            yield i, page.get_text()
+    finally:
+        doc.close()
+
+def _cut_point(window: str, chunk_size: int) -> int:
+    if len(window) <= chunk_size:
+        return len(window)
+    for sep in _SEPARATORS:
+        pos = window.rfind(sep, chunk_size // 2, chunk_size)
+        if pos != -1:
+            return pos + len(sep)
+    return chunk_size
+
+def stream_pdf_chunks(
+    pdf_path: str,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Iterator[Document]:
+    """Chunk a PDF page by page, yielding Documents as soon as they are complete.
+
+    Pages are read incrementally into a buffer that never holds more than the
+    current page plus one chunk, and the overlap carries across page boundaries.
+    Each chunk's metadata has `source` (file name), `page` and `page_end`
+    (0-based pages the chunk starts and ends on) and `start_index` / `end_index`
+    (character offsets into the document's page texts joined in order).
+    """
+    base = {"source": os.path.basename(pdf_path), **(metadata or {})}
+    buffer = ""
+    buffer_start = 0  # document offset of buffer[0]
+    page_starts: List[Tuple[int, int]] = []  # (document offset, page index) of pages still in the buffer
+    emitted_until = 0  # document offset where the last emitted chunk ends
+
+    def page_at(offset: int) -> int:
+        page = page_starts[0][1]
+        for start, index in page_starts:
+            if start > offset:
+                break
+            page = index
+        return page
+
+    def emit(end: int) -> Optional[Document]:
+        text = buffer[:end]
+        stripped = text.strip()
+        if not stripped:
+            return None
+        start = buffer_start + (len(text) - len(text.lstrip()))
+        stop = start + len(stripped)
+        return Document(
+            page_content=stripped,
+            metadata={**base, "page": page_at(start), "page_end": page_at(stop - 1), "start_index": start, "end_index": stop},
+        )
+
+    def advance(cut: int):
+        nonlocal buffer, buffer_start
+        step = cut - chunk_overlap
+        if step > 0 and chunk_overlap:
+            # Start the overlap on a word boundary
+            space = buffer.find(" ", step, cut)
+            step = space + 1 if space != -1 else step
+        step = max(step, 1)
+        buffer = buffer[step:]
+        buffer_start += step
+        while len(page_starts) > 1 and page_starts[1][0] <= buffer_start:
+            page_starts.pop(0)
+
+    for index, text in iter_pdf_pages(pdf_path):
+        page_starts.append((buffer_start + len(buffer), index))
+        buffer += text
+        while len(buffer) > chunk_size:
+            cut = _cut_point(buffer[:chunk_size + 1], chunk_size)
+            chunk = emit(cut)
+            if chunk is not None:
+                yield chunk
+            emitted_until = buffer_start + cut
+            advance(cut)
+    # Whatever follows the last chunk (beyond the carried-over overlap) becomes the final chunk
+    if page_starts and buffer[max(emitted_until - buffer_start, 0):].strip():
+        chunk = emit(len(buffer))
+        if chunk is not None:
+            yield chunk
+
+def stream_folder_chunks(
+    folder_path: str,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Iterator[Document]:
+    """Chunks of every PDF in a folder (see `stream_pdf_chunks`); unreadable files are skipped."""
+    for pdf_path in list_pdf_files(folder_path):
+        try:
+            yield from stream_pdf_chunks(pdf_path, chunk_size, chunk_overlap, metadata)
+        except Exception as e:
+            print(f"Failed to read {pdf_path}: {e}")
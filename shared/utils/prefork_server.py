@@ -0,0 +1,171 @@
+import gc
+import json
+import os
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, Optional
+from shared.configs.static import (
+    SERVE_HOST,
+    SERVE_PORT,
+    SERVE_WORKERS,
+    SERVE_TORCH_THREADS,
+    EMBEDDING_BACKEND,
+    ONNX_INTRA_OP_THREADS,
+)
+from shared.utils.chroma_utils import close_chroma_clients
+
+_SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def memory_usage() -> Dict[str, float]:
+    """This process's memory in MB (rss, pss, shared, private); empty where /proc is unavailable."""
+    fields = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in _SMAPS_FIELDS:
+                    fields[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(fields.get("Rss", 0.0), 1),
+        "pss_mb": round(fields.get("Pss", 0.0), 1),
+        "shared_mb": round(fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0), 1),
+        "private_mb": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1),
+    }
+
+
+def make_handler(rag: Any, rag_type: str):
+    class RAGRequestHandler(BaseHTTPRequestHandler):
+        """GET /health -> worker pid and memory; POST /answer {"question"} -> {"answer"}."""
+
+        def _send_json(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/health":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            self._send_json(200, {"pid": os.getpid(), "rag_type": rag_type, **memory_usage()})
+
+        def do_POST(self):
+            if self.path != "/answer":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                question = json.loads(self.rfile.read(length) or b"{}").get("question")
+            except (ValueError, AttributeError):
+                question = None
+            if not isinstance(question, str) or not question.strip():
+                self._send_json(400, {"error": 'Expected a JSON body {"question": "..."}'})
+                return
+            try:
+                answer = rag.answer(question)
+            except Exception as e:
+                print(f"Error answering question in worker {os.getpid()}: {e}")
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, {"answer": answer})
+
+    return RAGRequestHandler
+
+
+def _limit_torch_threads():
+    torch = sys.modules.get("torch")
+    if torch is not None and SERVE_TORCH_THREADS:
+        torch.set_num_threads(SERVE_TORCH_THREADS)
+
+
+def _run_worker(server: HTTPServer):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _limit_torch_threads()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_chroma_clients()
+        # Skip the parent's atexit handlers and buffered state
+        os._exit(0)
+
+
+def _fork_worker(server: HTTPServer) -> int:
+    pid = os.fork()
+    if pid == 0:
+        _run_worker(server)
+    return pid
+
+
+def serve(rag: Any, rag_type: str, host: str = SERVE_HOST, port: int = SERVE_PORT, workers: Optional[int] = None):
+    """Serve a pipeline over HTTP from pre-forked worker processes sharing one loaded index.
+
+    Everything read-only is loaded in this process first (models by the pipeline,
+    indexes by `retriever.preload()`), then the workers are forked. Memory-mapped
+    files (NumPy vectors and texts, image payloads) are shared through the page
+    cache and the rest copy-on-write; `gc.freeze()` keeps the collector from
+    writing to, and so copying, the inherited objects.
+    """
+    workers = workers if workers is not None else SERVE_WORKERS
+    workers = workers or os.cpu_count() or 1
+    if not hasattr(os, "fork"):
+        print("Pre-fork serving needs os.fork; serving from a single process.")
+        workers = 0
+    if workers and EMBEDDING_BACKEND == "onnx" and ONNX_INTRA_OP_THREADS != 1:
+        print("Pre-fork serving with ONNX Runtime needs ONNX_INTRA_OP_THREADS = 1 (its thread pools do not survive fork).")
+        return
+    if getattr(rag.retriever, "vector_backend", None) == "chroma":
+        print("Note: each worker opens its own Chroma client; use the numpy backend to share vectors between workers.")
+
+    rag.retriever.preload()
+    server = HTTPServer((host, port), make_handler(rag, rag_type))
+    print(f"Serving {rag_type} on http://{host}:{port} (POST /answer, GET /health)")
+    if not workers:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    gc.collect()
+    gc.freeze()
+    print(f"Parent {os.getpid()} loaded: {memory_usage()}")
+    children = set()
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for _ in range(workers):
+            children.add(_fork_worker(server))
+        print(f"Started {workers} workers: {sorted(children)}")
+        while children:
+            pid, status = os.wait()
+            children.discard(pid)
+            print(f"Worker {pid} exited ({status}); starting a replacement")
+            children.add(_fork_worker(server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        server.server_close()
+        print("Stopped serving")
@@ -0,0 +1,109 @@
+import os
+from typing import Optional
+import numpy as np
+
+# Rows scored per block when scanning int8 codes, bounding the float32 temporary
+SCAN_CHUNK_ROWS = 16384
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(arr: np.ndarray) -> np.ndarray:
+    """Set-bit counts of a 2-D unsigned array; sum over axis 1 for per-row totals."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(arr)
+    return _POPCOUNT[arr.view(np.uint8)].reshape(arr.shape[0], -1)
+
+
+def _atomic_save(path: str, arr: np.ndarray):
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, arr)
+    os.replace(tmp_path, path)
+
+
+class QuantizedCodes:
+    """Compressed copy of a matrix of unit vectors, used only to shortlist candidates.
+
+    - int8: symmetric per-dimension scalar quantisation (code = round(x / scale));
+      approximate cosine is (query * scale) @ codes.T.
+    - binary: one sign bit per dimension, packed 8 per byte; candidates are the
+      rows with the smallest Hamming distance to the query's sign bits.
+
+    Shortlisted rows are meant to be rescored with the full-precision vectors.
+    """
+
+    def __init__(self, mode: str, codes: np.ndarray, scale: Optional[np.ndarray] = None):
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"Invalid quantization mode: {mode}")
+        self.mode = mode
+        self.codes = codes
+        self.scale = scale
+
+    def __len__(self) -> int:
+        return int(self.codes.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0))
+
+    @classmethod
+    def build(cls, mode: str, vectors: np.ndarray) -> "QuantizedCodes":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if mode == "int8":
+            scale = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+            scale = np.where(scale == 0, 1.0, scale).astype(np.float32)
+            codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+            return cls(mode, codes, scale)
+        return cls(mode, np.packbits(vectors > 0, axis=1))
+
+    # ---------- Persistence ----------
+    @staticmethod
+    def _paths(mode: str, directory: str):
+        return os.path.join(directory, f"codes_{mode}.npy"), os.path.join(directory, f"scale_{mode}.npy")
+
+    def save(self, directory: str):
+        codes_path, scale_path = self._paths(self.mode, directory)
+        _atomic_save(codes_path, self.codes)
+        if self.scale is not None:
+            _atomic_save(scale_path, self.scale)
+
+    @classmethod
+    def load(cls, mode: str, directory: str) -> Optional["QuantizedCodes"]:
+        codes_path, scale_path = cls._paths(mode, directory)
+        if not os.path.exists(codes_path) or (mode == "int8" and not os.path.exists(scale_path)):
+            return None
+        # Codes are small and scanned on every query, so they are read fully into RAM
+        codes = np.load(codes_path)
+        scale = np.load(scale_path) if mode == "int8" else None
+        return cls(mode, codes, scale)
+
+    # ---------- Search ----------
+    def scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Approximate similarity (higher is closer) of each query to each row, shape queries x rows."""
+        codes = self.codes if rows is None else self.codes[rows]
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.mode == "int8":
+            scaled = queries * self.scale
+            out = np.empty((queries.shape[0], codes.shape[0]), dtype=np.float32)
+            for start in range(0, codes.shape[0], SCAN_CHUNK_ROWS):
+                block = codes[start:start + SCAN_CHUNK_ROWS].astype(np.float32)
+                out[:, start:start + block.shape[0]] = scaled @ block.T
+            return out
+        query_bits = np.packbits(queries > 0, axis=1)
+        if codes.shape[1] % 8 == 0:
+            # Compare 64 dimensions per XOR
+            codes = np.ascontiguousarray(codes).view(np.uint64)
+            query_bits = np.ascontiguousarray(query_bits).view(np.uint64)
+        out = np.empty((queries.shape[0], codes.shape[0]), dtype=np.float32)
+        for j, bits in enumerate(query_bits):
+            out[j] = -popcount(np.bitwise_xor(codes, bits)).sum(axis=1, dtype=np.int32)
+        return out
+
+    def shortlist(self, queries: np.ndarray, n: int, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Row ids of the `n` best rows for each query by approximate score (unordered), shape queries x n."""
+        scores = self.scores(queries, rows)
+        n = min(n, scores.shape[1])
+        if n <= 0:
+            return np.zeros((scores.shape[0], 0), dtype=np.int64)
+        top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+        return rows[top] if rows is not None else top
@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import time
+from typing import List, Optional, Sequence
+from shared.configs.static import (
+    RERANK_MODEL,
+    RERANK_LATENCY_BUDGET_MS,
+    RERANK_MAX_CONCURRENT,
+    RERANK_CACHE_TTL_SECONDS,
+)
+from shared.utils.cache_utils import TTLCache
+
+
+class CrossEncoderReranker:
+    """Re-scores (query, chunk) pairs with a small cross-encoder on CPU.
+
+    All uncached pairs of a request are scored in one batched forward pass. Pair
+    scores are cached by hash, and reranking is skipped (candidates are returned
+    in their original order) when the estimated cost exceeds the latency budget or
+    too many reranks are already running.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        latency_budget_ms: Optional[float] = RERANK_LATENCY_BUDGET_MS,
+        max_concurrent: int = RERANK_MAX_CONCURRENT,
+        cache_ttl_seconds: float = RERANK_CACHE_TTL_SECONDS,
+    ):
+        self.model_name = model_name
+        self.latency_budget_ms = latency_budget_ms
+        self.max_concurrent = max_concurrent
+        self.score_cache = TTLCache(ttl_seconds=cache_ttl_seconds, max_entries=50_000)
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        # Moving average of scoring cost, used to estimate whether a batch fits the budget
+        self._ms_per_pair: Optional[float] = None
+        self.skipped = 0
+
+    def _ensure_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def preload(self):
+        """Load the cross-encoder now instead of on the first rerank."""
+        self._ensure_model()
+
+    @staticmethod
+    def _pair_key(query: str, text: str) -> str:
+        return hashlib.sha1(f"{query}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _over_budget(self, n_pairs: int) -> bool:
+        if self.latency_budget_ms is None or self._ms_per_pair is None:
+            return False
+        return self._ms_per_pair * n_pairs > self.latency_budget_ms
+
+    def rerank(self, query: str, texts: Sequence[str], top_k: int) -> List[str]:
+        """Best `top_k` texts for the query by cross-encoder score."""
+        texts = list(texts)
+        if not texts:
+            return []
+
+        keys = [self._pair_key(query, t) for t in texts]
+        scores = [self.score_cache.get(k) for k in keys]
+        missing = [i for i, s in enumerate(scores) if s is None]
+
+        if missing:
+            with self._inflight_lock:
+                busy = self._inflight >= self.max_concurrent
+                if not busy and not self._over_budget(len(missing)):
+                    self._inflight += 1
+                    admitted = True
+                else:
+                    admitted = False
+            if not admitted:
+                self.skipped += 1
+                # Let the estimate decay so one slow (e.g. warm-up) batch does not disable reranking for good
+                if self._ms_per_pair is not None:
+                    self._ms_per_pair *= 0.9
+                print(f"Rerank skipped ({len(missing)} pairs): latency budget or concurrency limit reached")
+                return texts[:top_k]
+            try:
+                model = self._ensure_model()
+                started = time.perf_counter()
+                batch = [(query, texts[i]) for i in missing]
+                new_scores = model.predict(batch, batch_size=len(batch), convert_to_numpy=True, show_progress_bar=False)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                per_pair = elapsed_ms / len(batch)
+                self._ms_per_pair = per_pair if self._ms_per_pair is None else 0.8 * self._ms_per_pair + 0.2 * per_pair
+            finally:
+                with self._inflight_lock:
+                    self._inflight -= 1
+            for i, score in zip(missing, new_scores):
+                scores[i] = float(score)
+                self.score_cache.set(keys[i], float(score))
+
+        order = sorted(range(len(texts)), key=lambda i: scores[i], reverse=True)
+        return [texts[i] for i in order[:top_k]]
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Process-wide reranker so the cross-encoder weights are loaded once."""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker()
+        return _reranker
@@ -0,0 +1,168 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from shared.configs.static import (
+    RETRIEVAL_MODES,
+    HYBRID_FETCH_K,
+    RRF_K,
+    LEXICAL_INDEX_DIR,
+    RERANK_FETCH_K,
+    MMR_FETCH_K,
+    MMR_LAMBDA,
+)
+from shared.utils.lexical_index import BM25Index
+from shared.utils.similarity_utils import maximal_marginal_relevance
+from shared.utils.vectorstore_utils import iter_collection_texts
+
+
+def lexical_index_path(persist_directory: str, collection_name: str) -> str:
+    """Location of the BM25 index persisted next to a collection."""
+    return os.path.join(persist_directory, LEXICAL_INDEX_DIR, f"{collection_name}.npz")
+
+
+def build_lexical_index(ids: Sequence[str], texts: Sequence[str], path: str) -> BM25Index:
+    index = BM25Index()
+    index.add(ids, texts)
+    index.save(path)
+    print(f"Saved lexical index ({len(index)} chunks) to {path}")
+    return index
+
+
+def rebuild_lexical_index(backend: Any, path: str) -> BM25Index:
+    """Rebuild the BM25 index from the chunks stored in a collection (e.g. after batched indexing)."""
+    ids, texts = [], []
+    for chunk_id, text in iter_collection_texts(backend):
+        ids.append(chunk_id)
+        texts.append(text)
+    return build_lexical_index(ids, texts, path)
+
+
+def load_lexical_index(path: str) -> Optional[BM25Index]:
+    if not os.path.exists(path):
+        print(f"No lexical index at {path}; re-run vectorization to enable hybrid retrieval.")
+        return None
+    try:
+        return BM25Index.load(path)
+    except Exception as e:
+        print(f"Error loading lexical index {path}: {e}")
+        return None
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuse several best-first rankings of keys: score(d) = sum over rankings of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def check_retrieval_mode(mode: str) -> str:
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Invalid retrieval mode: {mode}. Choose one of {RETRIEVAL_MODES}")
+    return mode
+
+
+def dense_candidates_with_embeddings(
+    backend: Any,
+    query: str,
+    k: int,
+    filter: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[float], List[str], Any]:
+    """Query embedding plus the top-k candidate texts and their stored embeddings."""
+    query_embedding = backend.embedding.embed_query(query)
+    texts, embeddings = backend.search_with_embeddings(query_embedding, k, filter)
+    return query_embedding, texts, embeddings
+
+
+def dense_search(backend: Any, query: str, k: int, filter: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Top-k chunk texts for a query by vector similarity."""
+    hits = backend.search(backend.embedding.embed_query(query), k, filter)
+    return [doc.page_content for doc, _ in hits]
+
+
+def hybrid_search(
+    backend: Any,
+    lexical_index: BM25Index,
+    query: str,
+    k: int,
+    fetch_k: int,
+    filter: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    """Top-k chunk texts from dense and BM25 rankings fused with RRF on chunk id.
+
+    The lexical side is filtered and its texts are looked up through the backend,
+    so the BM25 index holds no texts or metadata of its own.
+    """
+    hits = backend.search(backend.embedding.embed_query(query), fetch_k, filter)
+    texts = {doc.id: doc.page_content for doc, _ in hits}
+
+    def matching(ids: List[str]) -> List[str]:
+        page = backend.get(where=filter, ids=ids)
+        texts.update(zip(page["ids"], page["documents"]))
+        return page["ids"]
+
+    lexical = lexical_index.search(query, fetch_k, keep=matching if filter else None)
+    fused = reciprocal_rank_fusion([[doc.id for doc, _ in hits], [chunk_id for chunk_id, _ in lexical]])
+    top_ids = [chunk_id for chunk_id, _ in fused[:k]]
+    missing = [chunk_id for chunk_id in top_ids if chunk_id not in texts]
+    if missing:
+        page = backend.get(ids=missing)
+        texts.update(zip(page["ids"], page["documents"]))
+    # Chunks deleted since the index was built are dropped
+    return [texts[chunk_id] for chunk_id in top_ids if chunk_id in texts]
+
+
+def search_texts(
+    backend: Any,
+    query: str,
+    top_k: int,
+    mode: str = "dense",
+    lexical_index: Optional[BM25Index] = None,
+    filter: Optional[Dict[str, Any]] = None,
+    reranker: Optional[Any] = None,
+    mmr_lambda: Optional[float] = None,
+) -> List[str]:
+    """Retrieve chunk texts from a vector backend in the requested mode.
+
+    `dense` is a plain similarity search. `hybrid` over-fetches from both the vector
+    store and the BM25 index and fuses the two rankings with RRF; without a lexical
+    index it degrades to dense. `mmr` over-fetches dense candidates with their
+    stored embeddings and picks a diverse subset (`mmr_lambda`, default
+    `MMR_LAMBDA`, trades relevance against redundancy). With a `reranker`, `RERANK_FETCH_K` candidates are
+    retrieved and the reranker keeps the best `top_k`.
+    """
+    check_retrieval_mode(mode)
+    k = max(top_k, RERANK_FETCH_K) if reranker is not None else top_k
+
+    if mode == "hybrid" and lexical_index is not None:
+        candidates = hybrid_search(backend, lexical_index, query, k, max(k, HYBRID_FETCH_K), filter)
+    elif mode == "mmr":
+        fetch_k = max(k, MMR_FETCH_K)
+        query_embedding, texts, embeddings = dense_candidates_with_embeddings(backend, query, fetch_k, filter)
+        lambda_mult = MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+        picked = maximal_marginal_relevance(query_embedding, embeddings, k, lambda_mult) if texts else []
+        candidates = [texts[i] for i in picked]
+    else:
+        candidates = dense_search(backend, query, k, filter)
+
+    if reranker is not None:
+        return reranker.rerank(query, candidates, top_k)
+    return candidates
+
+
+def search_many_texts(
+    backend: Any,
+    queries: Sequence[str],
+    top_k: int,
+    filter: Optional[Dict[str, Any]] = None,
+) -> List[List[Tuple[str, float]]]:
+    """Dense top-k (text, distance) pairs for each query, lower distance is closer.
+
+    All queries are embedded in one batch and sent to the backend as one batched
+    search, so bulk callers pay one forward pass and one store round-trip.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+    results = backend.search_batch(backend.embedding.embed_documents(queries), top_k, filter)
+    return [[(doc.page_content, distance) for doc, distance in hits] for hits in results]
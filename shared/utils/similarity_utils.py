@@ -0,0 +1,102 @@
+from typing import List, Optional, Sequence
+import numpy as np
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Return a float32 copy of `vectors` with every row scaled to unit length."""
+    arr = np.asarray(vectors, dtype=np.float32)
+    if arr.ndim == 1:
+        arr = arr.reshape(1, -1)
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+def cosine_similarity_matrix(queries, vectors) -> np.ndarray:
+    """Cosine similarity between every query row and every vector row (shape: queries x vectors)."""
+    q = normalize_rows(queries)
+    v = normalize_rows(vectors)
+    if q.shape[0] == 0 or v.shape[0] == 0:
+        return np.zeros((q.shape[0], v.shape[0]), dtype=np.float32)
+    return q @ v.T
+
+
+def max_cosine_similarity(query: Sequence[float], vectors) -> float:
+    """Highest cosine similarity between a single query vector and a set of vectors."""
+    sims = cosine_similarity_matrix([query], vectors)
+    if sims.size == 0:
+        return 0.0
+    return float(sims.max())
+
+
+def maximal_marginal_relevance(query: Sequence[float], candidates, k: int, lambda_mult: float = 0.5) -> List[int]:
+    """Indices of `k` candidates chosen by maximal marginal relevance, in selection order.
+
+    Relevance and the candidate-candidate similarity matrix are computed once with
+    matrix products; each greedy step is a vectorised update of every candidate's
+    maximum similarity to the already selected set.
+    """
+    if len(candidates) == 0 or k <= 0:
+        return []
+    cand = normalize_rows(candidates)
+    n = cand.shape[0]
+    relevance = cand @ normalize_rows(query)[0]
+    pairwise = cand @ cand.T
+
+    selected = [int(np.argmax(relevance))]
+    max_sim_to_selected = pairwise[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < min(k, n):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_sim_to_selected
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_sim_to_selected, pairwise[best], out=max_sim_to_selected)
+    return selected
+
+
+class EmbeddingBuffer:
+    """Append-only float32 matrix that grows geometrically instead of holding a list of arrays."""
+
+    def __init__(self, initial_rows: int = 256):
+        self._data: Optional[np.ndarray] = None
+        self._rows = 0
+        self._initial_rows = initial_rows
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def _reserve(self, rows: int, dim: int):
+        if self._data is None:
+            self._data = np.empty((max(self._initial_rows, rows), dim), dtype=np.float32)
+        elif rows > self._data.shape[0]:
+            capacity = self._data.shape[0]
+            while capacity < rows:
+                capacity *= 2
+            grown = np.empty((capacity, self._data.shape[1]), dtype=np.float32)
+            grown[:self._rows] = self._data[:self._rows]
+            self._data = grown
+
+    def append(self, vector):
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        self._reserve(self._rows + 1, vector.shape[0])
+        self._data[self._rows] = vector
+        self._rows += 1
+
+    def extend(self, vectors):
+        """Append the rows of an (n, dim) matrix."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] == 0:
+            return
+        end = self._rows + vectors.shape[0]
+        self._reserve(end, vectors.shape[1])
+        self._data[self._rows:end] = vectors
+        self._rows = end
+
+    def array(self) -> np.ndarray:
+        """View of the filled rows (shape rows x dim); writes to it update the buffer."""
+        if self._data is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._data[:self._rows]
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import struct
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from shared.configs.static import SNAPSHOT_VECTOR_ENCODINGS, SNAPSHOT_VECTOR_ENCODING, SNAPSHOT_IMPORT_BATCH
+from shared.utils.quantization_utils import QuantizedCodes
+from shared.utils.similarity_utils import normalize_rows
+from shared.utils.string_table import pack_strings, unpack_strings
+
+# File layout (all integers little-endian):
+#   preamble   MAGIC, format version (uint32), header length (uint32)
+#   header     UTF-8 JSON: collection, row count, dimension, vector encoding, the offset and
+#              length of every body section and the SHA-256 of the body
+#   body       sections, each starting on a SECTION_ALIGN boundary:
+#              vectors ((N, D) float32 or int8 codes), scale (int8 only, (D,) float32),
+#              ids / texts (concatenated UTF-8 with (N + 1,) uint64 offsets),
+#              metadata (JSON column table), and optional opaque extras (e.g. image payloads)
+MAGIC = b"RAGSNAP\x00"
+FORMAT_VERSION = 1
+SECTION_ALIGN = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _pad(n: int) -> int:
+    return -n % SECTION_ALIGN
+
+
+def _metadata_columns(metadatas: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    keys = sorted({key for m in metadatas for key in (m or {})})
+    return {key: [(m or {}).get(key) for m in metadatas] for key in keys}
+
+
+def write_snapshot(
+    path: str,
+    collection_name: str,
+    rows: Dict[str, Any],
+    source_backend: str,
+    vector_encoding: str = SNAPSHOT_VECTOR_ENCODING,
+    extras: Optional[Dict[str, bytes]] = None,
+) -> Dict[str, Any]:
+    """Write `rows` (ids, documents, metadatas, embeddings) as one snapshot file; returns its header."""
+    if vector_encoding not in SNAPSHOT_VECTOR_ENCODINGS:
+        raise ValueError(f"Invalid snapshot vector encoding '{vector_encoding}'. Choose one of {SNAPSHOT_VECTOR_ENCODINGS}")
+    ids, texts, metadatas = rows["ids"], rows["documents"], rows["metadatas"]
+    vectors = np.asarray(rows["embeddings"], dtype=np.float32)
+    if vectors.shape[0] != len(ids):
+        raise ValueError(f"Snapshot of {collection_name}: {vectors.shape[0]} vectors for {len(ids)} rows")
+    dim = int(vectors.shape[1]) if vectors.ndim == 2 else 0
+    # Recorded so that dequantised int8 vectors can be brought back onto the unit sphere
+    normalized = bool(len(vectors)) and bool(np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-3))
+
+    sections: List[Tuple[str, bytes]] = []
+    if vector_encoding == "int8":
+        codes = QuantizedCodes.build("int8", vectors.reshape(len(ids), dim))
+        sections += [("vectors", codes.codes.tobytes()), ("scale", codes.scale.astype("<f4").tobytes())]
+    else:
+        sections.append(("vectors", vectors.astype("<f4").tobytes()))
+    id_offsets, id_blob = pack_strings(ids)
+    text_offsets, text_blob = pack_strings(texts)
+    sections += [
+        ("id_offsets", id_offsets.tobytes()),
+        ("ids", id_blob),
+        ("text_offsets", text_offsets.tobytes()),
+        ("texts", text_blob),
+        ("metadata", json.dumps(_metadata_columns(metadatas), separators=(",", ":")).encode("utf-8")),
+    ]
+    sections += [(f"extra:{name}", data) for name, data in (extras or {}).items()]
+
+    layout, position, digest = {}, 0, hashlib.sha256()
+    for name, data in sections:
+        layout[name] = [position, len(data)]
+        digest.update(data)
+        digest.update(b"\x00" * _pad(len(data)))
+        position += len(data) + _pad(len(data))
+
+    header = {
+        "collection": collection_name,
+        "source_backend": source_backend,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "count": len(ids),
+        "dim": dim,
+        "vector_encoding": vector_encoding,
+        "normalized": normalized,
+        "sections": layout,
+        "body_bytes": position,
+        "sha256": digest.hexdigest(),
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * _pad(_PREAMBLE.size + len(header_bytes))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for _, data in sections:
+            f.write(data)
+            f.write(b"\x00" * _pad(len(data)))
+    os.replace(tmp_path, path)
+    return header
+
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    """Read and verify a snapshot: header, ids, documents, metadatas, (N, D) float32 embeddings and extras."""
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise ValueError(f"{path} is not a collection snapshot")
+        magic, version, header_len = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a collection snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {version} (this build reads version {FORMAT_VERSION})")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        body = f.read()
+    if len(body) != header["body_bytes"] or hashlib.sha256(body).hexdigest() != header["sha256"]:
+        raise ValueError(f"Snapshot {path} is truncated or corrupt (checksum mismatch)")
+
+    def section(name: str) -> memoryview:
+        start, length = header["sections"][name]
+        return memoryview(body)[start:start + length]
+
+    count, dim = header["count"], header["dim"]
+    if header["vector_encoding"] == "int8":
+        codes = np.frombuffer(section("vectors"), dtype=np.int8).reshape(count, dim)
+        scale = np.frombuffer(section("scale"), dtype="<f4")
+        vectors = codes.astype(np.float32) * scale
+        if header["normalized"]:
+            vectors = normalize_rows(vectors)
+    else:
+        vectors = np.frombuffer(section("vectors"), dtype="<f4").reshape(count, dim).astype(np.float32, copy=False)
+
+    columns = json.loads(bytes(section("metadata")).decode("utf-8"))
+    metadatas = [
+        {key: values[row] for key, values in columns.items() if values[row] is not None}
+        for row in range(count)
+    ]
+    return {
+        "header": header,
+        "ids": unpack_strings(np.frombuffer(section("id_offsets"), dtype="<u8"), bytes(section("ids"))),
+        "documents": unpack_strings(np.frombuffer(section("text_offsets"), dtype="<u8"), bytes(section("texts"))),
+        "metadatas": metadatas,
+        "embeddings": vectors,
+        "extras": {
+            name.split(":", 1)[1]: bytes(section(name))
+            for name in header["sections"] if name.startswith("extra:")
+        },
+    }
+
+
+def export_collection(
+    backend: Any,
+    path: str,
+    vector_encoding: str = SNAPSHOT_VECTOR_ENCODING,
+    extras: Optional[Dict[str, bytes]] = None,
+) -> Dict[str, Any]:
+    """Snapshot every row of a backend's collection (stored vectors, no re-embedding)."""
+    rows = backend.get(include_vectors=True)
+    return write_snapshot(path, backend.collection_name, rows, backend.name, vector_encoding, extras)
+
+
+def import_collection(snapshot: Dict[str, Any], backend: Any, batch_size: int = SNAPSHOT_IMPORT_BATCH) -> int:
+    """Replace a backend's collection with the rows of a snapshot; returns the number of rows written."""
+    backend.drop()
+    ids, texts, metadatas, vectors = snapshot["ids"], snapshot["documents"], snapshot["metadatas"], snapshot["embeddings"]
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        backend.add(ids[start:end], texts[start:end], vectors[start:end], metadatas[start:end])
+    backend.persist()
+    return len(ids)
@@ -0,0 +1,67 @@
+import os
+from typing import Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+def pack_strings(values: Sequence[str]) -> Tuple[np.ndarray, bytes]:
+    """UTF-8 encode strings into one blob; bytes offsets[i]:offsets[i + 1] hold the i-th string."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def unpack_strings(offsets: np.ndarray, blob: bytes) -> List[str]:
+    bounds = np.asarray(offsets).tolist()
+    return [blob[start:end].decode("utf-8") for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class StringTable:
+    """Read-only sequence of strings in two files: <name>.bin (UTF-8 blob) and <name>_offsets.npy.
+
+    Both are memory-mapped and strings are decoded on access, so the text lives in the
+    OS page cache and is shared by every process that opens the same table.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    @staticmethod
+    def _paths(directory: str, name: str) -> Tuple[str, str]:
+        return os.path.join(directory, f"{name}.bin"), os.path.join(directory, f"{name}_offsets.npy")
+
+    @classmethod
+    def write(cls, directory: str, name: str, values: Sequence[str]):
+        blob_path, offsets_path = cls._paths(directory, name)
+        offsets, blob = pack_strings(values)
+        with open(blob_path + ".tmp", "wb") as f:
+            f.write(blob)
+        np.save(offsets_path + ".tmp.npy", offsets)
+        os.replace(blob_path + ".tmp", blob_path)
+        os.replace(offsets_path + ".tmp.npy", offsets_path)
+
+    @classmethod
+    def open(cls, directory: str, name: str) -> Optional["StringTable"]:
+        blob_path, offsets_path = cls._paths(directory, name)
+        if not os.path.exists(blob_path) or not os.path.exists(offsets_path):
+            return None
+        offsets = np.load(offsets_path, mmap_mode="r")
+        # np.memmap cannot map an empty file
+        blob = np.memmap(blob_path, dtype=np.uint8, mode="r") if os.path.getsize(blob_path) else np.zeros(0, dtype=np.uint8)
+        return cls(offsets, blob)
+
+    def __len__(self) -> int:
+        return max(int(self.offsets.shape[0]) - 1, 0)
+
+    def __getitem__(self, row: int) -> str:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(len(self)):
+            yield self[row]
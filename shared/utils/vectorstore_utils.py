@@ -0,0 +1,85 @@
+import os
+from typing import Any, Iterator, List, Optional, Tuple
+from shared.configs.static import (
+    VECTOR_BACKENDS,
+    VECTOR_BACKENDS_AVAILABLE,
+    DEFAULT_VECTOR_BACKEND,
+    RAG_VECTOR_BACKENDS,
+    VECTOR_QUANTIZATION,
+    DEFAULT_VECTOR_QUANTIZATION,
+    COLLECTION_SHARDS,
+    SHARD_ROUTINGS,
+    SHARD_ROUTING,
+    SHARD_TIME_BUCKET_SECONDS,
+    SHARD_MAX_WORKERS,
+)
+from shared.utils.chroma_utils import get_shard_collection_names
+from shared.vectorstores.backends import VectorBackend, ChromaBackend, NumpyBackend, FaissBackend, ShardedBackend
+
+
+def check_vector_backend(backend: str) -> str:
+    if backend not in VECTOR_BACKENDS_AVAILABLE:
+        raise ValueError(f"Invalid vector backend '{backend}'. Choose one of {VECTOR_BACKENDS_AVAILABLE}")
+    return backend
+
+
+def get_vector_backend(collection_name: str, rag_type: Optional[str] = None) -> str:
+    """Configured vector backend: per collection, else per RAG type, else the default."""
+    backend = VECTOR_BACKENDS.get(collection_name) or RAG_VECTOR_BACKENDS.get(rag_type) or DEFAULT_VECTOR_BACKEND
+    return check_vector_backend(backend)
+
+
+def get_vector_quantization(collection_name: str) -> str:
+    """Configured embedding quantisation for a NumPy-backend collection."""
+    return VECTOR_QUANTIZATION.get(collection_name, DEFAULT_VECTOR_QUANTIZATION)
+
+
+def get_collection_shards(collection_name: str) -> int:
+    """Configured number of shards for a collection (1 = unsharded)."""
+    return max(int(COLLECTION_SHARDS.get(collection_name, 1)), 1)
+
+
+def open_backend(collection_name: str, embedding: Any, persist_directory: str, backend: Optional[str] = None) -> VectorBackend:
+    """Open (or lazily create) a collection on a vector backend (default: the configured one).
+
+    Collections listed in COLLECTION_SHARDS open as a ShardedBackend over their shards.
+    """
+    backend = check_vector_backend(backend) if backend else get_vector_backend(collection_name)
+    num_shards = get_collection_shards(collection_name)
+    if num_shards > 1:
+        if SHARD_ROUTING not in SHARD_ROUTINGS:
+            raise ValueError(f"Invalid shard routing '{SHARD_ROUTING}'. Choose one of {SHARD_ROUTINGS}")
+        shards = [
+            _open_single_backend(name, embedding, persist_directory, backend, get_vector_quantization(collection_name))
+            for name in get_shard_collection_names(collection_name, num_shards)
+        ]
+        return ShardedBackend(collection_name, shards, SHARD_ROUTING, SHARD_TIME_BUCKET_SECONDS, SHARD_MAX_WORKERS)
+    return _open_single_backend(collection_name, embedding, persist_directory, backend, get_vector_quantization(collection_name))
+
+
+def _open_single_backend(collection_name: str, embedding: Any, persist_directory: str, backend: str, quantization: str) -> VectorBackend:
+    if backend == "numpy":
+        return NumpyBackend(collection_name, embedding, persist_directory, quantization=quantization)
+    if backend == "faiss":
+        return FaissBackend(collection_name, embedding, persist_directory)
+    return ChromaBackend(collection_name, embedding, persist_directory)
+
+
+def iter_collection_texts(backend: VectorBackend, page_size: int = 1000) -> Iterator[Tuple[str, str]]:
+    """(chunk id, text) of every stored chunk, read page by page."""
+    offset = 0
+    while True:
+        page = backend.get(limit=page_size, offset=offset)
+        documents = page["documents"]
+        if not documents:
+            return
+        yield from zip(page["ids"], documents)
+        offset += len(documents)
+
+
+def list_local_collections(persist_directory: str, backend: str) -> List[str]:
+    """Collections stored by a file-based backend ("numpy" or "faiss") under the persist directory."""
+    root = os.path.join(persist_directory, backend)
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
@@ -0,0 +1,600 @@
+import json
+import os
+import shutil
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from shared.utils.chroma_utils import get_chroma_client, get_chroma_store, forget_collection, list_existing_collections
+from shared.utils.filter_utils import matches_where
+from shared.vectorstores.numpy_store import NumpyVectorStore
+
+# Rows per Chroma upsert/get call (below SQLite's variable limit)
+CHROMA_BATCH = 1000
+# Stored for rows without metadata (Chroma rejects empty dicts) and removed again on read
+_EMPTY_METADATA_KEY = "_"
+
+Hits = List[Tuple[Document, float]]
+
+
+class VectorBackend(Protocol):
+    """What the retrievers need from a vector store, whatever the engine behind it.
+
+    Embeddings are always computed by the caller, so every backend stores and
+    searches plain vectors. Scores are distances (lower is closer) and filters use
+    Chroma's `where` syntax on every backend. Writes may be buffered until
+    `persist()`; `load()` (re)opens the persisted collection. `get` returns ids,
+    documents and metadatas in storage order, plus an (N, D) float32 "embeddings"
+    array with `include_vectors`; `ids` restricts it to those chunks (unknown ids
+    are skipped). `ids()` lists the stored ids alone, in storage order.
+    """
+
+    name: str
+    collection_name: str
+    embedding: Any
+
+    def add(self, ids: Sequence[str], texts: Sequence[str], embeddings: Sequence[Sequence[float]], metadatas: Sequence[Dict[str, Any]]) -> None: ...
+    def delete(self, ids: Sequence[str]) -> None: ...
+    def search(self, query_embedding: Sequence[float], k: int, filter: Optional[Dict[str, Any]] = None) -> Hits: ...
+    def search_batch(self, query_embeddings: Sequence[Sequence[float]], k: int, filter: Optional[Dict[str, Any]] = None) -> List[Hits]: ...
+    def count(self) -> int: ...
+    def ids(self) -> List[str]: ...
+    def persist(self) -> None: ...
+    def load(self) -> "VectorBackend": ...
+
+    # Used by MMR, the lexical index (rebuild and hit lookup), cache maintenance and benchmarks
+    def search_with_embeddings(self, query_embedding: Sequence[float], k: int, filter: Optional[Dict[str, Any]] = None) -> Tuple[List[str], np.ndarray]: ...
+    def get(self, where: Optional[Dict[str, Any]] = None, limit: Optional[int] = None, offset: int = 0, include_vectors: bool = False, ids: Optional[Sequence[str]] = None) -> Dict[str, Any]: ...
+    def vectors(self) -> np.ndarray: ...
+    def drop(self) -> None: ...
+
+    # Called before forking serving workers, which then share whatever it loaded
+    def preload(self) -> None: ...
+
+
+def _chroma_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {k: v for k, v in (metadata or {}).items() if k != _EMPTY_METADATA_KEY}
+
+
+class ChromaBackend:
+    """Chroma collection on the process-wide shared client; writes are durable immediately.
+
+    The collection is opened (and created if missing) on first use.
+    """
+
+    name = "chroma"
+
+    def __init__(self, collection_name: str, embedding: Any, persist_directory: str):
+        self.collection_name = collection_name
+        self.embedding = embedding
+        self.persist_directory = persist_directory
+        self.store = None
+
+    @property
+    def _collection(self):
+        if self.store is None:
+            self.load()
+        return self.store._collection
+
+    def load(self) -> "ChromaBackend":
+        self.store = get_chroma_store(self.collection_name, self.embedding, self.persist_directory)
+        return self
+
+    def add(self, ids, texts, embeddings, metadatas):
+        ids, texts, metadatas = list(ids), list(texts), list(metadatas)
+        embeddings = [[float(x) for x in e] for e in embeddings]
+        for start in range(0, len(ids), CHROMA_BATCH):
+            end = start + CHROMA_BATCH
+            self._collection.upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=texts[start:end],
+                # Chroma rejects empty metadata dicts; only rows without metadata get a placeholder
+                metadatas=[m or {_EMPTY_METADATA_KEY: 0} for m in metadatas[start:end]],
+            )
+
+    def delete(self, ids):
+        if ids:
+            self._collection.delete(ids=list(ids))
+
+    def _query(self, query_embeddings, k, filter, include):
+        total = self.count()
+        if not len(query_embeddings) or k <= 0 or total == 0:
+            return None
+        return self._collection.query(
+            query_embeddings=[[float(x) for x in q] for q in query_embeddings],
+            n_results=min(k, total),
+            where=filter or None,
+            include=include,
+        )
+
+    def search(self, query_embedding, k, filter=None):
+        return self.search_batch([query_embedding], k, filter)[0]
+
+    def search_batch(self, query_embeddings, k, filter=None):
+        result = self._query(query_embeddings, k, filter, ["documents", "metadatas", "distances"])
+        if result is None:
+            return [[] for _ in query_embeddings]
+        return [
+            [
+                (Document(page_content=text, metadata=_chroma_metadata(meta), id=doc_id), float(dist))
+                for doc_id, text, meta, dist in zip(ids, texts, metas, dists)
+            ]
+            for ids, texts, metas, dists in zip(result["ids"], result["documents"], result["metadatas"], result["distances"])
+        ]
+
+    def search_with_embeddings(self, query_embedding, k, filter=None):
+        result = self._query([query_embedding], k, filter, ["documents", "embeddings"])
+        if result is None:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        embeddings = result["embeddings"][0] if result.get("embeddings") is not None else []
+        return list(result["documents"][0]), np.asarray(embeddings, dtype=np.float32)
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def ids(self) -> List[str]:
+        return list(self._collection.get(include=[])["ids"])
+
+    def persist(self):
+        pass
+
+    def get(self, where=None, limit=None, offset=0, include_vectors=False, ids=None):
+        include = ["documents", "metadatas"] + (["embeddings"] if include_vectors else [])
+        result = self._collection.get(
+            ids=list(ids) if ids is not None else None,
+            where=where or None, limit=limit, offset=offset or None, include=include,
+        )
+        rows = {
+            "ids": list(result["ids"]),
+            "documents": list(result.get("documents") or []),
+            "metadatas": [_chroma_metadata(m) for m in (result.get("metadatas") or [])],
+        }
+        if include_vectors:
+            embeddings = result.get("embeddings")
+            rows["embeddings"] = (
+                np.asarray(embeddings, dtype=np.float32) if embeddings is not None and len(embeddings)
+                else np.zeros((0, 0), dtype=np.float32)
+            )
+        return rows
+
+    def vectors(self) -> np.ndarray:
+        embeddings = self._collection.get(include=["embeddings"]).get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def drop(self):
+        if self.collection_name in list_existing_collections(self.persist_directory):
+            get_chroma_client(self.persist_directory).delete_collection(self.collection_name)
+        forget_collection(self.collection_name, self.persist_directory)
+        self.store = None
+
+    def preload(self):
+        # Chroma clients must not cross a fork; each worker opens its own on first use
+        pass
+
+
+class NumpyBackend:
+    """In-process exact search (see NumpyVectorStore); adds and deletes are buffered until `persist()`."""
+
+    name = "numpy"
+
+    def __init__(self, collection_name: str, embedding: Any, persist_directory: str, quantization: str = "none"):
+        self.collection_name = collection_name
+        self.embedding = embedding
+        self.persist_directory = persist_directory
+        self.quantization = quantization
+        self.load()
+
+    def load(self) -> "NumpyBackend":
+        self.store = NumpyVectorStore(
+            collection_name=self.collection_name,
+            embedding_function=self.embedding,
+            persist_directory=self.persist_directory,
+            quantization=self.quantization,
+        )
+        return self
+
+    def add(self, ids, texts, embeddings, metadatas):
+        self.store.add_embeddings(texts, embeddings, metadatas, ids, persist=False)
+
+    def delete(self, ids):
+        if ids:
+            self.store.delete(list(ids), persist=False)
+
+    def search(self, query_embedding, k, filter=None):
+        return self.store.search_batch_by_vector([query_embedding], k, filter)[0]
+
+    def search_batch(self, query_embeddings, k, filter=None):
+        if not len(query_embeddings):
+            return []
+        return self.store.search_batch_by_vector(query_embeddings, k, filter)
+
+    def search_with_embeddings(self, query_embedding, k, filter=None):
+        return self.store.search_with_embeddings(query_embedding, k, filter)
+
+    def count(self) -> int:
+        return self.store.count()
+
+    def ids(self) -> List[str]:
+        return self.store.ids()
+
+    def persist(self):
+        self.store.persist()
+
+    def get(self, where=None, limit=None, offset=0, include_vectors=False, ids=None):
+        return self.store.get(
+            ids=ids, where=where, limit=limit, offset=offset, include=["embeddings"] if include_vectors else None,
+        )
+
+    def vectors(self) -> np.ndarray:
+        return np.asarray(self.store.matrix, dtype=np.float32)
+
+    def drop(self):
+        if os.path.isdir(self.store.path):
+            shutil.rmtree(self.store.path)
+        self.load()
+
+    def preload(self):
+        self.store.preload()
+
+
+class FaissBackend:
+    """LangChain FAISS index (exact L2) saved under <persist_directory>/faiss/<collection>.
+
+    Filters are pre-filters: the matching rows (cached per filter until the next
+    write) are passed to FAISS as an ID selector, so only they are scored. FAISS
+    builds without search parameters fall back to filtering the matched documents,
+    widening the search until enough rows pass. Adds are kept in memory until `persist()`.
+    """
+
+    name = "faiss"
+
+    def __init__(self, collection_name: str, embedding: Any, persist_directory: str):
+        self.collection_name = collection_name
+        self.embedding = embedding
+        self.persist_directory = persist_directory
+        self.path = os.path.join(persist_directory, "faiss", collection_name)
+        self.load()
+
+    def load(self) -> "FaissBackend":
+        self.store = None
+        self._filter_rows = {}
+        self._rows_by_id = None
+        if os.path.exists(os.path.join(self.path, "index.faiss")):
+            from langchain_community.vectorstores import FAISS
+            # The pickled docstore is only ever written by persist() below
+            self.store = FAISS.load_local(self.path, self.embedding, allow_dangerous_deserialization=True)
+        return self
+
+    def _existing(self, ids) -> List[str]:
+        if self.store is None:
+            return []
+        known = set(self.store.index_to_docstore_id.values())
+        return [i for i in ids if i in known]
+
+    def add(self, ids, texts, embeddings, metadatas):
+        ids = list(ids)
+        if not ids:
+            return
+        self.delete(ids)
+        self._filter_rows = {}
+        self._rows_by_id = None
+        pairs = [(text, [float(x) for x in e]) for text, e in zip(texts, embeddings)]
+        if self.store is None:
+            from langchain_community.vectorstores import FAISS
+            self.store = FAISS.from_embeddings(pairs, self.embedding, metadatas=list(metadatas), ids=ids)
+        else:
+            self.store.add_embeddings(pairs, metadatas=list(metadatas), ids=ids)
+
+    def delete(self, ids):
+        existing = self._existing(ids)
+        if existing:
+            self.store.delete(existing)
+            self._filter_rows = {}
+            self._rows_by_id = None
+
+    def _doc(self, idx: int) -> Document:
+        doc_id = self.store.index_to_docstore_id[idx]
+        doc = self.store.docstore.search(doc_id)
+        return Document(page_content=doc.page_content, metadata=doc.metadata, id=doc_id)
+
+    def _matching_rows(self, filter) -> np.ndarray:
+        key = json.dumps(filter, sort_keys=True, default=str)
+        rows = self._filter_rows.get(key)
+        if rows is None:
+            rows = np.array(
+                [i for i in range(self.count()) if matches_where(self._doc(i).metadata, filter)], dtype=np.int64
+            )
+            self._filter_rows[key] = rows
+        return rows
+
+    def _search_rows(self, query_embeddings, k, filter) -> List[List[Tuple[int, float]]]:
+        total = self.count()
+        if total == 0 or k <= 0:
+            return [[] for _ in query_embeddings]
+        queries = np.ascontiguousarray(np.asarray(query_embeddings, dtype=np.float32))
+        import faiss
+        if filter and hasattr(faiss, "SearchParameters"):
+            rows = self._matching_rows(filter)
+            if rows.size == 0:
+                return [[] for _ in query_embeddings]
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(rows))
+            distances, indices = self.store.index.search(queries, min(k, int(rows.size)), params=params)
+            return [
+                [(int(idx), float(distance)) for distance, idx in zip(row_distances, row_indices) if idx != -1]
+                for row_distances, row_indices in zip(distances, indices)
+            ]
+        fetch_k = min(total, k if not filter else max(4 * k, 20))
+        while True:
+            distances, indices = self.store.index.search(queries, fetch_k)
+            results = []
+            for row_distances, row_indices in zip(distances, indices):
+                hits = []
+                for distance, idx in zip(row_distances, row_indices):
+                    if idx == -1:
+                        continue
+                    if filter and not matches_where(self._doc(int(idx)).metadata, filter):
+                        continue
+                    hits.append((int(idx), float(distance)))
+                    if len(hits) == k:
+                        break
+                results.append(hits)
+            if fetch_k >= total or all(len(hits) == k for hits in results):
+                return results
+            fetch_k = min(total, fetch_k * 4)
+
+    def search(self, query_embedding, k, filter=None):
+        return self.search_batch([query_embedding], k, filter)[0]
+
+    def search_batch(self, query_embeddings, k, filter=None):
+        return [
+            [(self._doc(idx), distance) for idx, distance in hits]
+            for hits in self._search_rows(query_embeddings, k, filter)
+        ]
+
+    def search_with_embeddings(self, query_embedding, k, filter=None):
+        hits = self._search_rows([query_embedding], k, filter)[0]
+        if not hits:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        texts = [self._doc(idx).page_content for idx, _ in hits]
+        return texts, np.stack([self.store.index.reconstruct(idx) for idx, _ in hits])
+
+    def count(self) -> int:
+        return int(self.store.index.ntotal) if self.store is not None else 0
+
+    def ids(self) -> List[str]:
+        if self.store is None:
+            return []
+        return [self.store.index_to_docstore_id[i] for i in range(self.count())]
+
+    def persist(self):
+        if self.store is not None:
+            os.makedirs(self.path, exist_ok=True)
+            self.store.save_local(self.path)
+
+    def _row_of_id(self) -> Dict[str, int]:
+        if self._rows_by_id is None:
+            self._rows_by_id = {doc_id: idx for idx, doc_id in self.store.index_to_docstore_id.items()} if self.store else {}
+        return self._rows_by_id
+
+    def get(self, where=None, limit=None, offset=0, include_vectors=False, ids=None):
+        if ids is not None:
+            row_of_id = self._row_of_id()
+            rows = sorted(row_of_id[i] for i in set(ids) if i in row_of_id)
+            if where:
+                rows = [i for i in rows if matches_where(self._doc(i).metadata, where)]
+        else:
+            rows = self._matching_rows(where).tolist() if where else range(self.count())
+        # Page over row numbers first, so only the returned rows are read
+        end = None if limit is None else offset + limit
+        rows = [(i, self._doc(i)) for i in rows[offset:end]]
+        result = {
+            "ids": [d.id for _, d in rows],
+            "documents": [d.page_content for _, d in rows],
+            "metadatas": [d.metadata for _, d in rows],
+        }
+        if include_vectors:
+            result["embeddings"] = (
+                np.stack([self.store.index.reconstruct(i) for i, _ in rows]).astype(np.float32) if rows
+                else np.zeros((0, 0), dtype=np.float32)
+            )
+        return result
+
+    def vectors(self) -> np.ndarray:
+        if self.count() == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.asarray(self.store.index.reconstruct_n(0, self.count()), dtype=np.float32)
+
+    def drop(self):
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        self.store = None
+        self._filter_rows = {}
+        self._rows_by_id = None
+
+    def preload(self):
+        # The index is read into memory by load(); forked workers share it copy-on-write
+        pass
+
+
+class ShardedBackend:
+    """One logical collection spread over several physical backends of the same kind.
+
+    Rows are routed to a shard by `routing`: "source" hashes the source file (a
+    document's chunks stay together), "time" buckets by ingestion time (the
+    `ingested_at` metadata, or the write time when absent). Writes,
+    persists and searches run on all shards concurrently; search results are merged
+    by distance into a global top-k. Deletes go to every shard. With "source"
+    routing an id keeps its shard across upserts (chunk ids derive from the source);
+    with "time" routing an id -> shard map (read from the shards on the first write)
+    finds ids that move to another bucket, and only those are deleted from their
+    old shard, so no stale copy remains.
+    """
+
+    def __init__(self, collection_name: str, shards: Sequence[Any], routing: str = "source",
+                 time_bucket_seconds: int = 86400, max_workers: int = 0):
+        self.collection_name = collection_name
+        self.shards = list(shards)
+        self.name = self.shards[0].name
+        self.embedding = self.shards[0].embedding
+        self.routing = routing
+        self.time_bucket_seconds = time_bucket_seconds
+        self.max_workers = max_workers or len(self.shards)
+        self._executor = None
+        self._executor_pid = None
+        self._shard_of_id: Optional[Dict[str, int]] = None
+
+    def _map(self, fn, items) -> List[Any]:
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        # Pool threads do not survive fork, so a forked worker starts its own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.collection_name}-shard")
+            self._executor_pid = os.getpid()
+        return list(self._executor.map(fn, items))
+
+    def _shard_of(self, doc_id: str, metadata: Dict[str, Any]) -> int:
+        if self.routing == "time":
+            ingested_at = (metadata or {}).get("ingested_at", time.time())
+            return int(ingested_at // self.time_bucket_seconds) % len(self.shards)
+        key = str((metadata or {}).get("source") or doc_id)
+        return zlib.crc32(key.encode("utf-8")) % len(self.shards)
+
+    def _id_shards(self) -> Dict[str, int]:
+        if self._shard_of_id is None:
+            shard_ids = self._map(lambda shard: shard.ids(), self.shards)
+            self._shard_of_id = {doc_id: index for index, ids in enumerate(shard_ids) for doc_id in ids}
+        return self._shard_of_id
+
+    def load(self) -> "ShardedBackend":
+        self._map(lambda shard: shard.load(), self.shards)
+        self._shard_of_id = None
+        return self
+
+    def add(self, ids, texts, embeddings, metadatas):
+        ids, texts, metadatas = list(ids), list(texts), list(metadatas)
+        if not ids:
+            return
+        targets = [self._shard_of(doc_id, metadata) for doc_id, metadata in zip(ids, metadatas)]
+        if self.routing == "time":
+            # Remove the old copy of ids re-ingested into a different time bucket
+            known = self._id_shards()
+            moved: Dict[int, List[str]] = {}
+            for doc_id, target in zip(ids, targets):
+                previous = known.get(doc_id)
+                if previous is not None and previous != target:
+                    moved.setdefault(previous, []).append(doc_id)
+            self._map(lambda item: self.shards[item[0]].delete(item[1]), moved.items())
+        rows = [[] for _ in self.shards]
+        for row, target in enumerate(targets):
+            rows[target].append(row)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        def write(item):
+            shard, shard_rows = item
+            shard.add(
+                [ids[r] for r in shard_rows],
+                [texts[r] for r in shard_rows],
+                embeddings[shard_rows],
+                [metadatas[r] for r in shard_rows],
+            )
+
+        self._map(write, [(shard, shard_rows) for shard, shard_rows in zip(self.shards, rows) if shard_rows])
+        if self._shard_of_id is not None:
+            self._shard_of_id.update(zip(ids, targets))
+
+    def delete(self, ids):
+        ids = list(ids)
+        if ids:
+            self._map(lambda shard: shard.delete(ids), self.shards)
+            if self._shard_of_id is not None:
+                for doc_id in ids:
+                    self._shard_of_id.pop(doc_id, None)
+
+    def search(self, query_embedding, k, filter=None):
+        return self.search_batch([query_embedding], k, filter)[0]
+
+    def search_batch(self, query_embeddings, k, filter=None):
+        if not len(query_embeddings):
+            return []
+        per_shard = self._map(lambda shard: shard.search_batch(query_embeddings, k, filter), self.shards)
+        return [
+            sorted((hit for hits in shard_hits for hit in hits), key=lambda hit: hit[1])[:k]
+            for shard_hits in zip(*per_shard)
+        ]
+
+    def search_with_embeddings(self, query_embedding, k, filter=None):
+        per_shard = self._map(lambda shard: shard.search_with_embeddings(query_embedding, k, filter), self.shards)
+        texts = [text for shard_texts, _ in per_shard for text in shard_texts]
+        if not texts:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        embeddings = np.concatenate([e for shard_texts, e in per_shard if len(shard_texts)], axis=0)
+        # Shards return their own top-k; rank the union by distance to the query
+        distances = ((embeddings - np.asarray(query_embedding, dtype=np.float32)) ** 2).sum(axis=1)
+        top = np.argsort(distances, kind="stable")[:k]
+        return [texts[i] for i in top], embeddings[top]
+
+    def count(self) -> int:
+        return sum(self._map(lambda shard: shard.count(), self.shards))
+
+    def ids(self) -> List[str]:
+        return [doc_id for shard_ids in self._map(lambda shard: shard.ids(), self.shards) for doc_id in shard_ids]
+
+    def persist(self):
+        self._map(lambda shard: shard.persist(), self.shards)
+
+    def get(self, where=None, limit=None, offset=0, include_vectors=False, ids=None):
+        if ids is not None:
+            # The shard of an id is not known up front; ask all of them at once
+            parts = self._map(lambda shard: shard.get(where, None, 0, include_vectors, ids), self.shards)
+            end = None if limit is None else offset + limit
+            result = {key: [v for part in parts for v in part[key]][offset:end] for key in ("ids", "documents", "metadatas")}
+            if include_vectors:
+                found = [part["embeddings"] for part in parts if len(part["ids"])]
+                vectors = np.concatenate(found, axis=0) if found else np.zeros((0, 0), dtype=np.float32)
+                result["embeddings"] = vectors[offset:end]
+            return result
+        result = {"ids": [], "documents": [], "metadatas": []}
+        vectors = []
+        for shard in self.shards:
+            if limit is not None and len(result["ids"]) >= limit:
+                break
+            remaining = None if limit is None else limit - len(result["ids"])
+            if where is None:
+                # Page with shard counts instead of reading the shards before `offset`
+                n = shard.count()
+                if offset >= n:
+                    offset -= n
+                    continue
+                part = shard.get(None, remaining, offset, include_vectors)
+                offset = 0
+            else:
+                part = shard.get(where, None, 0, include_vectors)
+                skip = min(offset, len(part["ids"]))
+                offset -= skip
+                end = None if remaining is None else skip + remaining
+                part = {key: values[skip:end] for key, values in part.items()}
+            for key in result:
+                result[key].extend(part[key])
+            if include_vectors and len(part["ids"]):
+                vectors.append(part["embeddings"])
+        if include_vectors:
+            result["embeddings"] = np.concatenate(vectors, axis=0) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return result
+
+    def vectors(self) -> np.ndarray:
+        parts = [v for v in self._map(lambda shard: shard.vectors(), self.shards) if v.shape[0]]
+        return np.concatenate(parts, axis=0) if parts else np.zeros((0, 0), dtype=np.float32)
+
+    def drop(self):
+        self._map(lambda shard: shard.drop(), self.shards)
+        self._shard_of_id = None
+
+    def preload(self):
+        for shard in self.shards:
+            shard.preload()
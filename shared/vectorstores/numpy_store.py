@@ -0,0 +1,487 @@
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from shared.configs.static import QUANTIZATION_MODES, QUANTIZATION_OVERSAMPLE
+from shared.utils.filter_utils import matches_where
+from shared.utils.quantization_utils import QuantizedCodes
+from shared.utils.similarity_utils import EmbeddingBuffer, normalize_rows
+from shared.utils.string_table import StringTable
+
+EMBEDDINGS_FILE = "embeddings.npy"
+DOCUMENTS_FILE = "documents.json"
+TEXTS_TABLE = "texts"
+METADATA_FILE = "metadata.json"
+
+
+def _atomic_write_json(path: str, payload: Any):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact nearest-neighbour search over normalised float32 embeddings in NumPy.
+
+    Layout of a collection directory:
+      - embeddings.npy: (N, D) float32 unit vectors, opened with mmap_mode="r"
+      - documents.json: ids
+      - texts.bin / texts_offsets.npy: chunk texts as a memory-mapped StringTable
+      - metadata.json: metadata as a column table ({key: [value per row]})
+
+    Top-k is one matrix-vector (or matrix-matrix for batches) product followed by
+    argpartition. Metadata filters (Chroma `where` syntax) are applied as a boolean
+    row mask before scoring. Scores are squared L2 distances between unit vectors
+    (2 - 2 * cosine), matching Chroma's default distance so callers can treat both
+    backends alike.
+
+    With `quantization` set to "int8" or "binary", a compressed copy of the
+    embeddings (codes_<mode>.npy) is held in RAM and scanned instead; its top
+    k * oversample rows are rescored exactly against the memory-mapped float32
+    matrix, so only those rows are ever paged in.
+
+    Writes switch the store to in-memory tables that grow in place (an
+    EmbeddingBuffer for the vectors, lists for the rest) and an id -> row map, so
+    adding a batch costs time proportional to the batch; `persist()` writes the
+    filled rows, and the in-memory tables are kept for later writes.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        embedding_function: Embeddings,
+        persist_directory: str,
+        quantization: str = "none",
+    ):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Invalid quantization mode: {quantization}. Choose one of {QUANTIZATION_MODES}")
+        self.collection_name = collection_name
+        self.quantization = quantization
+        self.embedding_function = embedding_function
+        self.path = os.path.join(persist_directory, "numpy", collection_name)
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.ndarray] = None
+        # Set once the store is written to; replaces the memory-mapped matrix from then on
+        self._buffer: Optional[EmbeddingBuffer] = None
+        self._codes: Optional[QuantizedCodes] = None
+        self._ids: Optional[List[str]] = None
+        self._row_of_id: Dict[str, int] = {}
+        # A list while being written, a memory-mapped StringTable once persisted
+        self._texts: Optional[Sequence[str]] = None
+        self._columns: Optional[Dict[str, List[Any]]] = None
+        self._column_arrays: Dict[str, np.ndarray] = {}
+
+    # ---------- Loading / persistence ----------
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._buffer is not None:
+            return self._buffer.array()
+        if self._matrix is None:
+            emb_path = os.path.join(self.path, EMBEDDINGS_FILE)
+            if os.path.exists(emb_path):
+                self._matrix = np.load(emb_path, mmap_mode="r")
+            else:
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+    @property
+    def codes(self) -> Optional[QuantizedCodes]:
+        """Quantised embeddings, built on first use for collections persisted without them."""
+        if self.quantization == "none":
+            return None
+        if self._codes is None:
+            with self._lock:
+                if self._codes is None:
+                    codes = QuantizedCodes.load(self.quantization, self.path)
+                    if codes is None or len(codes) != self.count():
+                        codes = QuantizedCodes.build(self.quantization, np.asarray(self.matrix))
+                        if self.count():
+                            codes.save(self.path)
+                    self._codes = codes
+        return self._codes
+
+    def _ensure_side_tables(self):
+        if self._texts is None:
+            docs_path = os.path.join(self.path, DOCUMENTS_FILE)
+            meta_path = os.path.join(self.path, METADATA_FILE)
+            if os.path.exists(docs_path):
+                with open(docs_path, "r", encoding="utf-8") as f:
+                    payload = json.load(f)
+                self._ids = payload["ids"]
+                # Collections persisted before the text table kept their texts in documents.json
+                self._texts = StringTable.open(self.path, TEXTS_TABLE) or payload.get("documents", [])
+            else:
+                self._ids, self._texts = [], []
+            self._row_of_id = {row_id: row for row, row_id in enumerate(self._ids)}
+            if os.path.exists(meta_path):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    self._columns = json.load(f)["columns"]
+            else:
+                self._columns = {}
+            self._column_arrays = {}
+
+    def persist(self):
+        """Write the collection to disk; a store that was never written to re-opens it memory-mapped."""
+        with self._lock:
+            self._ensure_side_tables()
+            os.makedirs(self.path, exist_ok=True)
+            emb_path = os.path.join(self.path, EMBEDDINGS_FILE)
+            tmp_path = emb_path + ".tmp.npy"
+            np.save(tmp_path, np.ascontiguousarray(self.matrix, dtype=np.float32))
+            os.replace(tmp_path, emb_path)
+            StringTable.write(self.path, TEXTS_TABLE, self._texts)
+            _atomic_write_json(os.path.join(self.path, DOCUMENTS_FILE), {"ids": self._ids})
+            _atomic_write_json(os.path.join(self.path, METADATA_FILE), {"columns": self._columns})
+            if self._buffer is None:
+                self._matrix = np.load(emb_path, mmap_mode="r")
+                self._texts = StringTable.open(self.path, TEXTS_TABLE)
+            self._codes = None
+            if self.quantization != "none":
+                self._codes = QuantizedCodes.build(self.quantization, self.matrix)
+                self._codes.save(self.path)
+
+    def count(self) -> int:
+        return int(self.matrix.shape[0])
+
+    def ids(self) -> List[str]:
+        """Row ids in storage order, read without touching texts or metadata."""
+        self._ensure_side_tables()
+        return list(self._ids)
+
+    def preload(self):
+        """Open everything a query reads (e.g. before forking serving workers, which then share it)."""
+        with self._lock:
+            self._ensure_side_tables()
+            # Properties: map the embeddings and read the quantised codes (if any) into RAM
+            self.matrix
+            self.codes
+
+    # ---------- Writes ----------
+    def _metadata_at(self, row: int) -> Dict[str, Any]:
+        return {key: values[row] for key, values in self._columns.items() if values[row] is not None}
+
+    def _ensure_writable(self):
+        """Copy the persisted matrix and texts into growable in-memory tables (once)."""
+        self._ensure_side_tables()
+        if self._buffer is None:
+            buffer = EmbeddingBuffer()
+            buffer.extend(np.asarray(self.matrix))
+            self._buffer = buffer
+            self._matrix = None
+        if not isinstance(self._texts, list):
+            self._texts = list(self._texts)
+
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        ids: Optional[Sequence[str]] = None,
+        persist: bool = True,
+    ) -> List[str]:
+        """Append precomputed embeddings; rows with an existing id are replaced in place.
+
+        With `persist=False` the rows are only added in memory until `persist()`.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [uuid.uuid4().hex for _ in texts]
+        vectors = normalize_rows(embeddings)
+        # The last occurrence of an id repeated within the batch wins
+        positions = sorted({row_id: pos for pos, row_id in enumerate(ids)}.values())
+
+        with self._lock:
+            self._ensure_writable()
+            replaced = [(pos, self._row_of_id[ids[pos]]) for pos in positions if ids[pos] in self._row_of_id]
+            appended = [pos for pos in positions if ids[pos] not in self._row_of_id]
+            n_old = len(self._ids)
+            keys = set(self._columns) | {k for m in metadatas for k in (m or {})}
+            for key in keys:
+                self._columns.setdefault(key, [None] * n_old)
+
+            if replaced:
+                matrix = self._buffer.array()
+                for pos, row in replaced:
+                    matrix[row] = vectors[pos]
+                    self._texts[row] = texts[pos]
+                    for key in keys:
+                        self._columns[key][row] = (metadatas[pos] or {}).get(key)
+            if appended:
+                self._buffer.extend(vectors[appended])
+                for row, pos in enumerate(appended, n_old):
+                    self._row_of_id[ids[pos]] = row
+                    self._ids.append(ids[pos])
+                    self._texts.append(texts[pos])
+                for key in keys:
+                    self._columns[key].extend((metadatas[pos] or {}).get(key) for pos in appended)
+            self._column_arrays = {}
+            self._codes = None
+            if persist:
+                self.persist()
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_embeddings(texts, self.embedding_function.embed_documents(texts), metadatas, ids)
+
+    def _delete_rows(self, rows: Sequence[int]):
+        self._ensure_writable()
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[list(rows)] = False
+        buffer = EmbeddingBuffer()
+        buffer.extend(self.matrix[keep])
+        self._buffer = buffer
+        self._ids = [v for v, k in zip(self._ids, keep) if k]
+        self._row_of_id = {row_id: row for row, row_id in enumerate(self._ids)}
+        self._texts = [v for v, k in zip(self._texts, keep) if k]
+        self._columns = {key: [v for v, k in zip(values, keep) if k] for key, values in self._columns.items()}
+        self._column_arrays = {}
+
+    def delete(self, ids: Optional[List[str]] = None, persist: bool = True, **kwargs: Any) -> Optional[bool]:
+        """Delete rows by id; with `persist=False` only in memory until `persist()`."""
+        if not ids:
+            return False
+        with self._lock:
+            self._ensure_side_tables()
+            rows = [self._row_of_id[row_id] for row_id in set(ids) if row_id in self._row_of_id]
+            if rows:
+                self._delete_rows(rows)
+                if persist:
+                    self.persist()
+        return True
+
+    # ---------- Reads ----------
+    def _column_array(self, key: str) -> np.ndarray:
+        arr = self._column_arrays.get(key)
+        if arr is None:
+            values = self._columns.get(key)
+            arr = np.empty(self.count(), dtype=object)
+            if values is not None:
+                arr[:] = values
+            self._column_arrays[key] = arr
+        return arr
+
+    def _numeric_column(self, key: str) -> np.ndarray:
+        """Column as float64, NaN where the value is missing or not a number."""
+        cache_key = f"$numeric:{key}"
+        arr = self._column_arrays.get(cache_key)
+        if arr is None:
+            arr = np.fromiter(
+                (v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in self._column_array(key)),
+                dtype=np.float64,
+                count=self.count(),
+            )
+            self._column_arrays[cache_key] = arr
+        return arr
+
+    def _present(self, key: str) -> np.ndarray:
+        """Rows that have a value for `key`."""
+        cache_key = f"$present:{key}"
+        arr = self._column_arrays.get(cache_key)
+        if arr is None:
+            arr = np.fromiter((v is not None for v in self._column_array(key)), dtype=bool, count=self.count())
+            self._column_arrays[cache_key] = arr
+        return arr
+
+    def filter_mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Boolean row mask for a Chroma-style `where` filter (None when unfiltered)."""
+        if not where:
+            return None
+        self._ensure_side_tables()
+        mask = np.ones(self.count(), dtype=bool)
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                masks = [self.filter_mask(sub) for sub in condition if sub]
+                masks = [m if m is not None else np.ones(self.count(), dtype=bool) for m in masks]
+                if masks:
+                    mask &= np.logical_and.reduce(masks) if key == "$and" else np.logical_or.reduce(masks)
+                continue
+            column = self._column_array(key)
+            ops = condition if isinstance(condition, dict) else {"$eq": condition}
+            for op, target in ops.items():
+                if op == "$eq":
+                    mask &= column == target
+                elif op == "$ne":
+                    # Rows without the key match no comparison, negated ones included (as in Chroma)
+                    mask &= (column != target) & self._present(key)
+                elif op in ("$in", "$nin"):
+                    targets = set(target)
+                    member = np.fromiter((v in targets for v in column), dtype=bool, count=len(column))
+                    mask &= member if op == "$in" else ~member & self._present(key)
+                elif op in ("$gt", "$gte", "$lt", "$lte") and isinstance(target, (int, float)) and not isinstance(target, bool):
+                    # NaN (missing or non-numeric) never compares true, as in matches_where
+                    values = self._numeric_column(key)
+                    mask &= {"$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal}[op](values, target)
+                else:
+                    # Other comparisons (e.g. string ranges) are evaluated row by row
+                    rows = [matches_where(self._metadata_at(i), {key: {op: target}}) for i in range(self.count())]
+                    mask &= np.asarray(rows, dtype=bool)
+        return mask
+
+    def search_vectors(
+        self,
+        query_vectors: Sequence[Sequence[float]],
+        k: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """Top-k rows for each query vector as (row, cosine similarity), best first.
+
+        Exact unless the store is quantised, in which case the result is exact over
+        the quantised shortlist.
+        """
+        queries = normalize_rows(query_vectors)
+        matrix = self.matrix
+        if matrix.shape[0] == 0 or k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+        mask = self.filter_mask(where)
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return [[] for _ in range(queries.shape[0])]
+        else:
+            rows = None
+        if self.codes is not None:
+            return self._search_quantized(queries, k, rows)
+        scores = (matrix[rows] if rows is not None else matrix) @ queries.T
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        results = []
+        for j in range(queries.shape[0]):
+            cand = top[:, j]
+            cand = cand[np.argsort(-scores[cand, j], kind="stable")]
+            row_ids = rows[cand] if rows is not None else cand
+            results.append([(int(r), float(scores[c, j])) for r, c in zip(row_ids, cand)])
+        return results
+
+    def _search_quantized(self, queries: np.ndarray, k: int, rows: Optional[np.ndarray]) -> List[List[Tuple[int, float]]]:
+        shortlist = self.codes.shortlist(queries, k * QUANTIZATION_OVERSAMPLE[self.quantization], rows)
+        results = []
+        for j in range(queries.shape[0]):
+            # Sorted row order keeps reads from the memory map sequential
+            cand = np.sort(shortlist[j])
+            sims = self.matrix[cand] @ queries[j]
+            top = np.argsort(-sims, kind="stable")[:k]
+            results.append([(int(cand[i]), float(sims[i])) for i in top])
+        return results
+
+    def _to_document(self, row: int) -> Document:
+        return Document(page_content=self._texts[row], metadata=self._metadata_at(row), id=self._ids[row])
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: Sequence[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        return self.search_batch_by_vector([embedding], k, filter)[0]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k, filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def search_batch_by_vector(
+        self, embeddings: Sequence[Sequence[float]], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """(Document, distance) pairs for each query vector, from one matrix product."""
+        self._ensure_side_tables()
+        return [
+            [(self._to_document(row), 2.0 - 2.0 * sim) for row, sim in hits]
+            for hits in self.search_vectors(embeddings, k, where=filter)
+        ]
+
+    def similarity_search_batch(
+        self, queries: Sequence[str], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """One embedding pass and one matrix product for a batch of queries."""
+        return self.search_batch_by_vector(self.embedding_function.embed_documents(list(queries)), k, filter)
+
+    def search_with_embeddings(
+        self, query_embedding: Sequence[float], k: int, filter: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[str], np.ndarray]:
+        """Top-k texts for a query vector and their stored vectors (used by MMR)."""
+        self._ensure_side_tables()
+        hits = self.search_vectors([query_embedding], k, where=filter)[0]
+        rows = [row for row, _ in hits]
+        return [self._texts[r] for r in rows], np.asarray(self.matrix[rows])
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Optional[Sequence[str]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        """Chroma-compatible `get`: ids, documents and metadatas of matching rows
+        (plus their vectors when `include` lists "embeddings").
+
+        `offset` / `limit` page over the matching rows before any of them is read.
+        """
+        self._ensure_side_tables()
+        mask = self.filter_mask(where)
+        if ids is not None:
+            rows = sorted(self._row_of_id[i] for i in set(ids) if i in self._row_of_id)
+            if mask is not None:
+                rows = [r for r in rows if mask[r]]
+        else:
+            rows = range(self.count()) if mask is None else np.flatnonzero(mask)
+        start = offset or 0
+        rows = [int(r) for r in rows[start:None if limit is None else start + limit]]
+        result = {
+            "ids": [self._ids[r] for r in rows],
+            "documents": [self._texts[r] for r in rows],
+            "metadatas": [self._metadata_at(r) for r in rows],
+        }
+        if include and "embeddings" in include:
+            result["embeddings"] = np.asarray(self.matrix[rows], dtype=np.float32)
+        return result
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        collection_name: str = "default",
+        persist_directory: str = "chroma_db",
+        quantization: str = "none",
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(
+            collection_name=collection_name,
+            embedding_function=embedding,
+            persist_directory=persist_directory,
+            quantization=quantization,
+        )
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,32 @@
+import hashlib
+import re
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings: each word adds a fixed random direction."""
+
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+
+    def _word(self, word):
+        seed = int.from_bytes(hashlib.sha256(word.encode()).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim)
+
+    def embed_query(self, text):
+        vector = np.zeros(self.dim)
+        for word in re.findall(r"\w+", text.lower()):
+            vector += self._word(word)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+@pytest.fixture
+def embedding():
+    return HashEmbeddings()
@@ -0,0 +1,109 @@
+import time
+from types import SimpleNamespace
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from shared.components.agentic_rag_nodes import (
+    agent,
+    budget_exhausted,
+    deadline_remaining,
+    generate,
+    retrieve,
+    rewrite,
+    route_after_agent,
+    route_after_rewrite,
+)
+from shared.components.agentic_rag_states import AgentBudget
+from shared.components.agentic_tool_runner import ToolRunner
+
+
+def _llm(content="answer", tokens=10):
+    usage = {"input_tokens": tokens - 1, "output_tokens": 1, "total_tokens": tokens}
+    return RunnableLambda(lambda _: AIMessage(content=content, usage_metadata=usage))
+
+
+def _failing_llm():
+    def fail(_):
+        raise AssertionError("LLM must not be called")
+    return RunnableLambda(fail)
+
+
+def _pipeline(llm=None, deadline_seconds=60.0, tools=(), **budget):
+    return SimpleNamespace(
+        llm=llm or _llm(),
+        budget=AgentBudget(deadline_seconds=deadline_seconds, **budget),
+        tool_runner=ToolRunner(list(tools), shared_cache_ttls={}),
+    )
+
+
+def _state(started_ago=0.0, **extra):
+    return {"messages": [HumanMessage(content="question")], "started_at": time.monotonic() - started_ago, **extra}
+
+
+class _SlowTool:
+    name = "slow"
+    args_schema = None
+
+    def invoke(self, args):
+        time.sleep(1.0)
+        return "done"
+
+
+def test_deadline_remaining_and_exhaustion():
+    pipeline = _pipeline(deadline_seconds=5.0)
+    assert 4.0 < deadline_remaining(pipeline, _state(started_ago=0.5)) <= 4.5
+    assert budget_exhausted(pipeline, _state(started_ago=6.0)) == "deadline"
+    assert budget_exhausted(pipeline, _state(rewrites=5), ("llm_tokens", "deadline")) == ""
+    assert deadline_remaining(SimpleNamespace(), _state()) is None
+
+
+def test_agent_skips_llm_call_after_deadline():
+    pipeline = _pipeline(llm=_failing_llm(), deadline_seconds=1.0)
+    update = agent(pipeline, _state(started_ago=2.0))
+    assert update == {"budget_exhausted": "deadline"}
+    assert route_after_agent({**_state(), **update}) == "generate"
+
+
+def test_agent_skips_llm_call_when_tokens_spent():
+    pipeline = _pipeline(llm=_failing_llm(), max_llm_tokens=100)
+    assert agent(pipeline, _state(llm_tokens=100)) == {"budget_exhausted": "llm_tokens"}
+
+
+def test_route_after_agent():
+    with_calls = AIMessage(content="", tool_calls=[{"name": "slow", "args": {}, "id": "1"}])
+    assert route_after_agent({"messages": [with_calls]}) == "retrieve"
+    assert route_after_agent({"messages": [AIMessage(content="no tools")]}) == "restricted"
+
+
+def test_rewrite_checks_deadline_before_llm_call():
+    pipeline = _pipeline(llm=_failing_llm(), deadline_seconds=1.0)
+    update = rewrite(pipeline, _state(started_ago=2.0))
+    assert update == {"budget_exhausted": "deadline"}
+    assert route_after_rewrite(update) == "generate"
+
+    update = rewrite(_pipeline(llm=_llm(tokens=7)), _state(llm_tokens=3))
+    assert update["rewrites"] == 1 and update["llm_tokens"] == 10
+    assert route_after_rewrite(update) == "agent"
+
+
+def test_generate_counts_tokens():
+    messages = [HumanMessage(content="question"), ToolMessage(content="context", tool_call_id="1")]
+    update = generate(_pipeline(llm=_llm("final", tokens=12)), {"messages": messages, "llm_tokens": 5})
+    assert update["messages"][0].content == "final"
+    assert update["llm_tokens"] == 17
+
+
+def test_retrieve_skips_tool_calls_after_deadline():
+    pipeline = _pipeline(deadline_seconds=1.0, tools=[_SlowTool()])
+    call = AIMessage(content="", tool_calls=[{"name": "slow", "args": {}, "id": "1"}])
+    update = retrieve(pipeline, _state(started_ago=2.0, messages=[HumanMessage(content="q"), call]))
+    assert update["tool_calls"] == 0
+    assert update["messages"][0].status == "error"
+    assert "deadline reached" in update["messages"][0].content
+
+
+def test_tool_timeout_is_capped_by_deadline():
+    runner = ToolRunner([_SlowTool()], timeouts={"slow": 30.0}, shared_cache_ttls={})
+    started = time.monotonic()
+    [message] = runner.run([{"name": "slow", "args": {}, "id": "1"}], deadline=0.2)
+    assert time.monotonic() - started < 0.8
+    assert message.status == "error" and "timed out" in message.content
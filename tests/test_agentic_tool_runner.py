@@ -0,0 +1,99 @@
+import time
+from shared.components.agentic_tool_runner import ToolRunner
+from shared.configs.static import HTTP_RETRY_TOTAL, HTTP_RETRY_BACKOFF
+from shared.utils.http_utils import request_timeout
+
+
+class _SleepTool:
+    args_schema = None
+
+    def __init__(self, name, seconds):
+        self.name = name
+        self.seconds = seconds
+        self.calls = 0
+
+    def invoke(self, args):
+        self.calls += 1
+        time.sleep(self.seconds)
+        return f"{self.name} {args.get('q', '')}".strip()
+
+
+def _call(name, call_id, **args):
+    return {"name": name, "args": args, "id": call_id}
+
+
+def test_calls_run_concurrently_and_keep_call_order():
+    runner = ToolRunner([_SleepTool("a", 0.3), _SleepTool("b", 0.3)], max_workers=2, shared_cache_ttls={})
+    started = time.monotonic()
+    messages = runner.run([_call("b", "1"), _call("a", "2")])
+    assert time.monotonic() - started < 0.55
+    assert [m.content for m in messages] == ["b", "a"]
+    assert [m.tool_call_id for m in messages] == ["1", "2"]
+    runner.close()
+
+
+def test_timeout_counts_from_start_not_from_dispatch():
+    tool = _SleepTool("a", 0.3)
+    runner = ToolRunner([tool], max_workers=1, timeouts={"a": 0.5}, shared_cache_ttls={})
+    # The second call queues behind the first; each runs well within its own timeout
+    messages = runner.run([_call("a", "1", q="x"), _call("a", "2", q="y")])
+    assert [m.status for m in messages] == ["success", "success"]
+    runner.close()
+
+
+def test_queued_call_waits_at_most_its_timeout_for_a_worker():
+    hung, queued = _SleepTool("hung", 1.0), _SleepTool("queued", 0.0)
+    runner = ToolRunner([hung, queued], max_workers=1, timeouts={"hung": 0.2, "queued": 0.2}, shared_cache_ttls={})
+    started = time.monotonic()
+    messages = runner.run([_call("hung", "1"), _call("queued", "2")])
+    assert time.monotonic() - started < 0.7
+    assert [m.status for m in messages] == ["error", "error"]
+    assert queued.calls == 0  # cancelled before it started
+    runner.close()
+
+
+def test_identical_calls_share_one_execution_and_unknown_tools_fail():
+    tool = _SleepTool("a", 0.0)
+    runner = ToolRunner([tool], shared_cache_ttls={})
+    messages = runner.run([_call("a", "1", query="Hi"), _call("a", "2", query="hi "), _call("missing", "3")])
+    assert tool.calls == 1
+    assert messages[1].response_metadata["cache"] == "request"
+    assert messages[2].status == "error" and "not a valid tool" in messages[2].content
+    runner.close()
+
+
+def test_close_releases_pool_and_runner_can_restart():
+    runner = ToolRunner([_SleepTool("a", 0.0)], shared_cache_ttls={})
+    runner.run([_call("a", "1")])
+    pool = runner._pool
+    runner.close()
+    assert runner._pool is None and pool._shutdown
+    assert runner.run([_call("a", "2", q="z")])[0].content == "a z"
+    runner.close()
+
+
+def test_request_timeout_fits_retries_in_budget():
+    for budget in (10.0, 15.0, 20.0):
+        connect, read = request_timeout(budget)
+        backoff = sum(HTTP_RETRY_BACKOFF * 2 ** i for i in range(1, HTTP_RETRY_TOTAL + 1))
+        assert (connect + read) * (HTTP_RETRY_TOTAL + 1) + backoff <= budget
+
+
+def test_only_query_arguments_are_case_folded():
+    runner = ToolRunner([_SleepTool("a", 0.0)], shared_cache_ttls={})
+    assert runner.cache_key(_call("a", "1", query="AWS  Skills")) == runner.cache_key(_call("a", "2", query="aws skills"))
+    assert runner.cache_key(_call("a", "1", sources=["CV.pdf"])) != runner.cache_key(_call("a", "2", sources=["cv.pdf"]))
+    assert runner.cache_key(_call("a", "1", top_k=5.0)) == runner.cache_key(_call("a", "2", top_k=5))
+
+
+def test_key_context_separates_shared_cache_entries():
+    scope = {"value": None}
+    tool = _SleepTool("a", 0.0)
+    runner = ToolRunner([tool], shared_cache_ttls={"a": 60}, key_context={"a": lambda: scope["value"]})
+    runner.run([_call("a", "1", q="x")])
+    assert runner.run([_call("a", "2", q="x")])[0].response_metadata["cache"] == "shared"
+    # A scope change made directly on the retriever, without clearing the cache
+    scope["value"] = {"source": "other.pdf"}
+    assert runner.run([_call("a", "3", q="x")])[0].response_metadata == {}
+    assert tool.calls == 2
+    runner.close()
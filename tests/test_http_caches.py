@@ -0,0 +1,115 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from shared.tools import currency_converter_tool, web_search_tool
+from shared.utils.cache_utils import TTLCache
+from shared.utils.http_utils import close_http_sessions, get_http_session
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        server.requests.append((url.path, params))
+        server.client_ports.add(self.client_address[1])
+        if url.path == "/convert":
+            body = {"info": {"rate": 1.5}, "result": 1.5 * float(params.get("amount", 1))}
+        else:
+            body = {"organic_results": [{"title": f"About {params.get('q')}", "snippet": "stub", "link": "http://x"}]}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.requests, server.client_ports = [], set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("SERPAPI_URL", f"{base}/search.json")
+    monkeypatch.setenv("SERPAPI_API_KEY", "test-key")
+    monkeypatch.setenv("EXCHANGERATE_URL", f"{base}/convert")
+    web_search_tool.search_cache.clear()
+    currency_converter_tool.rate_cache.clear()
+    close_http_sessions()
+    yield server
+    close_http_sessions()
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_is_reused_and_keeps_connection_alive(stub_server):
+    assert get_http_session("serpapi") is get_http_session("serpapi")
+    assert get_http_session("serpapi") is not get_http_session("exchangerate")
+    web_search_tool._web_search("first")
+    web_search_tool._web_search("second")
+    web_search_tool._web_search("third")
+    assert len(stub_server.requests) == 3
+    assert len(stub_server.client_ports) == 1  # one pooled connection served every request
+
+
+def test_web_search_cache_hits_and_reads_url_at_call_time(stub_server):
+    first = web_search_tool._web_search("AWS Summit")
+    again = web_search_tool._web_search("  aws   summit ")
+    assert first == again and "About AWS Summit" in first
+    assert len(stub_server.requests) == 1
+    assert stub_server.requests[0][1]["api_key"] == "test-key"
+
+
+def test_fx_rate_is_cached_per_pair(stub_server):
+    assert currency_converter_tool._currency_convert(10, "usd", "nzd") == "10 USD = 15.0 NZD (rate: 1.5)"
+    assert currency_converter_tool._currency_convert(2, "USD", "NZD") == "2 USD = 3.0 NZD (rate: 1.5)"
+    assert len(stub_server.requests) == 1
+    assert stub_server.requests[0][1]["amount"] == "1"
+    currency_converter_tool._currency_convert(1, "EUR", "NZD")
+    assert len(stub_server.requests) == 2
+    assert currency_converter_tool.rate_cache.stats()["hits"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    now = [0.0]
+    cache = TTLCache(ttl_seconds=10, clock=lambda: now[0])
+    cache.set("k", "v")
+    now[0] = 9.9
+    assert cache.get("k") == "v"
+    now[0] = 10.0
+    assert cache.get("k") is None and len(cache) == 0
+    cache.set("short", 1, ttl_seconds=1)
+    now[0] = 11.5
+    assert cache.get("short") is None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_expired_fx_rate_is_refetched(stub_server, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(currency_converter_tool, "rate_cache", TTLCache(ttl_seconds=600, clock=lambda: now[0]))
+    currency_converter_tool._currency_convert(1, "USD", "NZD")
+    now[0] = 599
+    currency_converter_tool._currency_convert(1, "USD", "NZD")
+    assert len(stub_server.requests) == 1
+    now[0] = 601
+    currency_converter_tool._currency_convert(1, "USD", "NZD")
+    assert len(stub_server.requests) == 2
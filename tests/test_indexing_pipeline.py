@@ -0,0 +1,88 @@
+import os
+
+import pytest
+from langchain_core.documents import Document
+
+from shared.utils.indexing_pipeline import IndexingPipeline
+from shared.vectorstores.backends import NumpyBackend
+
+
+def line_chunker(path):
+    """One chunk per line of a text file, tagged with the file name like the PDF chunker."""
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f.read().splitlines()):
+            yield Document(page_content=line, metadata={"source": os.path.basename(path), "page": i})
+
+
+class CountingEmbeddings:
+    def __init__(self, inner, fail_after=None):
+        self.inner = inner
+        self.fail_after = fail_after
+        self.texts = []
+
+    def embed_documents(self, texts):
+        if self.fail_after is not None and len(self.texts) + len(texts) > self.fail_after:
+            raise RuntimeError("embedding service down")
+        self.texts.extend(texts)
+        return self.inner.embed_documents(texts)
+
+
+def _write(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def _pipeline(backend, embedding, tmp_path):
+    return IndexingPipeline(backend, embedding, str(tmp_path / "ckpt" / "test.json"), chunker=line_chunker,
+                            batch_size=2, queue_batches=2, commit_every=1, progress_seconds=3600)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    paths = [str(data / "a.pdf"), str(data / "b.pdf")]
+    _write(paths[0], [f"alpha line {i}" for i in range(5)])
+    _write(paths[1], [f"beta line {i}" for i in range(4)])
+    return paths
+
+
+def test_full_run_indexes_everything_and_removes_checkpoint(tmp_path, embedding, corpus):
+    backend = NumpyBackend("index_test", embedding, str(tmp_path))
+    stats = _pipeline(backend, CountingEmbeddings(embedding), tmp_path).run(corpus)
+    assert stats["chunks"] == 9 and stats["files_indexed"] == 2
+    assert backend.count() == 9
+    assert not os.path.exists(tmp_path / "ckpt" / "test.json")
+    # Persisted: a fresh backend sees the same rows
+    assert NumpyBackend("index_test", embedding, str(tmp_path)).count() == 9
+
+
+def test_changed_file_replaces_its_old_chunks(tmp_path, embedding, corpus):
+    backend = NumpyBackend("index_test", embedding, str(tmp_path))
+    _pipeline(backend, CountingEmbeddings(embedding), tmp_path).run(corpus)
+    _write(corpus[0], ["alpha rewritten", "alpha second version line"])
+    _pipeline(backend, CountingEmbeddings(embedding), tmp_path).run(corpus)
+    alpha = backend.get(where={"source": "a.pdf"})["documents"]
+    assert sorted(alpha) == ["alpha rewritten", "alpha second version line"]
+    assert backend.count() == 6
+
+
+def test_interrupted_run_resumes_after_last_commit(tmp_path, embedding, corpus):
+    backend = NumpyBackend("index_test", embedding, str(tmp_path))
+    failing = CountingEmbeddings(embedding, fail_after=6)
+    with pytest.raises(RuntimeError):
+        _pipeline(backend, failing, tmp_path).run(corpus)
+    assert os.path.exists(tmp_path / "ckpt" / "test.json")
+    committed = NumpyBackend("index_test", embedding, str(tmp_path)).count()
+    assert 0 < committed < 9
+
+    resumed = CountingEmbeddings(embedding)
+    backend = NumpyBackend("index_test", embedding, str(tmp_path))
+    stats = _pipeline(backend, resumed, tmp_path).run(corpus)
+    # Only chunks after the last commit are chunked and embedded again
+    assert len(resumed.texts) == 9 - committed == stats["chunks"]
+    assert backend.count() == 9
+    assert sorted(backend.get()["documents"]) == sorted(
+        [f"alpha line {i}" for i in range(5)] + [f"beta line {i}" for i in range(4)]
+    )
+    assert not os.path.exists(tmp_path / "ckpt" / "test.json")
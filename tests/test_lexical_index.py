@@ -0,0 +1,101 @@
+import numpy as np
+
+from shared.utils.lexical_index import BM25Index, tokenize
+from shared.utils.retrieval_utils import (
+    hybrid_search,
+    rebuild_lexical_index,
+    reciprocal_rank_fusion,
+    search_texts,
+)
+from shared.vectorstores.backends import NumpyBackend
+
+CHUNKS = {
+    "a": ("Policy HR-2023-07 covers parental leave", {"source": "hr.pdf"}),
+    "b": ("Parental leave is twelve weeks", {"source": "hr.pdf"}),
+    "c": ("The candidate knows node.js and c++", {"source": "cv.pdf"}),
+    "d": ("Quarterly revenue grew strongly", {"source": "finance.pdf"}),
+    "e": ("Parental leave for contractors", {"source": "contractors.pdf"}),
+}
+
+
+def _backend(tmp_path, embedding, chunks=CHUNKS):
+    backend = NumpyBackend("lexical_test", embedding, str(tmp_path))
+    ids = list(chunks)
+    texts = [chunks[i][0] for i in ids]
+    backend.add(ids, texts, embedding.embed_documents(texts), [chunks[i][1] for i in ids])
+    backend.persist()
+    return backend
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    tokens = tokenize("See HR-2023-07 and node.js")
+    assert "hr-2023-07" in tokens and "2023" in tokens
+    assert "node.js" in tokens and "node" in tokens
+
+
+def test_search_ranks_exact_terms_and_returns_chunk_ids():
+    index = BM25Index()
+    index.add(list(CHUNKS), [text for text, _ in CHUNKS.values()])
+    hits = index.search("HR-2023-07", 2)
+    assert hits[0][0] == "a"
+    assert index.search("unrelated words", 3) == []
+
+
+def test_keep_filters_candidates_page_by_page():
+    index = BM25Index()
+    ids = [f"doc-{i}" for i in range(50)]
+    index.add(ids, [f"leave {'leave ' * (i % 5)}policy {i}" for i in range(50)])
+    pages = []
+
+    def keep(page):
+        pages.append(len(page))
+        return [i for i in page if int(i.split("-")[1]) % 10 == 3]
+
+    hits = index.search("leave", 3, keep=keep)
+    assert len(hits) == 3 and all(int(i.split("-")[1]) % 10 == 3 for i, _ in hits)
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+    assert pages[0] == 12  # first page is 4 * k, later pages grow
+
+
+def test_save_load_round_trip_stores_only_postings_and_ids(tmp_path):
+    index = BM25Index()
+    index.add(list(CHUNKS), [text for text, _ in CHUNKS.values()])
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+    with np.load(path) as data:
+        assert set(data.files) == {"header", "terms", "ids", "doc_lens", "offsets", "doc_ids", "tfs"}
+    loaded = BM25Index.load(path)
+    assert len(loaded) == len(index)
+    assert loaded.search("parental leave", 3) == index.search("parental leave", 3)
+    loaded.add(["f"], ["parental leave policy update"])
+    assert "f" in [i for i, _ in loaded.search("parental leave", 5)]
+
+
+def test_reciprocal_rank_fusion_sums_reciprocal_ranks():
+    fused = dict(reciprocal_rank_fusion([["x", "y"], ["y", "z"]], k=60))
+    assert fused["y"] == 1 / 62 + 1 / 61
+    assert fused["x"] == 1 / 61 and fused["z"] == 1 / 62
+
+
+def test_hybrid_fuses_on_chunk_id_and_resolves_texts_from_backend(tmp_path, embedding):
+    chunks = dict(CHUNKS, dup=("Parental leave is twelve weeks", {"source": "copy.pdf"}))
+    backend = _backend(tmp_path, embedding, chunks)
+    index = rebuild_lexical_index(backend, str(tmp_path / "lexical.npz"))
+    results = hybrid_search(backend, index, "parental leave twelve weeks", 6, 6)
+    # Identical texts under different ids are separate candidates
+    assert results.count("Parental leave is twelve weeks") == 2
+    assert search_texts(backend, "HR-2023-07", 1, mode="hybrid", lexical_index=index) == [CHUNKS["a"][0]]
+
+
+def test_hybrid_filter_applies_to_the_lexical_side(tmp_path, embedding):
+    backend = _backend(tmp_path, embedding)
+    index = rebuild_lexical_index(backend, str(tmp_path / "lexical.npz"))
+    results = hybrid_search(backend, index, "parental leave", 5, 5, filter={"source": "contractors.pdf"})
+    assert results == [CHUNKS["e"][0]]
+
+
+def test_hybrid_skips_chunks_deleted_after_the_index_was_built(tmp_path, embedding):
+    backend = _backend(tmp_path, embedding)
+    index = rebuild_lexical_index(backend, str(tmp_path / "lexical.npz"))
+    backend.delete(["a"])
+    assert CHUNKS["a"][0] not in hybrid_search(backend, index, "HR-2023-07", 3, 3)
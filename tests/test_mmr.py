@@ -0,0 +1,54 @@
+import numpy as np
+
+from shared.utils.retrieval_utils import search_texts
+from shared.utils.similarity_utils import maximal_marginal_relevance, normalize_rows
+from shared.vectorstores.backends import NumpyBackend
+
+
+def _reference_mmr(query, candidates, k, lambda_mult):
+    """Straightforward loop implementation to check the vectorised one against."""
+    cand = normalize_rows(candidates)
+    relevance = cand @ normalize_rows(query)[0]
+    selected = []
+    while len(selected) < min(k, len(cand)):
+        best, best_score = None, -np.inf
+        for i in range(len(cand)):
+            if i in selected:
+                continue
+            redundancy = max((float(cand[i] @ cand[j]) for j in selected), default=0.0)
+            score = lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy if selected else relevance[i]
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+    return selected
+
+
+def test_matches_reference_implementation():
+    rng = np.random.default_rng(3)
+    candidates = rng.standard_normal((40, 16))
+    query = rng.standard_normal(16)
+    for lambda_mult in (0.0, 0.3, 0.7, 1.0):
+        assert maximal_marginal_relevance(query, candidates, 8, lambda_mult) == _reference_mmr(query, candidates, 8, lambda_mult)
+
+
+def test_lambda_one_is_pure_relevance_and_lower_lambda_skips_duplicates():
+    query = [1.0, 0.0, 0.0]
+    candidates = [[1.0, 0.05, 0.0], [1.0, 0.06, 0.0], [0.7, 0.0, 0.7]]
+    assert maximal_marginal_relevance(query, candidates, 2, 1.0) == [0, 1]
+    assert maximal_marginal_relevance(query, candidates, 2, 0.5) == [0, 2]
+
+
+def test_edge_cases():
+    assert maximal_marginal_relevance([1.0, 0.0], [], 3) == []
+    assert maximal_marginal_relevance([1.0, 0.0], [[1.0, 0.0]], 0) == []
+    assert maximal_marginal_relevance([1.0, 0.0], [[1.0, 0.0], [0.0, 1.0]], 5) == [0, 1]
+
+
+def test_mmr_mode_returns_diverse_texts(tmp_path, embedding):
+    backend = NumpyBackend("mmr_test", embedding, str(tmp_path))
+    texts = ["aws lambda serverless", "aws lambda serverless functions", "kubernetes clusters on premises"]
+    backend.add(["a", "b", "c"], texts, embedding.embed_documents(texts), [{}, {}, {}])
+    dense = search_texts(backend, "aws lambda serverless", 2, mode="dense")
+    diverse = search_texts(backend, "aws lambda serverless", 2, mode="mmr", mmr_lambda=0.3)
+    assert dense == texts[:2]
+    assert diverse == [texts[0], texts[2]]
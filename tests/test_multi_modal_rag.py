@@ -0,0 +1,29 @@
+import projects.pipeline.multi_modal_rag as mm
+import projects.pipeline.multi_modal_rag_pipeline as mm_pipeline
+import projects.retriever.multi_modal_retriever as mm_retriever
+
+
+class FakeRetriever:
+    def __init__(self, data_dir, rag_type):
+        self.data_dir = data_dir
+
+    def retrieve(self, query, top_k=5):
+        return []
+
+
+def test_retrieval_does_not_build_the_chat_model(monkeypatch):
+    def no_chat_model(*args, **kwargs):
+        raise AssertionError("retrieval must not create the chat model")
+
+    monkeypatch.setattr(mm_retriever, "MultiModalRetriever", FakeRetriever)
+    monkeypatch.setattr(mm_pipeline, "init_chat_model", no_chat_model)
+    mm.get_retriever.cache_clear()
+    mm.get_pipeline.cache_clear()
+    try:
+        assert mm.retrieve_multimodal("q", data_dir="some/dir") == []
+        pipeline = mm.get_pipeline("some/dir")
+        assert pipeline.retriever is mm.get_retriever("some/dir")
+        assert pipeline._llm is None
+    finally:
+        mm.get_retriever.cache_clear()
+        mm.get_pipeline.cache_clear()
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+import shared.utils.multimodal_indexing as mm_indexing
+from shared.utils.multimodal_indexing import ClipBatchStage, run_multimodal_extraction
+
+
+class FakeClip:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def embed_texts(self, texts):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("clip crashed")
+        return [[float(len(t))] for t in texts]
+
+    def embed_images(self, images):
+        return self.embed_texts(images)
+
+
+def _ranges(n_items):
+    yield {
+        "task": ("doc.pdf", 0, 1),
+        "error": None,
+        "stats": {},
+        "items": [{"kind": "text", "text": f"item {i}"} for i in range(n_items)],
+    }
+
+
+def test_close_embeds_everything_in_submission_order(monkeypatch):
+    monkeypatch.setattr(mm_indexing, "plan_page_ranges", lambda paths, pages: [])
+    monkeypatch.setattr(mm_indexing, "iter_extracted_ranges", lambda tasks, workers: _ranges(5))
+    kept, embeddings = run_multimodal_extraction(["doc.pdf"], FakeClip(), lambda path, item: True, lambda stats: None)
+    assert [item["text"] for _, item in kept] == [f"item {i}" for i in range(5)]
+    assert embeddings == {i: [float(len(f"item {i}"))] for i in range(5)}
+
+
+def test_error_in_the_loop_is_not_masked_by_the_stage(monkeypatch):
+    clip = FakeClip(fail=True)
+    monkeypatch.setattr(mm_indexing, "plan_page_ranges", lambda paths, pages: [])
+    monkeypatch.setattr(mm_indexing, "iter_extracted_ranges", lambda tasks, workers: _ranges(5))
+
+    def on_item(path, item):
+        if item["text"] == "item 3":
+            raise KeyError("bad item")
+        return True
+
+    with pytest.raises(KeyError, match="bad item"):
+        run_multimodal_extraction(["doc.pdf"], clip, on_item, lambda stats: None)
+    # The three queued items were dropped rather than embedded on the way out
+    assert clip.calls == []
+
+
+def test_stop_discards_queued_items():
+    release = threading.Event()
+    clip = FakeClip()
+    original = clip.embed_texts
+    clip.embed_texts = lambda texts: release.wait() and original(texts)
+    stage = ClipBatchStage(clip, batch_size=2, queue_batches=4)
+    for seq in range(6):
+        stage.submit(seq, "text", f"t{seq}")
+    release.set()
+    stage.stop()
+    assert len(clip.calls) <= 1
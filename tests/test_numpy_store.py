@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+import pytest
+
+from shared.utils.filter_utils import matches_where
+from shared.utils.similarity_utils import EmbeddingBuffer, normalize_rows
+from shared.vectorstores.numpy_store import EMBEDDINGS_FILE, NumpyVectorStore
+
+
+def _store(tmp_path, embedding, quantization="none"):
+    return NumpyVectorStore("numpy_test", embedding, str(tmp_path), quantization=quantization)
+
+
+def _random_rows(n, dim=32, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_embedding_buffer_grows_geometrically():
+    buffer = EmbeddingBuffer(initial_rows=4)
+    buffer.extend(np.ones((3, 2)))
+    buffer.append([2, 2])
+    data = buffer._data
+    buffer.extend(np.full((5, 2), 3))
+    assert len(buffer) == 9 and buffer._data.shape[0] == 16
+    assert buffer._data is not data
+    assert buffer.array()[3].tolist() == [2, 2] and buffer.array()[-1].tolist() == [3, 3]
+
+
+def test_adds_grow_in_place_and_persist_trims(tmp_path, embedding):
+    store = _store(tmp_path, embedding)
+    vectors = _random_rows(300)
+    for start in range(0, 300, 10):
+        rows = range(start, start + 10)
+        store.add_embeddings([f"text {i}" for i in rows], vectors[start:start + 10], [{"n": i} for i in rows],
+                             [f"id-{i}" for i in rows], persist=False)
+    assert store.count() == 300 and store._buffer._data.shape[0] == 512
+    store.persist()
+    on_disk = np.load(os.path.join(store.path, EMBEDDINGS_FILE))
+    assert on_disk.shape == (300, 32)
+    np.testing.assert_allclose(on_disk, normalize_rows(vectors), rtol=1e-6)
+
+    reopened = _store(tmp_path, embedding)
+    assert isinstance(reopened.matrix, np.memmap)
+    assert reopened.get(ids=["id-299", "id-7"]) == {
+        "ids": ["id-7", "id-299"],
+        "documents": ["text 7", "text 299"],
+        "metadatas": [{"n": 7}, {"n": 299}],
+    }
+
+
+def test_existing_ids_are_replaced_in_place(tmp_path, embedding):
+    store = _store(tmp_path, embedding)
+    vectors = _random_rows(4)
+    store.add_embeddings(["a", "b", "c"], vectors[:3], [{"k": 1}, {"k": 2}, {"k": 3}], ["a", "b", "c"])
+    store.add_embeddings(["b2", "d", "d2"], vectors[[3, 0, 1]], [{"k": 20}, {}, {"other": True}], ["b", "d", "d"])
+    assert store.count() == 4
+    result = store.get()
+    assert result["ids"] == ["a", "b", "c", "d"]
+    assert result["documents"] == ["a", "b2", "c", "d2"]
+    assert result["metadatas"] == [{"k": 1}, {"k": 20}, {"k": 3}, {"other": True}]
+    hits = store.search_vectors([vectors[3]], 1)[0]
+    assert hits[0][0] == 1 and hits[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_delete_keeps_id_lookup_consistent(tmp_path, embedding):
+    store = _store(tmp_path, embedding)
+    store.add_embeddings(["a", "b", "c"], _random_rows(3), ids=["a", "b", "c"])
+    store.delete(["a", "missing"])
+    assert store.get(ids=["c", "b"])["ids"] == ["b", "c"]
+    store.add_embeddings(["c2"], _random_rows(1, seed=5), ids=["c"])
+    assert store.get()["documents"] == ["b", "c2"]
+
+
+METADATAS = [
+    {"source": "a.pdf", "page": 1},
+    {"source": "b.pdf", "page": 2},
+    {"page": 3},
+    {"source": "c.pdf", "page": "x"},
+    {"source": "a.pdf"},
+]
+
+
+@pytest.mark.parametrize("where", [
+    {"source": "a.pdf"},
+    {"source": {"$ne": "a.pdf"}},
+    {"source": {"$nin": ["a.pdf", "b.pdf"]}},
+    {"source": {"$in": ["a.pdf", "c.pdf"]}},
+    {"page": {"$gte": 2}},
+    {"page": {"$lt": 3}},
+    {"$or": [{"source": "b.pdf"}, {"page": 3}]},
+    {"$and": [{"source": {"$ne": "b.pdf"}}, {"page": {"$gt": 0}}]},
+])
+def test_filter_mask_agrees_with_matches_where(tmp_path, embedding, where):
+    store = _store(tmp_path, embedding)
+    store.add_embeddings([str(i) for i in range(5)], _random_rows(5), METADATAS)
+    expected = [matches_where(m, where) for m in METADATAS]
+    assert store.filter_mask(where).tolist() == expected
+
+
+def test_negated_filters_skip_rows_without_the_key(tmp_path, embedding):
+    store = _store(tmp_path, embedding)
+    store.add_embeddings([str(i) for i in range(5)], _random_rows(5), METADATAS)
+    assert store.filter_mask({"source": {"$ne": "a.pdf"}}).tolist() == [False, True, False, True, False]
+    assert store.filter_mask({"source": {"$nin": ["a.pdf"]}}).tolist() == [False, True, False, True, False]
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_quantised_search_rescores_with_exact_vectors(tmp_path, embedding, quantization):
+    vectors = _random_rows(400, seed=1)
+    exact = _store(tmp_path / "exact", embedding)
+    quantised = _store(tmp_path / quantization, embedding, quantization)
+    for store in (exact, quantised):
+        store.add_embeddings([str(i) for i in range(400)], vectors)
+    queries = _random_rows(20, seed=2)
+    recall = []
+    for expected, got in zip(exact.search_vectors(queries, 5), quantised.search_vectors(queries, 5)):
+        recall.append(len({r for r, _ in expected} & {r for r, _ in got}) / 5)
+        exact_scores = dict(expected)
+        # Scores come from the float32 rows, not from the codes
+        for row, score in got:
+            if row in exact_scores:
+                assert score == pytest.approx(exact_scores[row], abs=1e-6)
+    assert np.mean(recall) >= 0.9
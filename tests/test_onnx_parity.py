@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+
+from shared.configs.static import ONNX_PARITY_MIN_COSINE
+from shared.utils import onnx_utils
+
+REFERENCE = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], dtype=np.float32)
+CLOSE = np.array([[1.0, 0.01, 0.0], [0.0, 1.0, 0.01]], dtype=np.float32)
+FAR = np.array([[0.0, 0.0, 1.0], [0.0, 1.0, 0.0]], dtype=np.float32)
+
+
+@pytest.fixture
+def graph_env(monkeypatch):
+    """prepare_graph without real ONNX files: sessions are their paths, quantising copies the file."""
+    def fake_quantize(fp32_path, int8_path):
+        with open(fp32_path, "rb") as src, open(int8_path, "wb") as dst:
+            dst.write(src.read())
+
+    monkeypatch.setattr(onnx_utils, "create_session", lambda path: path)
+    monkeypatch.setattr(onnx_utils, "_quantize", fake_quantize)
+    monkeypatch.setattr(onnx_utils, "ONNX_QUANTIZE", True)
+    calls = {"export": 0, "reference": 0}
+
+    def export(path):
+        calls["export"] += 1
+        with open(path, "wb") as f:
+            f.write(b"graph")
+
+    def reference():
+        calls["reference"] += 1
+        return REFERENCE
+
+    return calls, export, reference
+
+
+def test_min_cosine():
+    assert onnx_utils.min_cosine(REFERENCE, REFERENCE) == pytest.approx(1.0)
+    assert onnx_utils.min_cosine(REFERENCE, FAR) == pytest.approx(0.0)
+
+
+def test_int8_graph_is_used_when_it_matches_torch(tmp_path, graph_env):
+    calls, export, reference = graph_env
+    path = onnx_utils.prepare_graph(str(tmp_path), "text", export, reference, run=lambda session: CLOSE)
+    assert os.path.basename(path) == "text.int8.onnx"
+    # The recorded decision is reused without exporting or running torch again
+    again = onnx_utils.prepare_graph(str(tmp_path), "text", export, reference, run=lambda session: FAR)
+    assert again == path and calls == {"export": 1, "reference": 1}
+
+
+def test_fp32_is_the_fallback_and_none_means_torch(tmp_path, graph_env):
+    _, export, reference = graph_env
+    run = lambda session: FAR if session.endswith(".int8.onnx") else CLOSE
+    assert os.path.basename(onnx_utils.prepare_graph(str(tmp_path / "a"), "text", export, reference, run)) == "text.onnx"
+    assert onnx_utils.prepare_graph(str(tmp_path / "b"), "text", export, reference, run=lambda session: FAR) is None
+    meta = onnx_utils._read_meta(str(tmp_path / "b"))
+    assert meta["text:int8"]["file"] is None and meta["text:int8"]["min_cosine"] < ONNX_PARITY_MIN_COSINE
+
+
+def test_onnx_minilm_matches_torch(tmp_path, monkeypatch):
+    """End-to-end export and parity check; needs torch, transformers, onnx and the model."""
+    for module in ("torch", "transformers", "onnx", "onnxruntime", "sentence_transformers"):
+        pytest.importorskip(module)
+    from sentence_transformers import SentenceTransformer
+    from shared.configs.static import EMBEDDING_MODEL
+    try:
+        reference = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+    except Exception as e:
+        pytest.skip(f"model not available: {e}")
+    monkeypatch.setattr(onnx_utils, "ONNX_CACHE_DIR", str(tmp_path))
+    embeddings = onnx_utils.load_onnx_text_embeddings.__wrapped__(EMBEDDING_MODEL)
+    assert embeddings is not None
+    texts = ["Leave policy for new parents", "Kubernetes and AWS experience", "short"]
+    expected = reference.encode(texts, convert_to_numpy=True)
+    assert onnx_utils.min_cosine(expected, np.asarray(embeddings.embed_documents(texts))) >= ONNX_PARITY_MIN_COSINE
@@ -0,0 +1,77 @@
+import fitz
+
+from shared.utils import pdf_utils
+from shared.utils.pdf_utils import iter_pdf_pages, stream_pdf_chunks
+
+PAGES = [
+    " ".join(f"Page {p} sentence {i} talks about leave policy." for i in range(40)) + "\n\n"
+    for p in range(4)
+]
+
+
+def _fake_pages(monkeypatch, pages=PAGES):
+    read = []
+
+    def iter_pages(path):
+        for index, text in enumerate(pages):
+            read.append(index)
+            yield index, text
+
+    monkeypatch.setattr(pdf_utils, "iter_pdf_pages", iter_pages)
+    return read
+
+
+def test_offsets_pages_and_sizes(monkeypatch):
+    _fake_pages(monkeypatch)
+    document = "".join(PAGES)
+    page_starts = [sum(len(p) for p in PAGES[:i]) for i in range(len(PAGES))]
+    chunks = list(stream_pdf_chunks("/data/policies.pdf", chunk_size=300, chunk_overlap=40, metadata={"tag_hr": True}))
+    assert len(chunks) > len(PAGES)
+    for chunk in chunks:
+        meta = chunk.metadata
+        assert len(chunk.page_content) <= 300
+        assert document[meta["start_index"]:meta["end_index"]] == chunk.page_content
+        assert meta["source"] == "policies.pdf" and meta["tag_hr"] is True
+        assert meta["page"] == max(i for i, start in enumerate(page_starts) if start <= meta["start_index"])
+        assert meta["page_end"] == max(i for i, start in enumerate(page_starts) if start < meta["end_index"])
+    # Chunks overlap, cover the document and some span a page boundary
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev.metadata["start_index"] < nxt.metadata["start_index"] < prev.metadata["end_index"]
+    assert chunks[0].metadata["start_index"] == 0
+    assert chunks[-1].metadata["end_index"] == len(document.rstrip())
+    assert any(c.metadata["page"] != c.metadata["page_end"] for c in chunks)
+
+
+def test_chunks_are_yielded_before_later_pages_are_read(monkeypatch):
+    read = _fake_pages(monkeypatch)
+    chunks = stream_pdf_chunks("doc.pdf", chunk_size=300, chunk_overlap=40)
+    next(chunks)
+    assert read == [0]
+
+
+def test_cuts_prefer_sentence_boundaries(monkeypatch):
+    _fake_pages(monkeypatch)
+    chunks = list(stream_pdf_chunks("doc.pdf", chunk_size=300, chunk_overlap=0))
+    assert all(c.page_content.endswith(".") for c in chunks)
+
+
+def test_short_and_blank_documents(monkeypatch):
+    _fake_pages(monkeypatch, ["  \n", "Only line.", "\n"])
+    chunks = list(stream_pdf_chunks("doc.pdf", chunk_size=300, chunk_overlap=40))
+    assert [c.page_content for c in chunks] == ["Only line."]
+    assert chunks[0].metadata["page"] == chunks[0].metadata["page_end"] == 1
+    _fake_pages(monkeypatch, ["", "   "])
+    assert list(stream_pdf_chunks("doc.pdf")) == []
+
+
+def test_reads_a_real_pdf(tmp_path):
+    path = str(tmp_path / "real.pdf")
+    doc = fitz.open()
+    for text in ("First page about benefits.", "Second page about onboarding."):
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+    doc.close()
+    assert [index for index, _ in iter_pdf_pages(path)] == [0, 1]
+    chunks = list(stream_pdf_chunks(path, chunk_size=500, chunk_overlap=50))
+    assert len(chunks) == 1 and "onboarding" in chunks[0].page_content
+    assert (chunks[0].metadata["page"], chunks[0].metadata["page_end"]) == (0, 1)
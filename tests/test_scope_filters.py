@@ -0,0 +1,93 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import main
+from projects.retriever.base_retriever import BaseRetriever
+from shared.components.agentic_tool_runner import ToolRunner
+from shared.utils.filter_utils import combine_filters, matches_where, parse_scope, scope_filter
+from shared.vectorstores.backends import NumpyBackend
+
+DAY = 86400
+DOCS = [
+    ("hr-1", "parental leave policy", {"source": "HR Policies.pdf", "page": 0, "ingested_at": 10 * DAY, "tag_hr": True}),
+    ("hr-2", "leave carry over rules", {"source": "HR Policies.pdf", "page": 4, "ingested_at": 10 * DAY, "tag_hr": True}),
+    ("fin-1", "leave liability in the balance sheet", {"source": "finance.pdf", "page": 1, "ingested_at": 20 * DAY}),
+    ("cv-1", "candidate led the leave system migration", {"source": "cv.pdf", "page": 0, "ingested_at": 30 * DAY}),
+]
+
+
+def test_scope_filter_builds_a_chroma_where():
+    assert scope_filter() is None
+    assert scope_filter(sources=["a.pdf"]) == {"source": {"$eq": "a.pdf"}}
+    assert scope_filter(sources=["a.pdf", "b.pdf"], tags=["hr"], since=5.9, pages=(1, 3)) == {"$and": [
+        {"source": {"$in": ["a.pdf", "b.pdf"]}},
+        {"tag_hr": {"$eq": True}},
+        {"ingested_at": {"$gte": 5}},
+        {"page": {"$gte": 1}},
+        {"page": {"$lte": 3}},
+    ]}
+
+
+def test_parse_scope_tokens():
+    where = parse_scope('"HR Policies.pdf" cv.pdf tag:hr since:1000 pages:2')
+    assert where == scope_filter(["HR Policies.pdf", "cv.pdf"], ["hr"], since=1000, pages=(2, 2))
+    day = time.mktime(time.strptime("2024-03-01", "%Y-%m-%d"))
+    assert parse_scope("until:2024-03-01") == {"ingested_at": {"$lte": int(day) + 86399}}
+    for bad in ("since:yesterday", "pages:a-b"):
+        with pytest.raises(ValueError):
+            parse_scope(bad)
+
+
+def test_combine_filters_flattens_and_skips_empty():
+    assert combine_filters(None, {}) is None
+    assert combine_filters({"a": 1}) == {"a": 1}
+    assert combine_filters({"$and": [{"a": 1}, {"b": 2}]}, {"c": 3, "d": 4}, None) == {
+        "$and": [{"a": 1}, {"b": 2}, {"c": 3}, {"d": 4}]
+    }
+
+
+def test_matches_where_on_scopes():
+    metadata = DOCS[0][2]
+    assert matches_where(metadata, parse_scope('"HR Policies.pdf" tag:hr'))
+    assert not matches_where(metadata, parse_scope("tag:finance"))
+    assert not matches_where(metadata, scope_filter(since=11 * DAY))
+    assert matches_where(metadata, {"$or": [{"source": "x.pdf"}, {"page": {"$lt": 1}}]})
+
+
+@pytest.fixture
+def retriever(tmp_path, embedding):
+    backend = NumpyBackend("scope_test", embedding, str(tmp_path))
+    texts = [text for _, text, _ in DOCS]
+    backend.add([i for i, _, _ in DOCS], texts, embedding.embed_documents(texts), [m for _, _, m in DOCS])
+    retriever = BaseRetriever.__new__(BaseRetriever)
+    retriever.backend, retriever.lexical_index, retriever.scope = backend, None, None
+    return retriever
+
+
+def test_session_scope_is_anded_with_call_filters(retriever):
+    assert len(retriever.retrieve("leave", top_k=4, mode="dense")) == 4
+    retriever.set_scope(parse_scope("tag:hr"))
+    assert set(retriever.retrieve("leave", top_k=4, mode="dense")) == {DOCS[0][1], DOCS[1][1]}
+    assert retriever.retrieve("leave", top_k=4, mode="dense", filter=scope_filter(pages=(3, 9))) == [DOCS[1][1]]
+    assert [[t for t, _ in hits] for hits in retriever.retrieve_many(["leave"], top_k=4)] == [
+        retriever.retrieve("leave", top_k=4, mode="dense")
+    ]
+    assert retriever.count_matching(retriever.scope) == 2 and retriever.count_matching() == 4
+    retriever.set_scope(None)
+    assert retriever.scope is None
+
+
+def test_main_set_scope_updates_retriever_and_frees_tool_cache(retriever, capsys):
+    runner = ToolRunner([], shared_cache_ttls={})
+    runner.shared_cache.set("resume_retriever:x", "old")
+    rag = SimpleNamespace(retriever=retriever, tool_runner=runner)
+    main.set_scope(rag, "cv.pdf finance.pdf")
+    assert retriever.scope == {"source": {"$in": ["cv.pdf", "finance.pdf"]}}
+    assert len(runner.shared_cache) == 0
+    assert "(2 of 4 chunks)" in capsys.readouterr().out
+    main.set_scope(rag, "pages:x")
+    assert "Error" in capsys.readouterr().out and retriever.scope is not None
+    main.set_scope(rag, "clear")
+    assert retriever.scope is None and "whole collection" in capsys.readouterr().out
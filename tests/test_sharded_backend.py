@@ -0,0 +1,84 @@
+import numpy as np
+
+from shared.vectorstores.backends import NumpyBackend, ShardedBackend
+
+DAY = 86400
+TEXTS = [f"chunk {i} on {['leave', 'payroll', 'security', 'travel'][i % 4]} policy" for i in range(24)]
+IDS = [f"id-{i:02d}" for i in range(24)]
+METADATAS = [{"source": f"doc{i % 5}.pdf", "ingested_at": (i % 3) * DAY, "page": i} for i in range(24)]
+
+
+def _sharded(tmp_path, embedding, routing="source", n=3):
+    shards = [NumpyBackend(f"sharded_{i}", embedding, str(tmp_path)) for i in range(n)]
+    return ShardedBackend("sharded", shards, routing=routing, time_bucket_seconds=DAY)
+
+
+def _fill(backend, embedding):
+    backend.add(IDS, TEXTS, embedding.embed_documents(TEXTS), METADATAS)
+    backend.persist()
+    return backend
+
+
+def test_scatter_gather_matches_a_single_backend(tmp_path, embedding):
+    sharded = _fill(_sharded(tmp_path, embedding), embedding)
+    single = _fill(NumpyBackend("single", embedding, str(tmp_path)), embedding)
+    assert sharded.count() == single.count() == 24
+    assert sum(1 for shard in sharded.shards if shard.count()) > 1
+    queries = embedding.embed_documents(["leave policy", "security chunk 7", "travel"])
+    for where in (None, {"source": {"$in": ["doc1.pdf", "doc3.pdf"]}}):
+        for got, expected in zip(sharded.search_batch(queries, 5, where), single.search_batch(queries, 5, where)):
+            assert [d.id for d, _ in got] == [d.id for d, _ in expected]
+            np.testing.assert_allclose([s for _, s in got], [s for _, s in expected], atol=1e-5)
+    texts, vectors = sharded.search_with_embeddings(queries[0], 4)
+    assert texts == [d.page_content for d, _ in single.search(queries[0], 4)] and vectors.shape == (4, 32)
+
+
+def test_source_routing_keeps_a_document_in_one_shard(tmp_path, embedding):
+    sharded = _fill(_sharded(tmp_path, embedding), embedding)
+    for source in {m["source"] for m in METADATAS}:
+        holders = [i for i, shard in enumerate(sharded.shards) if shard.get(where={"source": source})["ids"]]
+        assert len(holders) == 1
+
+
+def test_get_pages_across_shards(tmp_path, embedding):
+    sharded = _fill(_sharded(tmp_path, embedding), embedding)
+    for where in (None, {"page": {"$gte": 5}}):
+        full = sharded.get(where=where)
+        for offset, limit in ((0, 5), (4, 7), (20, 10)):
+            assert sharded.get(where=where, limit=limit, offset=offset)["ids"] == full["ids"][offset:offset + limit]
+    assert sorted(sharded.get(ids=["id-03", "id-17", "nope"])["ids"]) == ["id-03", "id-17"]
+
+
+def test_time_routing_moves_reingested_ids_without_deleting_everywhere(tmp_path, embedding):
+    sharded = _fill(_sharded(tmp_path, embedding, routing="time"), embedding)
+    deletes = []
+    for index, shard in enumerate(sharded.shards):
+        original = shard.delete
+        shard.delete = lambda ids, index=index, original=original: deletes.append((index, list(ids))) or original(ids)
+
+    # New ids and ids staying in their bucket delete nothing
+    sharded.add(["new"], ["fresh chunk"], embedding.embed_documents(["fresh chunk"]), [{"ingested_at": 0}])
+    sharded.add(["id-00"], [TEXTS[0]], embedding.embed_documents([TEXTS[0]]), [dict(METADATAS[0], page=100)])
+    assert deletes == []
+
+    # id-00 was ingested on day 0 (shard 0); re-ingesting it on day 2 moves it to shard 2
+    sharded.add(["id-00"], ["updated"], embedding.embed_documents(["updated"]), [dict(METADATAS[0], ingested_at=2 * DAY)])
+    assert deletes == [(0, ["id-00"])]
+    holders = [i for i, shard in enumerate(sharded.shards) if shard.get(ids=["id-00"])["ids"]]
+    assert holders == [2]
+    assert sharded.count() == 25
+    assert sharded.get(ids=["id-00"])["documents"] == ["updated"]
+
+
+def test_time_routing_map_is_rebuilt_from_the_shards(tmp_path, embedding):
+    _fill(_sharded(tmp_path, embedding, routing="time"), embedding)
+    reopened = _sharded(tmp_path, embedding, routing="time")
+    reads = []
+    for shard in reopened.shards:
+        # Only the id tables are read to rebuild the map, never texts or metadata
+        shard.get = lambda *args, **kwargs: reads.append(args or kwargs)
+    reopened.add(["id-01"], ["moved"], embedding.embed_documents(["moved"]), [dict(METADATAS[1], ingested_at=0)])
+    reopened.persist()
+    assert reads == []
+    assert reopened.count() == 24
+    assert [i for i, shard in enumerate(reopened.shards) if "id-01" in shard.ids()] == [0]
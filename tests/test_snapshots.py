@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from shared.utils.similarity_utils import normalize_rows
+from shared.utils.snapshot_utils import (
+    _PREAMBLE,
+    export_collection,
+    import_collection,
+    read_snapshot,
+    write_snapshot,
+)
+from shared.vectorstores.backends import FaissBackend, NumpyBackend
+
+IDS = ["a", "b", "c", "d"]
+TEXTS = ["first chunk", "zweiter Abschnitt äöü", "third", ""]
+METADATAS = [{"source": "x.pdf", "page": 0}, {"source": "y.pdf", "tags": "hr"}, {}, {"page": 3}]
+
+
+def _rows(seed=0):
+    vectors = normalize_rows(np.random.default_rng(seed).standard_normal((len(IDS), 16)))
+    return {"ids": IDS, "documents": TEXTS, "metadatas": METADATAS, "embeddings": vectors}
+
+
+def test_float32_round_trip_is_exact(tmp_path):
+    path = str(tmp_path / "snap.ragsnap")
+    rows = _rows()
+    header = write_snapshot(path, "coll", rows, "numpy", "float32", extras={"images": b"\x00\x01payload"})
+    assert header["count"] == 4 and header["dim"] == 16 and header["normalized"]
+    snapshot = read_snapshot(path)
+    assert snapshot["ids"] == IDS and snapshot["documents"] == TEXTS and snapshot["metadatas"] == METADATAS
+    np.testing.assert_array_equal(snapshot["embeddings"], rows["embeddings"])
+    assert snapshot["extras"] == {"images": b"\x00\x01payload"}
+
+
+def test_int8_round_trip_is_close_and_smaller(tmp_path):
+    rows = _rows()
+    write_snapshot(str(tmp_path / "f32"), "coll", rows, "numpy", "float32")
+    write_snapshot(str(tmp_path / "i8"), "coll", rows, "numpy", "int8")
+    snapshot = read_snapshot(str(tmp_path / "i8"))
+    cosines = np.sum(snapshot["embeddings"] * rows["embeddings"], axis=1)
+    assert cosines.min() > 0.99
+    np.testing.assert_allclose(np.linalg.norm(snapshot["embeddings"], axis=1), 1.0, atol=1e-5)
+    assert snapshot["header"]["sections"]["vectors"][1] * 4 == rows["embeddings"].nbytes
+
+
+def test_corrupted_or_truncated_snapshots_are_rejected(tmp_path):
+    path = str(tmp_path / "snap")
+    write_snapshot(path, "coll", _rows(), "numpy")
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    header_len = _PREAMBLE.unpack(bytes(data[:_PREAMBLE.size]))[2]
+    flipped = bytearray(data)
+    flipped[_PREAMBLE.size + header_len + 5] ^= 0xFF
+    for name, payload in (("flipped", flipped), ("truncated", data[:-10])):
+        with open(tmp_path / name, "wb") as f:
+            f.write(payload)
+        with pytest.raises(ValueError, match="checksum"):
+            read_snapshot(str(tmp_path / name))
+    with open(tmp_path / "other", "wb") as f:
+        f.write(b"not a snapshot at all")
+    with pytest.raises(ValueError, match="not a collection snapshot"):
+        read_snapshot(str(tmp_path / "other"))
+
+
+def test_rejects_unknown_encoding_and_mismatched_rows(tmp_path):
+    with pytest.raises(ValueError, match="encoding"):
+        write_snapshot(str(tmp_path / "s"), "coll", _rows(), "numpy", "float16")
+    rows = dict(_rows(), ids=IDS[:3])
+    with pytest.raises(ValueError, match="vectors for 3 rows"):
+        write_snapshot(str(tmp_path / "s"), "coll", rows, "numpy")
+
+
+def test_export_from_one_backend_and_import_into_another(tmp_path, embedding):
+    source = NumpyBackend("snapshot_source", embedding, str(tmp_path / "a"))
+    texts = [f"chunk number {i}" for i in range(7)]
+    source.add([f"id{i}" for i in range(7)], texts, embedding.embed_documents(texts), [{"page": i} for i in range(7)])
+    source.persist()
+    path = str(tmp_path / "export.ragsnap")
+    export_collection(source, path)
+
+    target = FaissBackend("snapshot_target", embedding, str(tmp_path / "b"))
+    target.add(["stale"], ["old row"], embedding.embed_documents(["old row"]), [{"page": 99}])
+    assert import_collection(read_snapshot(path), target, batch_size=3) == 7
+    reopened = FaissBackend("snapshot_target", embedding, str(tmp_path / "b"))
+    result = reopened.get()
+    assert sorted(result["ids"]) == [f"id{i}" for i in range(7)]
+    hit = reopened.search(embedding.embed_query("chunk number 4"), 1)[0][0]
+    assert hit.id == "id4" and hit.metadata == {"page": 4}
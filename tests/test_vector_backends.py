@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from shared.vectorstores.backends import ChromaBackend, FaissBackend, NumpyBackend
+
+BACKENDS = {"chroma": ChromaBackend, "numpy": NumpyBackend, "faiss": FaissBackend}
+TEXTS = [f"chunk {i} about {'leave' if i % 2 else 'payroll'}" for i in range(12)]
+METADATAS = [{"source": f"doc{i % 3}.pdf", "page": i} if i % 4 else {} for i in range(12)]
+IDS = [f"id-{i:02d}" for i in range(12)]
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request, tmp_path, embedding):
+    backend = BACKENDS[request.param]("backend_test", embedding, str(tmp_path))
+    backend.add(IDS, TEXTS, embedding.embed_documents(TEXTS), METADATAS)
+    backend.persist()
+    return backend
+
+
+def test_rows_without_metadata_keep_the_rest_of_the_batch(backend):
+    result = backend.get()
+    by_id = dict(zip(result["ids"], result["metadatas"]))
+    assert by_id == dict(zip(IDS, METADATAS))
+
+
+def test_ids_lists_every_row_in_storage_order(backend):
+    assert backend.ids() == backend.get()["ids"]
+    assert sorted(backend.ids()) == IDS
+
+
+def test_get_pages_match_slices_of_the_full_result(backend):
+    for where in (None, {"source": "doc1.pdf"}):
+        full = backend.get(where=where)
+        for offset, limit in ((0, 3), (2, 4), (10, 5), (0, None)):
+            page = backend.get(where=where, limit=limit, offset=offset)
+            end = None if limit is None else offset + limit
+            assert page["ids"] == full["ids"][offset:end]
+            assert page["documents"] == full["documents"][offset:end]
+
+
+def test_get_by_ids_with_filter_and_vectors(backend, embedding):
+    result = backend.get(ids=["id-05", "id-01", "missing", "id-04"], where={"page": {"$gte": 2}}, include_vectors=True)
+    assert sorted(result["ids"]) == ["id-05"]
+    np.testing.assert_allclose(result["embeddings"][0], embedding.embed_query(TEXTS[5]), atol=1e-5)
+
+
+def test_filtered_search_returns_only_matching_rows(backend, embedding):
+    hits = backend.search(embedding.embed_query("chunk about leave"), 4, {"source": "doc2.pdf"})
+    assert hits and all(doc.metadata["source"] == "doc2.pdf" for doc, _ in hits)
+    assert [d for _, d in hits] == sorted(d for _, d in hits)
+
+
+def test_numpy_get_reads_only_the_requested_page(tmp_path, embedding, monkeypatch):
+    backend = NumpyBackend("paging_test", embedding, str(tmp_path))
+    backend.add(IDS, TEXTS, embedding.embed_documents(TEXTS), METADATAS)
+    read = []
+    original = backend.store._metadata_at
+    monkeypatch.setattr(backend.store, "_metadata_at", lambda row: read.append(row) or original(row))
+    assert backend.get(limit=2, offset=5)["ids"] == IDS[5:7]
+    assert read == [5, 6]